@@ -0,0 +1,107 @@
+"""
+Run the benchmark grid and print a results table
+"""
+
+import sys
+import json
+import argparse
+import itertools
+import subprocess
+
+
+def run_case(guilds: int, races: int, messages: int, args: argparse.Namespace) -> dict:
+    """
+    Run a benchmark case in a fresh interpreter so cases do not share caches
+    or memory
+
+    :param guilds: Number of discord servers
+    :param races: Number of races per chapter
+    :param messages: Number of messages
+    :param args: The command line arguments
+    :return: The case results
+    """
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.case",
+        f"--guilds={guilds}",
+        f"--races={races}",
+        f"--messages={messages}",
+        f"--guilds-per-chapter={args.guilds_per_chapter}",
+        f"--repeat={args.repeat}",
+    ]
+    if args.no_memory:
+        command.append("--no-memory")
+
+    output = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout)
+
+
+def format_table(cases: list[dict]) -> str:
+    """
+    Format the results of every case as a table
+
+    :param cases: The case results
+    :return: The table
+    """
+    header = (
+        f"{'guilds':>6} {'races':>6} {'msgs':>6}  {'scenario':<20} {'ops':>7} "
+        f"{'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak MiB':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for case in cases:
+        for scenario in case["scenarios"]:
+            peak = scenario["peak_memory"]
+            lines.append(
+                f"{case['guilds']:>6} {case['races']:>6} {case['messages']:>6}  "
+                f"{scenario['name']:<20} {scenario['ops']:>7} "
+                f"{scenario['throughput']:>10.1f} "
+                f"{scenario['p50'] * 1000:>9.2f} {scenario['p99'] * 1000:>9.2f} "
+                f"{'-' if peak is None else f'{peak / 2**20:.1f}':>9}"
+            )
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """
+    Run every combination of the requested guild, race, and message counts
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline benchmarks of the bot against local fakes",
+    )
+    parser.add_argument("--guilds", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--races", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--messages", type=int, nargs="+", default=[100])
+    parser.add_argument(
+        "--guilds-per-chapter",
+        type=int,
+        default=1,
+        help="Number of servers bound to each chapter",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs of the repeated scenarios"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip peak memory tracing"
+    )
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    cases = [
+        run_case(guilds, races, messages, args)
+        for guilds, races, messages in itertools.product(
+            args.guilds, args.races, args.messages
+        )
+    ]
+
+    if args.json:
+        json.dump(cases, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(format_table(cases))
+
+
+if __name__ == "__main__":
+    main()
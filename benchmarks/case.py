@@ -0,0 +1,397 @@
+"""
+A single benchmark run over a fixed number of guilds, races, and messages
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import functools
+import datetime
+import tempfile
+import tracemalloc
+import statistics
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from . import fakes
+
+
+@dataclass
+class ScenarioResult:
+    """
+    Measurements of a benchmark scenario
+    """
+
+    name: str
+    """The name of the scenario"""
+    ops: int = 0
+    """Number of units of work completed"""
+    seconds: float = 0.0
+    """Total wall time of the scenario"""
+    latencies: list[float] = field(default_factory=list, repr=False)
+    """Latency of each timed call in seconds"""
+    peak_memory: int | None = None
+    """Peak traced memory in bytes, None when memory is not traced"""
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Summarize the measurements
+
+        :return: The summary
+        """
+        latencies = sorted(self.latencies)
+        return {
+            "name": self.name,
+            "ops": self.ops,
+            "seconds": self.seconds,
+            "throughput": self.ops / self.seconds if self.seconds else 0.0,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "peak_memory": self.peak_memory,
+        }
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Get a percentile of sorted values using the nearest rank
+
+    :param values: The sorted values
+    :param percent: The percentile
+    :return: The value, 0.0 without values
+    """
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+
+    return statistics.quantiles(values, n=100, method="inclusive")[
+        min(98, max(0, round(percent) - 1))
+    ]
+
+
+def configure_environment(directory: str) -> None:
+    """
+    Point the bot's configuration at the local fakes. Must run before the bot
+    module is imported.
+
+    :param directory: Directory holding the benchmark database
+    """
+    os.environ.update(
+        {
+            "DB_PATH": os.path.join(directory, "benchmark.db"),
+            "OLLAMA_SERVER": "ollama.local",
+            "OLLAMA_PORT": "11434",
+            "OLLAMA_MODEL": "benchmark",
+            "OLLAMA_QUEUE_DEPTH": "100000",
+            "MULTIGP_RATE_LIMIT": "0",
+            "STREAM_EDIT_INTERVAL": "0",
+            "ANNOUNCEMENT_BACKLOG": "100000",
+        }
+    )
+    os.environ.pop("METRICS_PORT", None)
+    os.environ.pop("CACHE_PERSIST", None)
+
+
+class Benchmark:
+    """
+    Drives the bot's entry points against the local fakes
+    """
+
+    # pylint: disable=R0902,R0903
+
+    def __init__(
+        self,
+        guilds: int,
+        races: int,
+        messages: int,
+        *,
+        guilds_per_chapter: int = 1,
+        repeat: int = 5,
+        memory: bool = True,
+    ) -> None:
+        """
+        Class initializer
+
+        :param guilds: Number of discord servers
+        :param races: Number of races listed by each chapter
+        :param messages: Number of messages sent to the bot
+        :param guilds_per_chapter: Number of servers bound to each chapter,
+        defaults to 1
+        :param repeat: Number of repeats of the repeated scenarios, defaults to 5
+        :param memory: Trace peak memory of each scenario, defaults to True
+        """
+        # pylint: disable=R0913
+
+        from billy import billy  # pylint: disable=C0415
+        from billy.api import client as api_client  # pylint: disable=C0415
+
+        self.bot = billy
+        self.guilds = guilds
+        self.races = races
+        self.messages = messages
+        self.chapters = max(1, -(-guilds // max(1, guilds_per_chapter)))
+        self.guilds_per_chapter = max(1, guilds_per_chapter)
+        self.repeat = max(1, repeat)
+        self.memory = memory
+
+        self.multigp = fakes.FakeMultiGP(self.chapters, races)
+        self.ollama = fakes.FakeOllama()
+        self.client = fakes.FakeClient()
+        self.channels: list[fakes.FakeChannel] = []
+
+        billy.client = self.client  # type: ignore[assignment]
+        api_client._client = api_client.httpx.AsyncClient(
+            transport=fakes.transport(self.multigp, self.ollama)
+        )
+
+    async def _measure(
+        self, name: str, runs: list[Callable[[], Awaitable[int]]]
+    ) -> ScenarioResult:
+        """
+        Time a scenario
+
+        :param name: The name of the scenario
+        :param runs: Calls each returning the number of units of work done
+        :return: The measurements
+        """
+        result = ScenarioResult(name)
+        gc.collect()
+        if self.memory:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        for run in runs:
+            call_start = time.perf_counter()
+            result.ops += await run()
+            result.latencies.append(time.perf_counter() - call_start)
+        result.seconds = time.perf_counter() - start
+
+        if self.memory:
+            result.peak_memory = tracemalloc.get_traced_memory()[1]
+
+        return result
+
+    async def _configure_servers(self) -> int:
+        """
+        Register every guild with the database
+
+        :return: The number of registered guilds
+        """
+        for index in range(self.guilds):
+            guild, channel = self.client.add_guild()
+            self.channels.append(channel)
+            await self.bot.db.set_server_configuration(
+                guild.id,
+                channel.id,
+                self.multigp.api_key(index // self.guilds_per_chapter),
+            )
+
+        return self.guilds
+
+    async def _sync(self) -> int:
+        """
+        Run a synchronization pass, including the announcements it starts
+
+        :return: The number of races checked
+        """
+        await self.bot.events_sync()
+        await self.bot.supervisor.drain()
+        await self.bot.announcements._queue.join()  # pylint: disable=W0212
+        return self.chapters * self.races
+
+    async def _database_reads(self) -> int:
+        """
+        Run the database reads of a synchronization pass and a status update
+
+        :return: The number of queries
+        """
+        db = self.bot.db
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        for chapter in range(self.chapters):
+            await db.get_chapter_race_ids(str(chapter))
+            await db.get_race_snapshots(str(chapter))
+        await db.get_active_races(now, datetime.timedelta(days=1))
+        await db.get_upcoming_races(now)
+
+        return 2 * self.chapters + 2
+
+    async def _seed_started_events(self) -> None:
+        """
+        Add races that have already started, with discord events still
+        scheduled, for the status update scenario
+        """
+        now = datetime.datetime.now().astimezone()
+        records: list[tuple] = []
+        for index, guild in enumerate(self.client.guilds.values()):
+            chapter = str(index // self.guilds_per_chapter)
+            for race in range(self.races):
+                start = now - datetime.timedelta(hours=race % 6 + 1)
+                event = await guild.create_scheduled_event(
+                    start_time=start, end_time=start + datetime.timedelta(hours=4)
+                )
+                records.append(
+                    (
+                        f"past-{chapter}-{guild.id}-{race}",
+                        chapter,
+                        event.id,
+                        start.astimezone(datetime.timezone.utc).replace(tzinfo=None),
+                        (start + datetime.timedelta(hours=4))
+                        .astimezone(datetime.timezone.utc)
+                        .replace(tzinfo=None),
+                    )
+                )
+
+        chapters: dict[str, list[tuple]] = {}
+        for record in records:
+            chapters.setdefault(record[1], []).append(record)
+
+        for chapter, races in chapters.items():
+            listed = await self.bot.db.get_chapter_race_ids(chapter)
+            await self.bot.db.reconcile_chapter_races(
+                chapter, races, [], listed | {race[0] for race in races}
+            )
+
+    async def _update_status(self) -> int:
+        """
+        Run a startup status update
+
+        :return: The number of guild events checked
+        """
+        await self.bot.update_event_status()
+        return self.guilds * self.races
+
+    def _message(self, index: int) -> fakes.FakeMessage:
+        """
+        Build an incoming message. A quarter of the messages mention the bot,
+        a quarter reply to one of its messages, and the rest are ignored.
+
+        :param index: The index of the message
+        :return: The message
+        """
+        channel = self.channels[index % len(self.channels)]
+        author = fakes.FakeUser(fakes.snowflake())
+        kind = index % 4
+
+        if kind == 0:
+            return fakes.FakeMessage(
+                channel,
+                author,
+                f"<@{self.client.user.id}> when is the next race?",
+                mentions=[self.client.user],
+            )
+
+        if kind == 1:
+            previous = fakes.FakeMessage(
+                channel, self.client.user, "The next race is on Saturday."
+            )
+            self.bot.message_cache.add(previous)  # type: ignore[arg-type]
+            return fakes.FakeMessage(
+                channel, author, "Which field is it at?", reference=previous.id
+            )
+
+        return fakes.FakeMessage(channel, author, f"Off topic message {index}")
+
+    async def _on_message(self, message: fakes.FakeMessage) -> int:
+        """
+        Pass a message to the bot
+
+        :param message: The message
+        :return: Always 1
+        """
+        await self.bot.on_message(message)  # type: ignore[arg-type]
+        return 1
+
+    async def run(self) -> list[ScenarioResult]:
+        """
+        Run every scenario
+
+        :return: The measurements of each scenario
+        """
+        bot = self.bot
+        await bot.db.setup()
+        await bot.timezones.wait_ready()
+        bot.announcements.start()
+
+        results = [
+            await self._measure("db.configure", [self._configure_servers]),
+            await self._measure("events_sync.cold", [self._sync]),
+            await self._measure("events_sync.warm", [self._sync] * self.repeat),
+            await self._measure("db.reads", [self._database_reads] * self.repeat),
+        ]
+
+        await self._seed_started_events()
+        results.append(
+            await self._measure(
+                "update_event_status", [self._update_status] * self.repeat
+            )
+        )
+
+        incoming = [self._message(index) for index in range(self.messages)]
+        results.append(
+            await self._measure(
+                "on_message",
+                [functools.partial(self._on_message, message) for message in incoming],
+            )
+        )
+
+        await bot.announcements.stop()
+        await bot.db.shutdown()
+
+        return results
+
+
+def main() -> None:
+    """
+    Run a benchmark case and print its results as JSON
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guilds", type=int, required=True)
+    parser.add_argument("--races", type=int, required=True)
+    parser.add_argument("--messages", type=int, required=True)
+    parser.add_argument("--guilds-per-chapter", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(directory)
+        if not args.no_memory:
+            tracemalloc.start()
+
+        benchmark = Benchmark(
+            args.guilds,
+            args.races,
+            args.messages,
+            guilds_per_chapter=args.guilds_per_chapter,
+            repeat=args.repeat,
+            memory=not args.no_memory,
+        )
+        results = asyncio.run(benchmark.run())
+
+    json.dump(
+        {
+            "guilds": args.guilds,
+            "races": args.races,
+            "messages": args.messages,
+            "scenarios": [result.summary() for result in results],
+            "requests": {
+                "multigp": benchmark.multigp.requests,
+                "ollama": benchmark.ollama.requests,
+            },
+            "replies": sum(channel.sent for channel in benchmark.channels),
+        },
+        sys.stdout,
+    )
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Local stand-ins for MultiGP, Ollama, and Discord
+"""
+
+import json
+import random
+import datetime
+import itertools
+from collections.abc import Iterator
+from typing import Any
+from urllib.parse import parse_qs
+
+import discord
+import httpx
+
+# pylint: disable=R0903
+
+_ids = itertools.count(10**17)
+"""Source of unique discord snowflakes"""
+
+
+def snowflake() -> int:
+    """
+    Get a new unique discord id
+
+    :return: The id
+    """
+    return next(_ids)
+
+
+def noon_longitude(now: datetime.datetime | None = None) -> float:
+    """
+    Get a longitude where the local time is close to noon. Races placed on
+    the equator at this longitude resolve to an ocean timezone whose local
+    time is inside the event creation window, keeping runs reproducible at
+    any time of day.
+
+    :param now: The current UTC time, defaults to now
+    :return: The longitude
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+    longitude = (12 - now.hour - now.minute / 60) * 15
+    return (longitude + 180) % 360 - 180
+
+
+class FakeMultiGP:
+    """
+    Generates deterministic MultiGP responses for a number of chapters, each
+    listing the same number of races
+    """
+
+    def __init__(self, chapters: int, races: int, *, seed: int = 0) -> None:
+        """
+        Class initializer
+
+        :param chapters: The number of chapters
+        :param races: The number of races listed per chapter
+        :param seed: Seed of the generated race details, defaults to 0
+        """
+        self.chapters = chapters
+        self.races = races
+        self.requests = 0
+        """Number of requests served"""
+        self._random = random.Random(seed)
+        self._longitude = noon_longitude()
+        self._start = datetime.date.today() + datetime.timedelta(days=2)
+
+    @staticmethod
+    def api_key(chapter: int) -> str:
+        """
+        Get the API key of a chapter
+
+        :param chapter: The chapter number
+        :return: The API key
+        """
+        return f"key-{chapter}"
+
+    def _race(self, race_id: str) -> dict:
+        """
+        Build the details of a race
+
+        :param race_id: The id of the race
+        :return: The race details
+        """
+        chapter, index = race_id.split("-")
+        start = self._start + datetime.timedelta(days=int(index) % 30)
+        return {
+            "id": race_id,
+            "name": f"Race {index}",
+            "chapterName": f"Chapter {chapter}",
+            "courseName": "Test Field",
+            "content": "Bring spare props. " * self._random.randint(1, 20),
+            "startDate": f"{start:%Y-%m-%d} 10:00 AM",
+            "endDate": f"{start:%Y-%m-%d} 04:00 PM",
+            "latitude": "0.0",
+            "longitude": str(self._longitude),
+        }
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a MultiGP API request
+
+        :param request: The request
+        :return: The response
+        """
+        self.requests += 1
+        endpoint = request.url.path.rsplit("multigpwebservice/", 1)[-1]
+        query = parse_qs(request.url.query.decode())
+        api_key = json.loads(request.content or b"{}").get("apiKey", "")
+
+        if endpoint == "chapter/findChapterFromApiKey":
+            chapter = api_key.removeprefix("key-")
+            return httpx.Response(
+                200,
+                json={
+                    "status": True,
+                    "chapterId": chapter,
+                    "chapterName": f"Chapter {chapter}",
+                },
+            )
+
+        if endpoint == "race/listForChapter":
+            chapter = query["chapterId"][0]
+            races = [
+                {"id": f"{chapter}-{index}", "name": f"Race {index}"}
+                for index in range(self.races)
+            ]
+            return httpx.Response(200, json={"status": True, "data": races})
+
+        if endpoint == "race/view":
+            return httpx.Response(
+                200, json={"status": True, "data": self._race(query["id"][0])}
+            )
+
+        return httpx.Response(404, json={"status": False})
+
+
+class FakeOllama:
+    """
+    Answers Ollama API requests with canned responses
+    """
+
+    def __init__(self, fragments: int = 8) -> None:
+        """
+        Class initializer
+
+        :param fragments: Number of fragments in a streamed response, defaults to 8
+        """
+        self.fragments = fragments
+        self.requests = 0
+        """Number of requests served"""
+
+    def _stream(self, key: str) -> Iterator[bytes]:
+        """
+        Build a streamed response
+
+        :param key: The field holding each fragment
+        :yield: Each line of the response
+        """
+        for index in range(self.fragments):
+            fragment = f"word{index} "
+            chunk: dict[str, Any] = (
+                {"message": {"content": fragment}} if key == "message" else {}
+            )
+            chunk.setdefault("response", fragment)
+            chunk["done"] = index == self.fragments - 1
+            yield json.dumps(chunk).encode() + b"\n"
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer an Ollama API request
+
+        :param request: The request
+        :return: The response
+        """
+        self.requests += 1
+        payload = json.loads(request.content or b"{}")
+        path = request.url.path
+
+        if path == "/api/ps":
+            return httpx.Response(200, json={"models": []})
+
+        key = "message" if path == "/api/chat" else "response"
+        if payload.get("stream"):
+            return httpx.Response(200, content=b"".join(self._stream(key)))
+
+        text = "Race day is coming, charge your packs!"
+        if key == "message":
+            return httpx.Response(
+                200, json={"message": {"role": "assistant", "content": text}}
+            )
+        return httpx.Response(200, json={"response": text, "done": True})
+
+
+def transport(multigp: FakeMultiGP, ollama: FakeOllama) -> httpx.MockTransport:
+    """
+    Build a transport routing requests to the fake servers
+
+    :param multigp: The fake MultiGP server
+    :param ollama: The fake Ollama server
+    :return: The transport
+    """
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "www.multigp.com":
+            return multigp.handle(request)
+        return ollama.handle(request)
+
+    return httpx.MockTransport(handle)
+
+
+class FakeUser:
+    """
+    A discord user
+    """
+
+    def __init__(self, user_id: int, name: str = "user") -> None:
+        self.id = user_id
+        self.name = name
+        self.bot = False
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeReference:
+    """
+    A reference to a replied to message
+    """
+
+    def __init__(self, message_id: int) -> None:
+        self.message_id = message_id
+        self.resolved = None
+
+
+class FakeMessage:
+    """
+    A discord message whose replies and edits are kept locally
+    """
+
+    # pylint: disable=R0913,R0917
+
+    def __init__(
+        self,
+        channel: "FakeChannel",
+        author: FakeUser,
+        content: str,
+        reference: int | None = None,
+        mentions: list[FakeUser] | None = None,
+    ) -> None:
+        self.id = snowflake()
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.reference = None if reference is None else FakeReference(reference)
+        self.mentions = mentions or []
+        channel.messages[self.id] = self
+
+    async def reply(self, content: str) -> "FakeMessage":
+        """
+        Reply to the message as the bot
+
+        :param content: The reply content
+        :return: The reply
+        """
+        self.channel.sent += 1
+        return FakeMessage(self.channel, self.channel.bot, content, self.id)
+
+    async def edit(self, *, content: str) -> "FakeMessage":
+        """
+        Edit the message
+
+        :param content: The new content
+        :return: The edited message
+        """
+        self.channel.edits += 1
+        self.content = content
+        return self
+
+
+class FakeChannel(discord.TextChannel):
+    """
+    A text channel keeping its messages in memory. Created without discord
+    state so it passes the bot's text channel checks.
+    """
+
+    # pylint: disable=W0231
+
+    def __new__(cls, *_, **__) -> "FakeChannel":
+        return object.__new__(cls)
+
+    def __init__(self, channel_id: int, bot: FakeUser) -> None:
+        self.id = channel_id
+        self.bot = bot
+        self.messages: dict[int, FakeMessage] = {}
+        self.sent = 0
+        self.edits = 0
+        self.fetches = 0
+
+    async def fetch_message(  # type: ignore[override]
+        self, message_id: int, /
+    ) -> FakeMessage:
+        self.fetches += 1
+        return self.messages[message_id]
+
+    async def send(  # type: ignore[override]
+        self, content: str | None = None, **_
+    ) -> FakeMessage:
+        self.sent += 1
+        return FakeMessage(self, self.bot, content or "")
+
+
+class FakeEvent:
+    """
+    A discord scheduled event
+    """
+
+    def __init__(
+        self,
+        guild: "FakeGuild",
+        start_time: datetime.datetime,
+        end_time: datetime.datetime | None,
+    ) -> None:
+        self.id = snowflake()
+        self.guild_id = guild.id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status = discord.EventStatus.scheduled
+        self.url = f"https://discord.com/events/{guild.id}/{self.id}"
+
+    async def start(self) -> "FakeEvent":
+        """
+        Start the event
+
+        :return: The event
+        """
+        self.status = discord.EventStatus.active
+        return self
+
+    async def end(self) -> "FakeEvent":
+        """
+        End the event
+
+        :return: The event
+        """
+        self.status = discord.EventStatus.completed
+        return self
+
+
+class FakeGuild:
+    """
+    A discord server keeping its scheduled events in memory
+    """
+
+    def __init__(self, guild_id: int) -> None:
+        self.id = guild_id
+        self.events: dict[int, FakeEvent] = {}
+
+    def get_scheduled_event(self, event_id: int) -> FakeEvent | None:
+        """
+        Get a scheduled event
+
+        :param event_id: The id of the event
+        :return: The event or None
+        """
+        return self.events.get(event_id)
+
+    async def fetch_scheduled_event(self, event_id: int) -> FakeEvent:
+        """
+        Fetch a scheduled event
+
+        :param event_id: The id of the event
+        :return: The event
+        """
+        return self.events[event_id]
+
+    async def create_scheduled_event(
+        self,
+        *,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime | None = None,
+        **_,
+    ) -> FakeEvent:
+        """
+        Create a scheduled event
+
+        :param start_time: The start of the event
+        :param end_time: The end of the event, defaults to None
+        :return: The event
+        """
+        event = FakeEvent(self, start_time, end_time)
+        self.events[event.id] = event
+        return event
+
+
+class FakeClient:
+    """
+    Discord client serving the fake guilds and channels
+    """
+
+    def __init__(self) -> None:
+        self.user = FakeUser(snowflake(), "Billy")
+        self.guilds: dict[int, FakeGuild] = {}
+        self.channels: dict[int, FakeChannel] = {}
+
+    def add_guild(self) -> tuple[FakeGuild, FakeChannel]:
+        """
+        Add a guild with an announcement channel
+
+        :return: The guild and its channel
+        """
+        guild = FakeGuild(snowflake())
+        channel = FakeChannel(snowflake(), self.user)
+        self.guilds[guild.id] = guild
+        self.channels[channel.id] = channel
+        return guild, channel
+
+    def get_guild(self, guild_id: int) -> FakeGuild | None:
+        """
+        Get a guild
+
+        :param guild_id: The id of the guild
+        :return: The guild or None
+        """
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int) -> FakeChannel | None:
+        """
+        Get a channel
+
+        :param channel_id: The id of the channel
+        :return: The channel or None
+        """
+        return self.channels.get(channel_id)
+
+    def is_closed(self) -> bool:
+        """
+        Whether the client is closed
+
+        :return: Always False
+        """
+        return False
@@ -4,13 +4,16 @@ PropHazard server entry point
 
 import os
 import sys
+import time
 import logging
-import datetime
 
-from .billy import start
+_import_start = time.perf_counter()
 
+# pylint: disable=C0413
+from .billy import start
+from .logs import setup_logging
 
-timestamp = int(datetime.datetime.now().astimezone().timestamp())
+_import_time = time.perf_counter() - _import_start
 
 if bool(os.getenv("DEBUG")):
     LEVEL = logging.DEBUG
@@ -18,18 +21,13 @@ else:
     LEVEL = logging.INFO
 
 
-FORMAT = "%(asctime)s %(levelname)s %(message)s"
-logging.basicConfig(
-    level=LEVEL,
-    format=FORMAT,
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(
-            filename=f"/billy/files/{timestamp}.log",
-            encoding="utf-8",
-        ),
-    ],
+_log_listener = setup_logging(
+    LEVEL,
+    filename=os.path.join(os.getenv("LOG_DIR", "/billy/files"), "billy.log"),
+    json_output=bool(os.getenv("LOG_JSON")),
+    max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    backup_count=int(os.getenv("LOG_BACKUP_COUNT", "14")),
+    when=os.getenv("LOG_ROTATE_WHEN", "midnight"),
 )
 
 # pylint: disable=E0401
@@ -45,7 +43,13 @@ def main() -> None:
     Run the discord bot. This enables starting the bot from
     poetry
     """
-    run(start())
+    logger = logging.getLogger(__name__)
+    logger.info("Startup phase %s took %.3fs", "imports", _import_time)
+
+    try:
+        run(start())
+    finally:
+        _log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,320 @@
+"""
+Generated race announcements
+"""
+
+import asyncio
+import logging
+import datetime
+from typing import Protocol
+
+from .api import OllamaAPI, LLMPriority
+from .api.cache import ResponseCache
+from .database import RaceSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def announcement_prompt(snapshot: RaceSnapshot, race_date: datetime.date) -> str:
+    """
+    Build the prompt used to generate a race announcement
+
+    :param snapshot: The snapshot of the race
+    :param race_date: The local date of the race
+    :return: The prompt
+    """
+    return (
+        "Cleverly announce an upcoming drone racing event "
+        f"called {snapshot.name} to the members of drone racing group "
+        f"named {snapshot.chapter_name}. It will occur on "
+        f"{race_date.year}-{race_date.month}-{race_date.day}."
+    )
+
+
+class DraftStore(Protocol):
+    """
+    Persistent storage of pre-generated announcements
+    """
+
+    async def get_announcement_draft(
+        self, race_id: str, chapter_id: str, content_hash: str, variant: int
+    ) -> str | None:
+        """
+        Get a pre-generated announcement for the current details of a race
+
+        :param race_id: The id of the race
+        :param chapter_id: The id of the chapter
+        :param content_hash: The content hash of the race's details
+        :param variant: The announcement variant
+        :return: The announcement or None if there is no current draft
+        """
+
+    async def save_announcement_draft(
+        self,
+        race_id: str,
+        chapter_id: str,
+        content_hash: str,
+        variant: int,
+        content: str,
+    ) -> None:
+        """
+        Save a pre-generated announcement
+
+        :param race_id: The id of the race
+        :param chapter_id: The id of the chapter
+        :param content_hash: The content hash of the race's details
+        :param variant: The announcement variant
+        :param content: The generated announcement
+        """
+        # pylint: disable=R0913,R0917
+
+
+class AnnouncementService:
+    """
+    Generates race announcements once per race and chapter rather than once
+    per server. Announcements are cached, and concurrent requests for the same
+    announcement share a single generation. Servers can be spread over a small
+    pool of variants so servers of the same chapter do not all post the same
+    text.
+
+    Newly discovered races are queued to have their announcements drafted in
+    the background at the lowest priority and saved to the store, so posting
+    an announcement usually only sends a stored draft.
+    """
+
+    # pylint: disable=R0902
+
+    _endpoint = "announcement"
+
+    def __init__(
+        self,
+        ollama: OllamaAPI,
+        *,
+        variants: int = 1,
+        ttl: float = 86400.0,
+        maxsize: int = 512,
+        store: DraftStore | None = None,
+        draft_interval: float = 0.0,
+    ) -> None:
+        """
+        Class initializer
+
+        :param ollama: The Ollama manager used to generate announcements
+        :param variants: Number of distinct announcements per race, defaults to 1
+        :param ttl: Seconds an announcement is reused, defaults to 86400.0
+        :param maxsize: Maximum number of cached announcements, defaults to 512
+        :param store: Persistent storage of drafts, defaults to None
+        :param draft_interval: Seconds to pause between background drafts,
+        defaults to 0.0
+        """
+        # pylint: disable=R0913
+
+        self.ollama = ollama
+        self.variants = max(1, variants)
+        self.cache = ResponseCache(default_ttl=ttl, maxsize=maxsize)
+        self.store = store
+        self.draft_interval = draft_interval
+        self.drafted = 0
+        """Number of announcements prepared in the background"""
+        self._queue: asyncio.Queue[tuple[RaceSnapshot, datetime.date]] = asyncio.Queue()
+        self._queued: set[str] = set()
+        self._priorities: dict[str, LLMPriority] = {}
+        self._task: asyncio.Task | None = None
+
+    def _key(self, snapshot: RaceSnapshot, variant: int) -> str:
+        """
+        Build the cache key of an announcement. The race's content hash is
+        included so edited races are announced with their new details.
+
+        :param snapshot: The snapshot of the race
+        :param variant: The announcement variant
+        :return: The cache key
+        """
+        return (
+            f"{snapshot.race_id}:{snapshot.chapter_id}:"
+            f"{snapshot.content_hash}:{variant}"
+        )
+
+    async def _load(
+        self,
+        snapshot: RaceSnapshot,
+        race_date: datetime.date,
+        variant: int,
+        priority: LLMPriority,
+    ) -> str | None:
+        """
+        Get an announcement from the store, generating and saving it if there
+        is none. The generation runs at the highest priority requested while
+        the load is in flight.
+
+        :param snapshot: The snapshot of the race
+        :param race_date: The local date of the race
+        :param variant: The announcement variant
+        :param priority: The queue priority of the generation
+        :return: The announcement or None if it could not be generated
+        """
+        key = self._key(snapshot, variant)
+        try:
+            if self.store is not None and (
+                draft := await self.store.get_announcement_draft(
+                    snapshot.race_id,
+                    snapshot.chapter_id,
+                    snapshot.content_hash,
+                    variant,
+                )
+            ):
+                return draft
+
+            content = await self.ollama.generate_single_response(
+                announcement_prompt(snapshot, race_date),
+                priority=self._priorities.get(key, priority),
+                key=key,
+            )
+        finally:
+            self._priorities.pop(key, None)
+
+        if content and self.store is not None:
+            await self.store.save_announcement_draft(
+                snapshot.race_id,
+                snapshot.chapter_id,
+                snapshot.content_hash,
+                variant,
+                content,
+            )
+
+        return content or None
+
+    async def _fetch(
+        self,
+        snapshot: RaceSnapshot,
+        race_date: datetime.date,
+        variant: int,
+        priority: LLMPriority,
+    ) -> str | None:
+        """
+        Get an announcement from the cache, loading it on a miss. Concurrent
+        fetches of the same announcement share a single load, which is raised
+        to the highest priority among them.
+
+        :param snapshot: The snapshot of the race
+        :param race_date: The local date of the race
+        :param variant: The announcement variant
+        :param priority: The queue priority of the generation
+        :return: The announcement or None if it could not be generated
+        """
+        key = self._key(snapshot, variant)
+        if self.cache.loading(self._endpoint, key):
+            if priority < self._priorities.get(key, priority):
+                self._priorities[key] = priority
+                self.ollama.queue.promote(key, priority)
+        elif self.cache.get(self._endpoint, key) is None:
+            self._priorities[key] = priority
+
+        return await self.cache.fetch(
+            self._endpoint,
+            key,
+            lambda: self._load(snapshot, race_date, variant, priority),
+        )
+
+    async def get(
+        self, snapshot: RaceSnapshot, race_date: datetime.date, server_id: int = 0
+    ) -> str | None:
+        """
+        Get the announcement of a race for a server, generating it if needed.
+        Announcements still being drafted in the background are shared with
+        the draft, which is raised to the announcement priority. A failed
+        shared load, such as a shed draft, is loaded once more.
+
+        :param snapshot: The snapshot of the race
+        :param race_date: The local date of the race
+        :param server_id: The id of the discord server, used to pick a variant,
+        defaults to 0
+        :return: The announcement or None if it could not be generated
+        """
+        if not self.ollama.active:
+            return None
+
+        variant = server_id % self.variants
+
+        content = await self._fetch(
+            snapshot, race_date, variant, LLMPriority.ANNOUNCEMENT
+        )
+        if content is None:
+            content = await self._fetch(
+                snapshot, race_date, variant, LLMPriority.ANNOUNCEMENT
+            )
+
+        return content
+
+    async def draft(self, snapshot: RaceSnapshot, race_date: datetime.date) -> None:
+        """
+        Generate and save every variant of a race's announcement
+
+        :param snapshot: The snapshot of the race
+        :param race_date: The local date of the race
+        """
+        for variant in range(self.variants):
+            if self.cache.get(self._endpoint, self._key(snapshot, variant)):
+                continue
+
+            content = await self._fetch(snapshot, race_date, variant, LLMPriority.DRAFT)
+            if content:
+                self.drafted += 1
+
+    def enqueue(self, snapshot: RaceSnapshot, race_date: datetime.date) -> None:
+        """
+        Queue a race to have its announcements drafted in the background.
+        Races that have already started are not drafted.
+
+        :param snapshot: The snapshot of the race
+        :param race_date: The local date of the race
+        """
+        key = self._key(snapshot, -1)
+        if not self.ollama.active or key in self._queued:
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if snapshot.start_time is not None and snapshot.start_time <= now:
+            return
+
+        self._queued.add(key)
+        self._queue.put_nowait((snapshot, race_date))
+
+    async def _run(self) -> None:
+        """
+        Drafting loop
+        """
+        while True:
+            snapshot, race_date = await self._queue.get()
+            try:
+                await self.draft(snapshot, race_date)
+            except Exception as ex:  # pylint: disable=W0718
+                logger.error(
+                    "Failed to draft announcement for race %s: %s",
+                    snapshot.race_id,
+                    ex,
+                )
+            finally:
+                self._queued.discard(self._key(snapshot, -1))
+                self._queue.task_done()
+
+            if self.draft_interval > 0:
+                await asyncio.sleep(self.draft_interval)
+
+    def start(self) -> None:
+        """
+        Start the drafting loop if it is not running
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(), name="announcement-drafts"
+            )
+
+    async def stop(self) -> None:
+        """
+        Stop the drafting loop
+        """
+        if self._task is not None:
+            self._task.cancel()
+            # The cancelled loop's result is not needed, only that it stopped
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -2,5 +2,5 @@
 API Access
 """
 
-from .ollama import OllamaAPI
+from .ollama import OllamaAPI, LLMPriority
 from .multigp_api import MultiGPAPI
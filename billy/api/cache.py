@@ -0,0 +1,244 @@
+"""
+API response caching
+"""
+
+import time
+import json
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Coroutine, Iterable
+from typing import Any, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+"""Generic used for typing shared results"""
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    """
+    Mark the exception of a finished shared task as retrieved, as every waiter
+    may have been cancelled before it finished
+
+    :param task: The finished task
+    """
+    if not task.cancelled():
+        task.exception()
+
+
+def shared_task(coro: Coroutine[Any, Any, T]) -> asyncio.Task[T]:
+    """
+    Run a request shared by several waiters in its own task, so a cancelled
+    waiter does not cancel the request for the others. Waiters await the task
+    through `asyncio.shield`.
+
+    :param coro: The request
+    :return: The task running the request
+    """
+    task = asyncio.get_running_loop().create_task(coro)
+    task.add_done_callback(_retrieve_exception)
+    return task
+
+
+class CacheStore(Protocol):
+    """
+    Persistent storage used to keep cached responses between restarts
+    """
+
+    async def load_cache_entries(
+        self, now: float
+    ) -> Iterable[tuple[str, str, str, float]]:
+        """
+        Load the unexpired cache entries
+
+        :param now: The current unix timestamp
+        :return: Entries as (endpoint, key, json value, expiration timestamp)
+        """
+
+    async def save_cache_entry(
+        self, endpoint: str, key: str, value: str, expires: float
+    ) -> None:
+        """
+        Save a single cache entry
+
+        :param endpoint: The endpoint of the cached response
+        :param key: The key of the response within the endpoint
+        :param value: The json encoded response
+        :param expires: The expiration unix timestamp
+        """
+
+
+class ResponseCache:
+    """
+    An LRU cache for API responses with per endpoint time to live values.
+    Concurrent fetches for the same entry share a single in-flight request.
+    """
+
+    # pylint: disable=R0902
+
+    def __init__(
+        self,
+        *,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = 0.0,
+        maxsize: int = 1024,
+        store: CacheStore | None = None,
+    ) -> None:
+        """
+        Class initializer
+
+        :param ttls: Time to live in seconds for each endpoint, defaults to None
+        :param default_ttl: Time to live for endpoints without a set value, defaults to 0.0
+        :param maxsize: Maximum number of cached responses, defaults to 1024
+        :param store: Persistent storage for the cache, defaults to None
+        """
+        self.ttls = {} if ttls is None else dict(ttls)
+        self.default_ttl = default_ttl
+        self.maxsize = maxsize
+        self.store = store
+        self.hits = 0
+        """Number of requests served from the cache"""
+        self.misses = 0
+        """Number of requests passed to the API server"""
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, endpoint: str, key: str) -> Any | None:
+        """
+        Get an unexpired response from the cache
+
+        :param endpoint: The endpoint of the response
+        :param key: The key of the response within the endpoint
+        :return: The cached response or None
+        """
+        entry = self._entries.get((endpoint, key))
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires <= time.time():
+            del self._entries[(endpoint, key)]
+            return None
+
+        self._entries.move_to_end((endpoint, key))
+        return value
+
+    def put(
+        self, endpoint: str, key: str, value: Any, *, expires: float | None = None
+    ) -> float:
+        """
+        Add a response to the cache
+
+        :param endpoint: The endpoint of the response
+        :param key: The key of the response within the endpoint
+        :param value: The response to cache
+        :param expires: The expiration unix timestamp, defaults to the endpoint ttl
+        :return: The expiration unix timestamp
+        """
+        if expires is None:
+            expires = time.time() + self.ttls.get(endpoint, self.default_ttl)
+
+        self._entries[(endpoint, key)] = (expires, value)
+        self._entries.move_to_end((endpoint, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        return expires
+
+    def loading(self, endpoint: str, key: str) -> bool:
+        """
+        Whether a response is being loaded from the API server
+
+        :param endpoint: The endpoint of the response
+        :param key: The key of the response within the endpoint
+        :return: Whether a load is in flight
+        """
+        return (endpoint, key) in self._inflight
+
+    def invalidate(self, endpoint: str, key: str | None = None) -> None:
+        """
+        Remove responses from the cache
+
+        :param endpoint: The endpoint to remove responses for
+        :param key: The key to remove, defaults to all keys of the endpoint
+        """
+        if key is not None:
+            self._entries.pop((endpoint, key), None)
+            return
+
+        for entry_key in [entry for entry in self._entries if entry[0] == endpoint]:
+            del self._entries[entry_key]
+
+    async def fetch(
+        self, endpoint: str, key: str, loader: Callable[[], Awaitable[Any | None]]
+    ) -> Any | None:
+        """
+        Get a response from the cache, or load it from the API server on a miss.
+        Failed requests (None) are not cached. The load runs in its own task, so
+        a cancelled caller does not cancel it for the other callers.
+
+        :param endpoint: The endpoint of the response
+        :param key: The key of the response within the endpoint
+        :param loader: Callable used to request the response from the server
+        :return: The response or None
+        """
+        if (value := self.get(endpoint, key)) is not None:
+            self.hits += 1
+            return value
+
+        if (task := self._inflight.get((endpoint, key))) is not None:
+            self.hits += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = shared_task(self._load(endpoint, key, loader))
+        self._inflight[(endpoint, key)] = task
+        return await asyncio.shield(task)
+
+    async def _load(
+        self, endpoint: str, key: str, loader: Callable[[], Awaitable[Any | None]]
+    ) -> Any | None:
+        """
+        Load a response from the API server and cache it
+
+        :param endpoint: The endpoint of the response
+        :param key: The key of the response within the endpoint
+        :param loader: Callable used to request the response from the server
+        :return: The response or None
+        """
+        try:
+            value = await loader()
+        finally:
+            del self._inflight[(endpoint, key)]
+
+        if value is not None:
+            expires = self.put(endpoint, key, value)
+            if self.store is not None:
+                await self.store.save_cache_entry(
+                    endpoint, key, json.dumps(value), expires
+                )
+
+        return value
+
+    async def load(self) -> int:
+        """
+        Load the unexpired responses from the persistent store
+
+        :return: The number of loaded responses
+        """
+        if self.store is None:
+            return 0
+
+        count = 0
+        for endpoint, key, value, expires in await self.store.load_cache_entries(
+            time.time()
+        ):
+            self.put(endpoint, key, json.loads(value), expires=expires)
+            count += 1
+
+        logger.debug("Loaded %d cached responses", count)
+        return count
@@ -2,21 +2,42 @@
 Data manager abstractions
 """
 
+import json
+import time
+import asyncio
 import logging
 from enum import Enum
+from collections.abc import AsyncGenerator
 from typing import TypeVar
 
 import httpx
 
+from .ratelimit import TokenBucket, backoff_delay, parse_retry_after
+from ..metrics import counter, histogram
+
 logger = logging.Logger(__name__)
 """Module logger"""
 
-_client = httpx.AsyncClient(limits=httpx.Limits(keepalive_expiry=30), timeout=15)
-"""Client for API requests"""
+_client = httpx.AsyncClient(limits=httpx.Limits(keepalive_expiry=30))
+"""Client for API requests. Timeouts are set by each manager and request."""
 
 T = TypeVar("T", bound=bool | str | int | dict)
 """Generic used for typing"""
 
+_request_seconds = histogram(
+    "billy_api_request_seconds",
+    "Duration of API request attempts",
+    ("host", "status"),
+)
+_request_retries = counter(
+    "billy_api_retries_total", "API request attempts that were retried", ("host",)
+)
+_stream_first_chunk_seconds = histogram(
+    "billy_api_stream_first_chunk_seconds",
+    "Time until the first object of a streamed API response",
+    ("host",),
+)
+
 
 class RequestAction(str, Enum):
     """
@@ -42,27 +63,131 @@ class _APIManager:
 
     # pylint: disable=R0903
 
+    _limiter: TokenBucket | None = None
+    """Rate limiter shared by all requests made by the manager"""
+    _max_retries: int = 3
+    """Number of times a failed request is retried"""
+    _backoff_base: float = 0.5
+    """Base delay in seconds for retry backoff"""
+    _timeout: httpx.Timeout = httpx.Timeout(15)
+    """Default timeouts of the manager's requests"""
+
     async def _request(
         self,
         request_type: RequestAction,
         url: str,
         json_request: dict | None,
+        *,
+        timeout: httpx.Timeout | None = None,
     ) -> dict[str, T] | None:
         """
-        Make a request to an API server
+        Make a request to an API server. Requests are paced by the manager's
+        rate limiter and retried with a jittered exponential backoff on
+        connection errors, timeouts, HTTP 429, and HTTP 5xx responses.
 
         :param request_type: The type of request to make
         :param url: The url for the API request
         :param json_request: The payload for the request
+        :param timeout: Timeouts for the request, defaults to the manager's timeouts
         :return: The parsed json response from the server
         """
+        if timeout is None:
+            timeout = self._timeout
+
+        host = httpx.URL(url).host
+        for attempt in range(self._max_retries + 1):
+            if self._limiter is not None:
+                await self._limiter.acquire()
+
+            delay = backoff_delay(attempt, self._backoff_base)
+
+            start = time.perf_counter()
+            try:
+                response = await _client.request(
+                    request_type, url, json=json_request, timeout=timeout
+                )
+            except httpx.ConnectError:
+                _request_seconds.observe(
+                    time.perf_counter() - start, host=host, status="error"
+                )
+                logger.error("Connection to API server failed")
+            except httpx.TimeoutException:
+                _request_seconds.observe(
+                    time.perf_counter() - start, host=host, status="timeout"
+                )
+                logger.error("Response not recieved form API server")
+            else:
+                _request_seconds.observe(
+                    time.perf_counter() - start,
+                    host=host,
+                    status=str(response.status_code),
+                )
+                if response.status_code == 429 or response.status_code >= 500:
+                    logger.warning(
+                        "API server responded with status %d", response.status_code
+                    )
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after is not None:
+                        delay = retry_after
+                    if response.status_code == 429 and self._limiter is not None:
+                        self._limiter.pause(delay)
+                else:
+                    return response.json()
+
+            if attempt < self._max_retries:
+                _request_retries.inc(host=host)
+                await asyncio.sleep(delay)
+
+        logger.error("API request failed after %d attempts", self._max_retries + 1)
+        return None
+
+    async def _stream(
+        self,
+        request_type: RequestAction,
+        url: str,
+        json_request: dict | None,
+        *,
+        timeout: httpx.Timeout | None = None,
+    ) -> AsyncGenerator[dict[str, T], None]:
+        """
+        Make a request to an API server that responds with newline delimited
+        json. Requests are paced by the manager's rate limiter but are not
+        retried, as a partially consumed stream can not be replayed.
+
+        :param request_type: The type of request to make
+        :param url: The url for the API request
+        :param json_request: The payload for the request
+        :param timeout: Timeouts for the request, defaults to the manager's timeouts
+        :yield: Each parsed json object as it is received
+        """
+        if timeout is None:
+            timeout = self._timeout
+
+        if self._limiter is not None:
+            await self._limiter.acquire()
+
+        start = time.perf_counter()
         try:
-            response = await _client.request(request_type, url, json=json_request)
+            async with _client.stream(
+                request_type, url, json=json_request, timeout=timeout
+            ) as response:
+                if response.status_code >= 400:
+                    logger.error(
+                        "API server responded with status %d", response.status_code
+                    )
+                    return
+
+                first = True
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        if first:
+                            _stream_first_chunk_seconds.observe(
+                                time.perf_counter() - start,
+                                host=httpx.URL(url).host,
+                            )
+                            first = False
+                        yield json.loads(line)
         except httpx.ConnectError:
             logger.error("Connection to API server failed")
-            return None
-        except httpx.ReadTimeout:
+        except httpx.TimeoutException:
             logger.error("Response not recieved form API server")
-            return None
-
-        return response.json()
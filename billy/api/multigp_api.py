@@ -2,9 +2,14 @@
 API connections to MultiGP
 """
 
+import os
 import logging
 
+import httpx
+
+from .cache import ResponseCache
 from .client import _APIManager, RequestAction
+from .ratelimit import bucket_from_env
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +27,36 @@ class MultiGPAPI(_APIManager):
         https://www.multigp.com/apidocumentation/
     """
 
+    _limiter = bucket_from_env("MULTIGP", rate=5)
+    _max_retries = int(os.getenv("MULTIGP_MAX_RETRIES", "3"))
+    _timeout = httpx.Timeout(float(os.getenv("MULTIGP_TIMEOUT", "15")), connect=5)
+
+    cache = ResponseCache(
+        ttls={
+            "race/listForChapter": float(os.getenv("MULTIGP_RACE_LIST_TTL", "900")),
+            "race/view": float(os.getenv("MULTIGP_RACE_TTL", "21600")),
+        },
+        maxsize=int(os.getenv("MULTIGP_CACHE_SIZE", "4096")),
+    )
+    """Response cache shared by all MultiGP managers"""
+
+    async def _pull_data(self, url: str, api_key: str) -> list | dict | None:
+        """
+        Pull the data field of a MultiGP response
+
+        :param url: The url for the API request
+        :param api_key: The api key for the chapter
+        :return: The response data or None
+        """
+        data = {"apiKey": api_key}
+
+        response_data: dict | None = await self._request(RequestAction.POST, url, data)
+
+        if response_data is not None and response_data["status"]:
+            return response_data["data"]
+
+        return None
+
     async def pull_chapter(self, api_key: str) -> dict | None:
         """
         Get chapter data for an API key
@@ -52,30 +87,28 @@ class MultiGPAPI(_APIManager):
         """
 
         url = f"{BASE_API_URL}/race/listForChapter?chapterId={chapter_id}"
-        data = {"apiKey": api_key}
-
-        response_data: dict | None = await self._request(RequestAction.POST, url, data)
 
-        if response_data is not None and response_data["status"]:
-            return response_data["data"]
-
-        return None
+        return await self.cache.fetch(
+            "race/listForChapter", chapter_id, lambda: self._pull_data(url, api_key)
+        )
 
-    async def pull_race_data(self, race_id: str, api_key: str) -> dict | None:
+    async def pull_race_data(
+        self, race_id: str, api_key: str, *, fresh: bool = False
+    ) -> dict | None:
         """
         Pull data for race
 
         :param race_id: The id of the race to pull
         :param api_key: The api key for the chapter
+        :param fresh: Replace any cached data of the race, used when the race is
+        known to have changed, defaults to False
         :return: The race data or None
         """
 
         url = f"{BASE_API_URL}/race/view?id={race_id}"
-        data = {"apiKey": api_key}
-
-        response_data: dict | None = await self._request(RequestAction.POST, url, data)
+        if fresh:
+            self.cache.invalidate("race/view", race_id)
 
-        if response_data is not None and response_data["status"]:
-            return response_data["data"]
-
-        return None
+        return await self.cache.fetch(
+            "race/view", race_id, lambda: self._pull_data(url, api_key)
+        )
@@ -3,15 +3,361 @@ Ollama server communication
 """
 
 import os
+import time
+import heapq
+import asyncio
 import logging
+import itertools
+from enum import IntEnum
+from collections import deque
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
 
+import httpx
+
+from .cache import shared_task
 from .client import _APIManager, RequestAction
+from .ratelimit import bucket_from_env
 
 logger = logging.getLogger(__name__)
 
 _OLLAMA_SERVER = os.getenv("OLLAMA_SERVER")
 _OLLAMA_PORT = os.getenv("OLLAMA_PORT")
 _OLLAMA_MODEL = os.getenv("OLLAMA_MODEL")
+_OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE")
+
+
+class LLMPriority(IntEnum):
+    """
+    Priority classes of LLM requests. Lower values are served first.
+    """
+
+    MENTION = 0
+    """Replies to messages mentioning or replying to the bot"""
+    ANNOUNCEMENT = 1
+    """Event announcements"""
+    RANDOM = 2
+    """Unprompted replies to random messages"""
+    DRAFT = 3
+    """Background generation of announcement drafts"""
+
+
+class LLMQueue:
+    """
+    Dispatch queue bounding the number of concurrent LLM generations. Waiting
+    requests are served by priority. When the queue is full, the lowest
+    priority request is shed, and requests sharing a key are deduplicated
+    into a single generation, raised to the highest priority among them.
+    Protected priorities are never shed, and are queued past the depth limit
+    when the queue is full.
+    """
+
+    # pylint: disable=R0902
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        max_depth: int = 8,
+        *,
+        protected: frozenset[LLMPriority] = frozenset({LLMPriority.ANNOUNCEMENT}),
+    ) -> None:
+        """
+        Class initializer
+
+        :param concurrency: Maximum number of concurrent generations, defaults to 1
+        :param max_depth: Maximum number of waiting requests, defaults to 8
+        :param protected: Priorities that are never shed, defaults to announcements
+        """
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.protected = protected
+        self._active = 0
+        self._waiting: list[tuple[int, int, asyncio.Future[bool]]] = []
+        self._counter = itertools.count()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._keyed: dict[str, asyncio.Future[bool]] = {}
+        self.submitted = 0
+        """Number of requests submitted"""
+        self.completed = 0
+        """Number of requests that finished running"""
+        self.shed = 0
+        """Number of requests dropped because the queue was full"""
+        self.deduplicated = 0
+        """Number of requests served by an identical in-flight request"""
+
+    @property
+    def depth(self) -> int:
+        """
+        The number of waiting requests
+        """
+        return sum(1 for *_, future in self._waiting if not future.done())
+
+    @property
+    def active(self) -> int:
+        """
+        The number of running requests
+        """
+        return self._active
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the queue metrics
+
+        :return: The metrics by name
+        """
+        stats = {
+            "depth": self.depth,
+            "active": self._active,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "shed": self.shed,
+            "deduplicated": self.deduplicated,
+        }
+        for priority in LLMPriority:
+            stats[f"depth_{priority.name.lower()}"] = sum(
+                1
+                for priority_, _, future in self._waiting
+                if priority_ == priority and not future.done()
+            )
+
+        return stats
+
+    async def acquire(self, priority: LLMPriority, *, key: str | None = None) -> bool:
+        """
+        Wait for a generation slot
+
+        :param priority: The priority of the request
+        :param key: Key used to promote the request while it waits, defaults to None
+        :return: Whether a slot was granted. False if the request was shed.
+        """
+        self.submitted += 1
+
+        if self._active < self.concurrency and self.depth == 0:
+            self._active += 1
+            return True
+
+        self._waiting = [entry for entry in self._waiting if not entry[2].done()]
+        heapq.heapify(self._waiting)
+
+        if len(self._waiting) >= self.max_depth:
+            sheddable = [
+                entry for entry in self._waiting if entry[0] not in self.protected
+            ]
+            lowest = max(sheddable) if sheddable else None
+            if lowest is not None and lowest[0] > priority:
+                self.shed += 1
+                self._waiting.remove(lowest)
+                heapq.heapify(self._waiting)
+                lowest[2].set_result(False)
+            elif priority not in self.protected:
+                self.shed += 1
+                return False
+
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (int(priority), next(self._counter), future))
+        if key is not None:
+            self._keyed[key] = future
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            raise
+        finally:
+            if key is not None and self._keyed.get(key) is future:
+                del self._keyed[key]
+
+    def promote(self, key: str, priority: LLMPriority) -> bool:
+        """
+        Raise the priority of a waiting request
+
+        :param key: The key of the request
+        :param priority: The new priority
+        :return: Whether a waiting request was promoted
+        """
+        future = self._keyed.get(key)
+        if future is None or future.done():
+            return False
+
+        for index, (priority_, order, future_) in enumerate(self._waiting):
+            if future_ is future:
+                if priority_ <= priority:
+                    return False
+
+                self._waiting[index] = (int(priority), order, future)
+                heapq.heapify(self._waiting)
+                return True
+
+        return False
+
+    def release(self) -> None:
+        """
+        Release a generation slot, handing it to the next waiting request
+        """
+        while self._waiting:
+            *_, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(True)
+                return
+
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: LLMPriority, *, key: str | None = None
+    ) -> AsyncGenerator[bool, None]:
+        """
+        Hold a generation slot for the duration of a context
+
+        :param priority: The priority of the request
+        :param key: Key used to promote the request while it waits, defaults to None
+        :yield: Whether a slot was granted. False if the request was shed.
+        """
+        granted = await self.acquire(priority, key=key)
+        try:
+            yield granted
+        finally:
+            if granted:
+                self.release()
+                self.completed += 1
+
+    async def submit(
+        self,
+        priority: LLMPriority,
+        factory: Callable[[], Awaitable[Any]],
+        *,
+        key: str | None = None,
+    ) -> Any | None:
+        """
+        Run a request once a generation slot is available
+
+        :param priority: The priority of the request
+        :param factory: Callable producing the request to run
+        :param key: Requests sharing a key share one generation, defaults to None
+        :return: The result of the request or None if it was shed
+        """
+        if key is not None and (shared := self._inflight.get(key)) is not None:
+            self.deduplicated += 1
+            self.promote(key, priority)
+            return await asyncio.shield(shared)
+
+        async def run() -> Any | None:
+            async with self.slot(priority, key=key) as granted:
+                return await factory() if granted else None
+
+        if key is None:
+            return await run()
+
+        task = shared_task(run())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class KeepAlivePolicy:
+    """
+    Chooses how long the model stays loaded after each request from the
+    observed gaps between requests. The model is kept loaded slightly longer
+    than most gaps, so regular traffic never waits for the model to load while
+    quiet periods still free the server's memory.
+    """
+
+    # pylint: disable=R0913
+
+    def __init__(
+        self,
+        *,
+        default: int = 1800,
+        minimum: int = 300,
+        maximum: int = 7200,
+        factor: float = 1.5,
+        window: int = 32,
+        fixed: str | None = None,
+    ) -> None:
+        """
+        Class initializer
+
+        :param default: Keep alive in seconds until enough gaps are observed,
+        defaults to 1800
+        :param minimum: Shortest keep alive in seconds, defaults to 300
+        :param maximum: Longest keep alive in seconds, defaults to 7200
+        :param factor: Multiplier applied to the 90th percentile gap, defaults to 1.5
+        :param window: Number of recent gaps considered, defaults to 32
+        :param fixed: Keep alive sent as is, disabling the adaptive value,
+        defaults to None
+        """
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.fixed = fixed
+        self._gaps: deque[float] = deque(maxlen=window)
+        self._last: float | None = None
+
+    @property
+    def value(self) -> int | str:
+        """
+        The keep alive to send with the next request
+        """
+        if self.fixed is not None:
+            return self.fixed
+
+        if len(self._gaps) < 4:
+            return self.default
+
+        gaps = sorted(self._gaps)
+        gap = gaps[int(0.9 * (len(gaps) - 1))]
+        return int(min(self.maximum, max(self.minimum, gap * self.factor)))
+
+    def observe(self, now: float | None = None) -> int | str:
+        """
+        Record a request
+
+        :param now: The monotonic time of the request, defaults to now
+        :return: The keep alive to send with the request
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if self._last is not None:
+            self._gaps.append(now - self._last)
+        self._last = now
+
+        return self.value
+
+    def expects_traffic(self, now: float | None = None) -> bool:
+        """
+        Whether a request was made within the current keep alive
+
+        :param now: The current monotonic time, defaults to now
+        :return: True if the model should still be loaded
+        """
+        if self._last is None or not isinstance(self.value, int):
+            return False
+
+        if now is None:
+            now = time.monotonic()
+
+        return now - self._last < self.value
+
+
+@dataclass
+class ModelStatus:
+    """
+    The state of the model on the Ollama server
+    """
+
+    loaded: bool
+    """Whether the model is loaded in memory"""
+    latency: float
+    """Seconds taken by the server to respond to the probe"""
+    expires_at: str | None = None
+    """When the server will unload the model"""
+    size_vram: int | None = None
+    """Bytes of GPU memory used by the model"""
 
 
 class OllamaAPI(_APIManager):
@@ -23,10 +369,113 @@ class OllamaAPI(_APIManager):
 
     active = all([_OLLAMA_SERVER, _OLLAMA_PORT, _OLLAMA_MODEL])
 
+    _limiter = bucket_from_env("OLLAMA", rate=0)
+    _max_retries = int(os.getenv("OLLAMA_MAX_RETRIES", "1"))
+
+    _timeout = httpx.Timeout(
+        float(os.getenv("OLLAMA_TIMEOUT", "120")), connect=5, pool=15
+    )
+    _probe_timeout = httpx.Timeout(5)
+    """Timeouts of health probes"""
+    _load_timeout = httpx.Timeout(
+        float(os.getenv("OLLAMA_LOAD_TIMEOUT", "300")), connect=5, pool=15
+    )
+    """Timeouts of model loads"""
+
+    keep_alive = KeepAlivePolicy(
+        minimum=int(os.getenv("OLLAMA_KEEP_ALIVE_MIN", "300")),
+        maximum=int(os.getenv("OLLAMA_KEEP_ALIVE_MAX", "7200")),
+        fixed=_OLLAMA_KEEP_ALIVE,
+    )
+    """Keep alive policy shared by all Ollama managers"""
+
+    queue = LLMQueue(
+        concurrency=int(os.getenv("OLLAMA_CONCURRENCY", "1")),
+        max_depth=int(os.getenv("OLLAMA_QUEUE_DEPTH", "8")),
+    )
+    """Dispatch queue shared by all Ollama managers"""
+
     def __init__(self):
         logger.debug("Using Ollama: %s", self.active)
 
-    async def generate_single_response(self, prompt: str) -> str | None:
+    async def warm_up(self) -> bool:
+        """
+        Load the model on the Ollama server ahead of its first use
+
+        :return: Whether the model was loaded
+        """
+        url = f"http://{_OLLAMA_SERVER}:{_OLLAMA_PORT}/api/generate"
+
+        if not self.active:
+            return False
+
+        start = time.perf_counter()
+        payload = {"model": _OLLAMA_MODEL, "keep_alive": self.keep_alive.value}
+        data: dict[str, Any] | None = await self._request(
+            RequestAction.POST, url, payload, timeout=self._load_timeout
+        )
+        if data is None or "error" in data:
+            logger.warning("Failed to load model %s", _OLLAMA_MODEL)
+            return False
+
+        logger.info(
+            "Loaded model %s in %.2fs", _OLLAMA_MODEL, time.perf_counter() - start
+        )
+        return True
+
+    async def probe(self) -> ModelStatus | None:
+        """
+        Check the health of the Ollama server and whether the model is loaded
+
+        :return: The model status or None if the server is unreachable
+        """
+        url = f"http://{_OLLAMA_SERVER}:{_OLLAMA_PORT}/api/ps"
+
+        if not self.active:
+            return None
+
+        start = time.perf_counter()
+        data: dict[str, Any] | None = await self._request(
+            RequestAction.GET, url, None, timeout=self._probe_timeout
+        )
+        latency = time.perf_counter() - start
+        if data is None or not isinstance(data.get("models"), list):
+            logger.warning("Ollama server health probe failed")
+            return None
+
+        names = {_OLLAMA_MODEL, f"{_OLLAMA_MODEL}:latest"}
+        for model in data["models"]:
+            if model.get("name") in names or model.get("model") in names:
+                return ModelStatus(
+                    True, latency, model.get("expires_at"), model.get("size_vram")
+                )
+
+        return ModelStatus(False, latency)
+
+    async def generate_single_response(
+        self,
+        prompt: str,
+        *,
+        priority: LLMPriority = LLMPriority.ANNOUNCEMENT,
+        key: str | None = None,
+    ) -> str | None:
+        """
+        Send a prompt to the Ollama server to have a response
+        generated
+
+        :param prompt: The prompt to send to the Ollama server
+        :param priority: The queue priority of the request, defaults to ANNOUNCEMENT
+        :param key: Requests sharing a key share one generation, defaults to None
+        :return: The returned response or None
+        """
+        if not self.active:
+            return None
+
+        return await self.queue.submit(
+            priority, lambda: self._generate_single_response(prompt), key=key
+        )
+
+    async def _generate_single_response(self, prompt: str) -> str | None:
         """
         Send a prompt to the Ollama server to have a response
         generated
@@ -39,7 +488,12 @@ class OllamaAPI(_APIManager):
         if not self.active:
             return None
 
-        payload = {"model": _OLLAMA_MODEL, "prompt": prompt, "stream": False}
+        payload = {
+            "model": _OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive.observe(),
+        }
 
         data: dict[str, str] | None = await self._request(
             RequestAction.POST, url, payload
@@ -50,6 +504,27 @@ class OllamaAPI(_APIManager):
         return None
 
     async def generate_chat_response(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        priority: LLMPriority = LLMPriority.MENTION,
+    ) -> str | None:
+        """
+        Sends a collection of messages to the Ollama server to have a response
+        generated
+
+        :param messages: The messages to send to the server
+        :param priority: The queue priority of the request, defaults to MENTION
+        :return: The returned response or None
+        """
+        if not self.active:
+            return None
+
+        return await self.queue.submit(
+            priority, lambda: self._generate_chat_response(messages)
+        )
+
+    async def _generate_chat_response(
         self, messages: list[dict[str, str]]
     ) -> str | None:
         """
@@ -65,7 +540,12 @@ class OllamaAPI(_APIManager):
         if not self.active:
             return None
 
-        payload = {"model": _OLLAMA_MODEL, "messages": messages, "stream": False}
+        payload = {
+            "model": _OLLAMA_MODEL,
+            "messages": messages,
+            "stream": False,
+            "keep_alive": self.keep_alive.observe(),
+        }
 
         data: dict[str, str | dict] | None = await self._request(
             RequestAction.POST, url, payload
@@ -74,3 +554,73 @@ class OllamaAPI(_APIManager):
             return data["message"]["content"]
 
         return None
+
+    async def stream_single_response(
+        self, prompt: str, *, priority: LLMPriority = LLMPriority.ANNOUNCEMENT
+    ) -> AsyncGenerator[str, None]:
+        """
+        Send a prompt to the Ollama server and stream the generated
+        response as it is produced. A queue slot is held while streaming.
+
+        :param prompt: The prompt to send to the Ollama server
+        :param priority: The queue priority of the request, defaults to ANNOUNCEMENT
+        :yield: Each fragment of the response
+        """
+        url = f"http://{_OLLAMA_SERVER}:{_OLLAMA_PORT}/api/generate"
+
+        if not self.active:
+            return
+
+        payload = {
+            "model": _OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive.observe(),
+        }
+
+        async with self.queue.slot(priority) as granted:
+            if not granted:
+                return
+
+            chunk: dict[str, Any]
+            async for chunk in self._stream(RequestAction.POST, url, payload):
+                if fragment := chunk.get("response"):
+                    yield fragment
+
+    async def stream_chat_response(
+        self,
+        messages: list[dict[str, str]],
+        *,
+        priority: LLMPriority = LLMPriority.MENTION,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Sends a collection of messages to the Ollama server and streams the
+        generated response as it is produced. A queue slot is held while
+        streaming.
+
+        :param messages: The messages to send to the server
+        :param priority: The queue priority of the request, defaults to MENTION
+        :yield: Each fragment of the response
+        """
+
+        url = f"http://{_OLLAMA_SERVER}:{_OLLAMA_PORT}/api/chat"
+
+        if not self.active:
+            return
+
+        payload = {
+            "model": _OLLAMA_MODEL,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive.observe(),
+        }
+
+        async with self.queue.slot(priority) as granted:
+            if not granted:
+                return
+
+            chunk: dict[str, Any]
+            async for chunk in self._stream(RequestAction.POST, url, payload):
+                message = chunk.get("message")
+                if isinstance(message, dict) and (fragment := message.get("content")):
+                    yield fragment
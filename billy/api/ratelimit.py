@@ -0,0 +1,126 @@
+"""
+Request rate limiting and retry backoff
+"""
+
+import os
+import time
+import random
+import asyncio
+import datetime
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """
+    An asyncio token bucket used to pace requests to an API server.
+    Waiters are served in the order they called `acquire`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """
+        Class initializer
+
+        :param rate: The number of tokens added to the bucket per second
+        :param capacity: The maximum number of stored tokens, defaults to `rate`
+        """
+        self.rate = rate
+        self.capacity = max(rate, 1.0) if capacity is None else capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """
+        Add the tokens accumulated since the last refill
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a period of time. Used when the server
+        reports that the client is being rate limited.
+
+        :param seconds: The time to pause for
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Wait until the requested number of tokens are available and
+        remove them from the bucket
+
+        :param tokens: The number of tokens to take, defaults to 1.0
+        """
+        async with self._lock:
+            while (delay := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+
+            self._tokens -= tokens
+
+
+def bucket_from_env(
+    prefix: str, rate: float, capacity: float | None = None
+) -> TokenBucket | None:
+    """
+    Build a token bucket for a host using the `{prefix}_RATE_LIMIT` and
+    `{prefix}_BURST` environment variables. A rate limit of `0` disables
+    rate limiting for the host.
+
+    :param prefix: The environment variable prefix for the host
+    :param rate: The default requests per second
+    :param capacity: The default burst size, defaults to `rate`
+    :return: The token bucket or None
+    """
+    rate_ = float(os.getenv(f"{prefix}_RATE_LIMIT", str(rate)))
+    if rate_ <= 0:
+        return None
+
+    burst = os.getenv(f"{prefix}_BURST")
+    return TokenBucket(rate_, float(burst) if burst else capacity)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, maximum: float = 30.0) -> float:
+    """
+    Calculate a jittered exponential backoff delay
+
+    :param attempt: The number of the failed attempt, starting at 0
+    :param base: The delay of the first attempt, defaults to 0.5
+    :param maximum: The largest possible delay, defaults to 30.0
+    :return: The delay in seconds
+    """
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse the value of a `Retry-After` header
+
+    :param value: The header value in seconds or as an HTTP date
+    :return: The delay in seconds or None
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_time = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    return max(0.0, (retry_time - now).total_seconds())
@@ -3,20 +3,27 @@ Program primary execution
 """
 
 import os
+import time
 import logging
 import datetime
 import asyncio
-import random
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Coroutine
 
 import discord
 import discord.ext
 import discord.ext.tasks
-import timezonefinder
 import pytz
 
-from .database import DatabaseManager, DiscordServer
+from .database import DatabaseManager, DiscordServer, RaceSnapshot
 from .api import OllamaAPI, MultiGPAPI
+from .sync import SyncEngine, RaceRecord
+from .timezones import TimezoneService
+from .scheduler import EventScheduler, EventAction
+from .messages import CachedMessage, MessageCache, MessageFilter
+from .context import ContextBuilder
+from .announcements import AnnouncementService
+from .supervisor import TaskSupervisor
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +31,135 @@ intents = discord.Intents.default()
 intents.message_content = True
 client = discord.Client(intents=intents)
 tree = discord.app_commands.CommandTree(client)
-tf = timezonefinder.TimezoneFinder()
+timezones = TimezoneService(in_memory=bool(os.getenv("TIMEZONE_IN_MEMORY")))
 
 _filepath = os.getenv("DB_PATH", "/billy/files/database.db")
-db = DatabaseManager(filename=_filepath)
+db = DatabaseManager(
+    filename=_filepath,
+    tuned=os.getenv("DB_TUNED", "1") != "0",
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+)
 
 multigp = MultiGPAPI()
 ollama = OllamaAPI()
+announcements = AnnouncementService(
+    ollama,
+    variants=int(os.getenv("ANNOUNCEMENT_VARIANTS", "1")),
+    store=db,
+    draft_interval=float(os.getenv("ANNOUNCEMENT_DRAFT_INTERVAL", "0")),
+)
 
 bot_name = os.getenv("BOT_NAME", "Billy")
 
+_stream_replies = os.getenv("OLLAMA_STREAM", "1") != "0"
+"""Stream generated replies into discord as they are produced"""
+_stream_edit_interval = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+"""Minimum seconds between edits of a streamed reply"""
+_MESSAGE_LIMIT = 2000
+"""Maximum length of a discord message"""
+
+message_cache = MessageCache(
+    maxsize=int(os.getenv("MESSAGE_CACHE_SIZE", "4096")),
+    max_depth=int(os.getenv("MESSAGE_CONTEXT_DEPTH", "20")),
+)
+message_filter = MessageFilter(message_cache)
+context_builder = ContextBuilder(
+    int(os.getenv("PROMPT_TOKEN_BUDGET", "1536")),
+    system_prompt=os.getenv("OLLAMA_SYSTEM_PROMPT"),
+)
+
+_status_lookback = datetime.timedelta(
+    hours=float(os.getenv("EVENT_STATUS_LOOKBACK_HOURS", "24"))
+)
+"""How long after an event's end its status is still checked"""
+
+supervisor = TaskSupervisor()
+supervisor.group(
+    "announcements",
+    concurrency=int(os.getenv("ANNOUNCEMENT_CONCURRENCY", "4")),
+    max_pending=int(os.getenv("ANNOUNCEMENT_BACKLOG", "256")),
+)
+supervisor.group("backfill", concurrency=int(os.getenv("BACKFILL_CONCURRENCY", "1")))
+_backfill_horizon = datetime.timedelta(
+    days=float(os.getenv("BACKFILL_HORIZON_DAYS", "90"))
+)
+"""How far ahead the first activation backfill processes races"""
+_backfill_batch_size = int(os.getenv("BACKFILL_BATCH_SIZE", "25"))
+"""Number of races processed between saves of the backfill progress"""
+_shutdown_timeout = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+"""Seconds to wait for background tasks to finish when stopping"""
+
+_sync_pass_seconds = metrics.histogram(
+    "billy_sync_pass_seconds",
+    "Duration of MultiGP sync passes",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+_sync_races = metrics.counter(
+    "billy_sync_races_total", "Races changed by sync passes", ("change",)
+)
+_sync_failed_chapters = metrics.counter(
+    "billy_sync_failed_chapters_total", "Chapters whose race list could not be pulled"
+)
+metrics.gauge(
+    "billy_messages_total",
+    "Messages by filter decision",
+    lambda: {
+        "filtered": message_filter.filtered,
+        "processed": message_filter.processed,
+        "lookup": message_filter.lookups,
+    },
+    kind="counter",
+    label="decision",
+)
+metrics.gauge(
+    "billy_message_cache_total",
+    "Message cache lookups, misses are fetch_message calls",
+    lambda: {"hit": message_cache.hits, "miss": message_cache.misses},
+    kind="counter",
+    label="result",
+)
+metrics.gauge(
+    "billy_llm_queue",
+    "Ollama dispatch queue statistics",
+    OllamaAPI.queue.stats,
+    label="stat",
+)
+metrics.gauge(
+    "billy_api_cache_total",
+    "MultiGP response cache lookups",
+    lambda: {"hit": MultiGPAPI.cache.hits, "miss": MultiGPAPI.cache.misses},
+    kind="counter",
+    label="result",
+)
+metrics.gauge(
+    "billy_scheduled_event_actions",
+    "Pending event status changes",
+    lambda: len(scheduler),
+)
+metrics.gauge(
+    "billy_background_tasks",
+    "Running background tasks by group",
+    supervisor.running,
+    label="group",
+)
+metrics.gauge(
+    "billy_background_task_failures_total",
+    "Failed background tasks by group",
+    lambda: {name: stats.failed for name, stats in supervisor.stats().items()},
+    kind="counter",
+    label="group",
+)
+metrics.gauge(
+    "billy_background_task_seconds_total",
+    "Total run time of background tasks by group",
+    lambda: {name: stats.run_time for name, stats in supervisor.stats().items()},
+    kind="counter",
+    label="group",
+)
+
+_login_start: float | None = None  # pylint: disable=C0103
+"""Time the discord login started, used for startup timing"""
+
 
 @tree.command(
     name="activate",
@@ -48,11 +174,18 @@ async def set_bot_configuration(
     Sets the configurations for the server
     """
     if interaction.guild is not None:
+        await interaction.response.defer()
+
+        now = datetime.datetime.now(tz=pytz.utc).replace(tzinfo=None)
         chapter_info = await db.set_server_configuration(
-            interaction.guild.id, channel.id, apikey
+            interaction.guild.id,
+            channel.id,
+            apikey,
+            backfill_horizon=now + _backfill_horizon,
         )
         if chapter_info:
-            await interaction.response.send_message(
+            start_backfill(str(chapter_info["chapterId"]))
+            await interaction.followup.send(
                 (
                     f"API key recongized. {chapter_info['chapterName']} has been set as the "
                     f"server's chapter and <#{channel.id}> will be used for announcements."
@@ -60,7 +193,7 @@ async def set_bot_configuration(
             )
             logger.info("Data for %s has been updated", chapter_info["chapterName"])
         else:
-            await interaction.response.send_message("API Key not recongized.")
+            await interaction.followup.send("API Key not recongized.")
             logger.warning("Failed to update server info: Bad chapter API key")
 
 
@@ -69,14 +202,32 @@ async def on_ready() -> None:
     """
     Event called when server is ready
     """
+    global _login_start  # pylint: disable=W0603
+
     await tree.sync(guild=None)
     logger.info("Logged in as %s", client.user)
 
-    events_sync.start()
-    update_event_status.start()
+    if _login_start is not None:
+        logger.info(
+            "Startup phase %s took %.3fs", "login", time.perf_counter() - _login_start
+        )
+        _login_start = None
+
+    if not events_sync.is_running():
+        events_sync.start()
+
+    if ollama.active and not model_monitor.is_running():
+        model_monitor.start()
+
+    if ollama.active:
+        announcements.start()
+
+    await update_event_status()
+    await load_event_schedule()
+    scheduler.start()
 
 
-def format_message(message: discord.Message) -> dict[str, str]:
+def format_message(message: CachedMessage) -> dict[str, str]:
     """
     Formats a discord message for the Ollama chat api
 
@@ -88,7 +239,7 @@ def format_message(message: discord.Message) -> dict[str, str]:
         return {}
 
     message_ = {
-        "role": "assistant" if message.author.id == client.user.id else "user",
+        "role": "assistant" if message.author_id == client.user.id else "user",
         "content": message.content.replace(f"<@{client.user.id}>", bot_name),
     }
 
@@ -97,85 +248,121 @@ def format_message(message: discord.Message) -> dict[str, str]:
 
 async def generate_message_collection(message: discord.Message) -> list[dict[str, str]]:
     """
-    Get a collection of message history
+    Get a collection of message history, fit to the prompt token budget
 
     :param message: The latest message
     :return: The returned collection
     """
 
-    collection: list[dict] = []
+    return context_builder.build(
+        [
+            format_message(message_)
+            for message_ in await message_cache.conversation(message)
+        ]
+    )
 
-    collection.insert(0, format_message(message))
 
-    if message.reference is not None:
+@client.event
+async def on_message(message: discord.Message) -> None:
+    """
+    Process recieved messages
 
-        next_id = message.reference.message_id
-        while next_id:
-            message = await message.channel.fetch_message(next_id)
-            collection.insert(0, format_message(message))
+    :param message: The recieved message
+    """
 
-            if message.reference is None:
-                next_id = None
-            else:
-                next_id = message.reference.message_id
+    bot_id = client.user.id if client.user is not None else None
+    decided, priority = message_filter.fast_check(message, bot_id, ollama.active)
+    if not ollama.active:
+        return
 
-    return collection
+    message_cache.add(message)
 
+    if not decided and bot_id is not None:
+        priority = await message_filter.lookup(message, bot_id)
+    if priority is None:
+        return
 
-async def generate_response_checks(
-    message: discord.Message,
-) -> AsyncGenerator[bool, None]:
-    """
-    Generate a series of checks that when passing, allow
-    for the discord bot to respond with a generated
-    message.
+    logger.info("Message recieved")
+    logger.debug(message.content)
 
-    :param message: The discord message recieved
-    :yield: The status of the checks
-    """
+    messages = await generate_message_collection(message)
 
-    if client.user is not None:
+    if _stream_replies:
+        reply = await send_streamed_reply(
+            message, ollama.stream_chat_response(messages, priority=priority)
+        )
+        if reply is not None:
+            logger.info("Message reply sent")
+        return
 
-        yield ollama.active
-        yield client.user.id != message.author.id
+    recieved_message = await ollama.generate_chat_response(messages, priority=priority)
 
-        invoked = str(client.user.id) in message.content
+    if recieved_message is not None:
+        message_cache.add(await message.reply(recieved_message))
+        logger.info("Message reply sent")
 
-        if message.reference is not None and message.reference.message_id is not None:
-            message_ = await message.channel.fetch_message(message.reference.message_id)
-            replied = message_.author.id == client.user.id
-        else:
-            replied = False
 
-        random_response = random.random() < 0.002
+@client.event
+async def on_message_edit(_: discord.Message, after: discord.Message) -> None:
+    """
+    Keep cached messages up to date with their edits
 
-        yield invoked or replied or random_response
+    :param after: The edited message
+    """
 
-    else:
-        yield False
+    if after.id in message_cache:
+        message_cache.add(after)
 
 
 @client.event
-async def on_message(message: discord.Message) -> None:
+async def on_message_delete(message: discord.Message) -> None:
     """
-    Process recieved messages
+    Remove deleted messages from the message cache
 
-    :param message: The recieved message
+    :param message: The deleted message
     """
 
-    async for check in generate_response_checks(message):
-        if not check:
-            return
+    message_cache.discard(message.id)
 
-    logger.info("Message recieved")
-    logger.debug(message.content)
 
-    messages = await generate_message_collection(message)
-    recieved_message = await ollama.generate_chat_response(messages)
+async def send_streamed_reply(
+    message: discord.Message, fragments: AsyncGenerator[str, None]
+) -> discord.Message | None:
+    """
+    Reply to a message as soon as the first fragment of a generated response
+    arrives, then edit the reply in place as the rest is received. Edits are
+    throttled to stay within discord's rate limits.
 
-    if recieved_message is not None:
-        await message.reply(recieved_message)
-        logger.info("Message reply sent")
+    :param message: The message to reply to
+    :param fragments: The fragments of the generated response
+    :return: The sent reply or None
+    """
+    reply: discord.Message | None = None
+    content = sent = ""
+    last_edit = 0.0
+
+    async for fragment in fragments:
+        content = (content + fragment)[:_MESSAGE_LIMIT]
+        if not content.strip():
+            continue
+
+        if reply is None:
+            reply = await message.reply(content)
+        elif time.monotonic() - last_edit >= _stream_edit_interval:
+            reply = await reply.edit(content=content)
+        else:
+            continue
+
+        sent = content
+        last_edit = time.monotonic()
+
+    if reply is not None and content != sent:
+        reply = await reply.edit(content=content)
+
+    if reply is not None:
+        message_cache.add(reply)
+
+    return reply
 
 
 @client.event
@@ -198,47 +385,28 @@ async def on_guild_remove(guild: discord.Guild) -> None:
 
 
 async def add_race_checks(
-    server: DiscordServer, race_id: str, race_name: str, api_key: str
+    server: DiscordServer, snapshot: RaceSnapshot
 ) -> tuple[bool, discord.ScheduledEvent | None]:
     """
     Checks for adding race to database
 
     :param server: Discord server associated with the checks
-    :param race_id: The id of the race
-    :param race_name: The race name
-    :param api_key: The chapter api key
+    :param snapshot: The snapshot of the race
     :return: The status and generated event (if created)
     """
 
-    race_data = await multigp.pull_race_data(race_id, api_key)
-
-    await asyncio.sleep(0.2)
-
-    if race_data is None:
-        return False, None
-
-    local_tz = tf.timezone_at(
-        lat=float(race_data["latitude"]), lng=float(race_data["longitude"])
-    )
-    if local_tz is None:
+    if (
+        snapshot.timezone is None
+        or snapshot.start_time is None
+        or snapshot.end_time is None
+    ):
         return False, None
 
-    race_starttime = datetime.datetime.strptime(
-        race_data["startDate"], "%Y-%m-%d %I:%M %p"
-    )
-    starttime_obj = pytz.timezone(local_tz).localize(race_starttime)
-
-    if race_data["endDate"]:
-        race_endtime = datetime.datetime.strptime(
-            race_data["endDate"], "%Y-%m-%d %I:%M %p"
-        )
-        endtime_obj = pytz.timezone(local_tz).localize(race_endtime)
-        if starttime_obj >= endtime_obj:
-            endtime_obj = starttime_obj + datetime.timedelta(hours=3)
-    else:
-        endtime_obj = starttime_obj + datetime.timedelta(hours=3)
+    local_tz = timezones.zone(snapshot.timezone)
+    starttime_obj = pytz.utc.localize(snapshot.start_time).astimezone(local_tz)
+    endtime_obj = pytz.utc.localize(snapshot.end_time).astimezone(local_tz)
 
-    current_date = datetime.datetime.now(tz=pytz.timezone(local_tz))
+    current_date = datetime.datetime.now(tz=local_tz)
     start_range = datetime.time(hour=8, tzinfo=current_date.tzinfo)
     end_range = datetime.time(hour=20, tzinfo=current_date.tzinfo)
 
@@ -250,8 +418,8 @@ async def add_race_checks(
 
     event_desciption = (
         "[Sign Up on MultiGP]"
-        f"(https://www.multigp.com/races/view/?race={race_id})"
-        f"\n\n{race_data['content']}"
+        f"(https://www.multigp.com/races/view/?race={snapshot.race_id})"
+        f"\n\n{snapshot.description}"
     )
 
     guild = client.get_guild(server.server_id)
@@ -259,20 +427,23 @@ async def add_race_checks(
         return True, None
 
     event = await guild.create_scheduled_event(
-        name=race_name,
+        name=snapshot.name,
         description=event_desciption,
         start_time=starttime_obj,
         end_time=endtime_obj,
         privacy_level=discord.PrivacyLevel.guild_only,
         entity_type=discord.EntityType.external,
-        location=race_data["courseName"],
+        location=snapshot.course_name,
     )
     logger.info("Scheduled new event")
 
+    scheduler.schedule(guild.id, event.id, starttime_obj, endtime_obj)
+
     if ollama.active:
-        loop = asyncio.get_running_loop()
-        loop.create_task(
-            generate_and_send(server, race_data, race_name, race_starttime, event)
+        supervisor.spawn(
+            "announcements",
+            generate_and_send(server, snapshot, starttime_obj, event),
+            name=f"announce-{snapshot.race_id}-{server.server_id}",
         )
 
     return True, event
@@ -280,8 +451,7 @@ async def add_race_checks(
 
 async def generate_and_send(
     server: DiscordServer,
-    race_data: dict,
-    race_name: str,
+    snapshot: RaceSnapshot,
     race_starttime: datetime.datetime,
     event: discord.ScheduledEvent,
 ) -> None:
@@ -289,114 +459,357 @@ async def generate_and_send(
     Sends an announcement message to the server
 
     :param server: The server to announce to
-    :param race_data: The event data
-    :param race_name: The event name
-    :param race_starttime: The race datetime object
+    :param snapshot: The snapshot of the race
+    :param race_starttime: The local race datetime object
     :param event: The discord event
     """
     channel = client.get_channel(server.channel_id)
     if not isinstance(channel, discord.TextChannel):
         return
 
-    prompt = (
-        "Cleverly announce an upcoming drone racing event "
-        f"called {race_name} to the members of drone racing group "
-        f"named {race_data['chapterName']}. It will occur on "
-        f"{race_starttime.year}-{race_starttime.month}-{race_starttime.day}."
+    recieved_message = await announcements.get(
+        snapshot, race_starttime.date(), server.server_id
     )
-
-    recieved_message = await ollama.generate_single_response(prompt)
     if recieved_message:
         await channel.send(content=f"@everyone {recieved_message}\n{event.url}")
         logger.info("Announced new event")
         logger.debug(recieved_message)
 
 
+async def sync_new_race(
+    servers: list[DiscordServer], snapshot: RaceSnapshot
+) -> list[RaceRecord] | None:
+    """
+    Run the race checks for each server bound to the race's chapter
+
+    :param servers: The servers bound to the chapter
+    :param snapshot: The snapshot of the race
+    :return: The race entries to save or None
+    """
+    if snapshot.timezone is not None and snapshot.start_time is not None:
+        local_start = pytz.utc.localize(snapshot.start_time).astimezone(
+            timezones.zone(snapshot.timezone)
+        )
+        announcements.enqueue(snapshot, local_start.date())
+
+    records: list[RaceRecord] = []
+    failed = False
+    for server in servers:
+        try:
+            add_status, event = await add_race_checks(server, snapshot)
+        except discord.HTTPException as ex:
+            logger.error(
+                "Failed to create event for race %s in server %s: %s",
+                snapshot.race_id,
+                server.server_id,
+                ex,
+            )
+            failed = True
+            continue
+
+        if add_status is False:
+            failed = True
+            continue
+        if event is not None:
+            records.append(
+                (
+                    snapshot.race_id,
+                    snapshot.chapter_id,
+                    event.id,
+                    snapshot.start_time,
+                    snapshot.end_time,
+                )
+            )
+
+    # Check the race again next pass unless an event was created somewhere
+    if failed and not records:
+        return None
+
+    if not records:
+        records.append(
+            (
+                snapshot.race_id,
+                snapshot.chapter_id,
+                None,
+                snapshot.start_time,
+                snapshot.end_time,
+            )
+        )
+
+    return records
+
+
+sync_engine = SyncEngine(
+    db,
+    multigp,
+    sync_new_race,
+    timezones,
+    concurrency=int(os.getenv("SYNC_CONCURRENCY", "4")),
+    detail_concurrency=int(os.getenv("SYNC_DETAIL_CONCURRENCY", "8")),
+)
+
+
+def start_backfill(chapter_id: str) -> None:
+    """
+    Run a chapter's pending backfill in the background. Chapters that were
+    already backfilled are not processed again.
+
+    :param chapter_id: The id of the chapter
+    """
+    supervisor.spawn(
+        "backfill",
+        sync_engine.backfill(chapter_id, batch_size=_backfill_batch_size),
+        name=f"backfill-{chapter_id}",
+    )
+
+
+async def resume_backfills() -> None:
+    """
+    Restart the backfills that have not completed
+    """
+    for backfill in await db.get_pending_backfills():
+        supervisor.spawn(
+            "backfill",
+            sync_engine.backfill(backfill.chapter_id, batch_size=_backfill_batch_size),
+            name=f"backfill-{backfill.chapter_id}",
+        )
+
+
 @discord.ext.tasks.loop(hours=3)
 async def events_sync() -> None:
     """
-    Pulls data from MultiGP to sync with the local database
+    Pulls data from MultiGP to sync with the local database. Chapters that
+    are still being backfilled are skipped, and their backfills are resumed.
 
     This task should be replaced with a webhook if possible
     """
-    async for server in db.get_servers():
+    await resume_backfills()
+    stats = await sync_engine.run_pass()
 
-        db_races = await db.get_chapter_race_ids(server.chapter_id)
-        mgp_races = await multigp.pull_races(server.chapter_id, server.api_key)
+    _sync_pass_seconds.observe(stats.duration)
+    _sync_races.inc(stats.added_races, change="added")
+    _sync_races.inc(stats.removed_races, change="removed")
+    _sync_failed_chapters.inc(stats.failed_chapters)
 
-        await asyncio.sleep(0.5)
 
-        if mgp_races is None:
-            continue
+@discord.ext.tasks.loop(seconds=float(os.getenv("OLLAMA_PROBE_INTERVAL", "300")))
+async def model_monitor() -> None:
+    """
+    Probes the Ollama server, loading the model on the first run and
+    reloading it if it was unloaded while requests are still expected
+    """
+    status = await ollama.probe()
+    if status is None:
+        return
+
+    logger.debug(
+        "Ollama probe took %.3fs (model loaded: %s)", status.latency, status.loaded
+    )
 
-        new_races: list[tuple[str, str, int | None]] = []
-        for race in mgp_races:
-            if race["id"] not in db_races:
+    if not status.loaded and (
+        model_monitor.current_loop == 0 or ollama.keep_alive.expects_traffic()
+    ):
+        await ollama.warm_up()
 
-                add_status, event = await add_race_checks(
-                    server, race["id"], race["name"], server.api_key
-                )
-                if add_status is False:
-                    continue
-                if event is None:
-                    new_races.append((race["id"], server.chapter_id, None))
-                else:
-                    new_races.append((race["id"], server.chapter_id, event.id))
 
-        await db.add_chapter_races(new_races)
+def _to_utc(value: datetime.datetime) -> datetime.datetime:
+    """
+    Convert an aware datetime to a naive UTC datetime for storage
+
+    :param value: The datetime to convert
+    :return: The converted datetime
+    """
+    return value.astimezone(pytz.utc).replace(tzinfo=None)
+
 
-        old_races: list[str] = []
-        mgp_races_: set[str] = {race["id"] for race in mgp_races}
-        for race_ in db_races:
-            if race_ not in mgp_races_:
-                old_races.append(race_)
-        await db.remove_events_by_event_id(old_races)
+async def _start_and_end(event: discord.ScheduledEvent) -> None:
+    """
+    Start and then end an event whose whole window passed while offline
+
+    :param event: The discord event
+    """
+    event = await event.start()
+    await event.end()
 
 
-@discord.ext.tasks.loop(minutes=15)
 async def update_event_status() -> None:
     """
-    Periodically
+    Start and end the discord events of races that are overdue. Used at
+    startup to catch up on status changes missed while offline.
     """
-    async for race in db.get_races():
-        if race.event_id is None:
+    now = datetime.datetime.now().astimezone()
+    races = await db.get_active_races(_to_utc(now), _status_lookback)
+
+    transitions: list[tuple[int, Coroutine]] = []
+    event_times: list[tuple[int, datetime.datetime, datetime.datetime | None]] = []
+    for race, server in races:
+
+        if (guild := client.get_guild(server.server_id)) is None:
             continue
 
-        servers: list[DiscordServer] | None = await race.awaitable_attrs.servers
+        if (event := guild.get_scheduled_event(race.discord_event_id)) is None:
+            continue
+
+        if race.start_time is None:
+            event_times.append(
+                (
+                    event.id,
+                    _to_utc(event.start_time),
+                    None if event.end_time is None else _to_utc(event.end_time),
+                )
+            )
+
+        if event.status == discord.EventStatus.scheduled and now > event.start_time:
+            if event.end_time is not None and now > event.end_time:
+                transitions.append((event.id, _start_and_end(event)))
+            else:
+                transitions.append((event.id, event.start()))
+        elif (
+            event.status == discord.EventStatus.active
+            and event.end_time is not None
+            and now > event.end_time
+        ):
+            transitions.append((event.id, event.end()))
+
+    results = await asyncio.gather(
+        *(transition for _, transition in transitions), return_exceptions=True
+    )
+    for (event_id, _), result in zip(transitions, results):
+        if isinstance(result, BaseException):
+            logger.error("Failed to update status of event %s: %s", event_id, result)
+
+    await db.set_event_times(event_times)
+
+
+async def load_event_schedule() -> None:
+    """
+    Schedule the status changes of all discord events that have not ended
+    """
+    now = datetime.datetime.now().astimezone()
+    for race, server in await db.get_upcoming_races(_to_utc(now)):
+
+        if (guild := client.get_guild(server.server_id)) is None:
+            continue
 
-        if servers is None:
+        if (event := guild.get_scheduled_event(race.discord_event_id)) is None:
             continue
 
-        for server in servers:
+        scheduler.schedule(guild.id, event.id, event.start_time, event.end_time)
+
+    logger.info("Loaded %d scheduled event status changes", len(scheduler))
+
+
+async def apply_event_action(guild_id: int, event_id: int, action: EventAction) -> None:
+    """
+    Start or end a discord event when its scheduled time is reached. If the
+    event's time was moved later, it is scheduled again instead.
+
+    :param guild_id: The id of the discord server
+    :param event_id: The id of the discord event
+    :param action: The action to apply
+    """
+    if (guild := client.get_guild(guild_id)) is None:
+        return
+
+    if (event := guild.get_scheduled_event(event_id)) is None:
+        return
+
+    now = datetime.datetime.now().astimezone()
+    due_time = event.start_time if action == EventAction.START else event.end_time
+    if due_time is not None and now < due_time:
+        scheduler.schedule(guild_id, event_id, event.start_time, event.end_time)
+        return
+
+    if event.status == discord.EventStatus.scheduled:
+        event = await event.start()
+        logger.info("Started event %s", event_id)
+
+    if action == EventAction.END and event.status == discord.EventStatus.active:
+        await event.end()
+        logger.info("Ended event %s", event_id)
+
+
+scheduler: EventScheduler = EventScheduler(apply_event_action)
+
 
-            if (guild := client.get_guild(server.server_id)) is None:
-                continue
+@client.event
+async def on_scheduled_event_update(
+    before: discord.ScheduledEvent, after: discord.ScheduledEvent
+) -> None:
+    """
+    Keep the schedule in line with changes made to discord events
+
+    :param before: The event before the update
+    :param after: The event after the update
+    """
+    if after.id not in scheduler:
+        return
 
-            event = guild.get_scheduled_event(race.discord_event_id)
-            now = datetime.datetime.now().astimezone()
+    if after.status in (discord.EventStatus.completed, discord.EventStatus.cancelled):
+        scheduler.cancel(after.id)
+    elif (before.start_time, before.end_time) != (after.start_time, after.end_time):
+        scheduler.schedule(after.guild_id, after.id, after.start_time, after.end_time)
 
-            if event is not None:
-                if (
-                    event.status == discord.EventStatus.scheduled
-                    and now > event.start_time
-                ):
-                    await event.start()
-                if (
-                    event.status == discord.EventStatus.active
-                    and event.end_time is not None
-                    and now > event.end_time
-                ):
-                    await event.end()
+
+@client.event
+async def on_scheduled_event_delete(event: discord.ScheduledEvent) -> None:
+    """
+    Remove deleted discord events from the schedule
+
+    :param event: The deleted event
+    """
+    scheduler.cancel(event.id)
 
 
 async def start() -> None:
     """
     Start the discord bot
     """
+    global _login_start  # pylint: disable=W0603
+
     token = os.getenv("TOKEN")
+    timezones.load_in_background()
+
+    phase_start = time.perf_counter()
     await db.setup()
-    if token is not None:
-        logger.info("Starting Billy")
-        await client.start(token)
-    else:
+    logger.info(
+        "Startup phase %s took %.3fs", "database", time.perf_counter() - phase_start
+    )
+
+    if bool(os.getenv("CACHE_PERSIST")):
+        phase_start = time.perf_counter()
+        MultiGPAPI.cache.store = db
+        await MultiGPAPI.cache.load()
+        logger.info(
+            "Startup phase %s took %.3fs", "cache", time.perf_counter() - phase_start
+        )
+
+    metrics_server = None
+    if (metrics_port := os.getenv("METRICS_PORT")) is not None:
+        metrics_server = metrics.MetricsServer(
+            metrics.registry,
+            host=os.getenv("METRICS_HOST", "127.0.0.1"),
+            port=int(metrics_port),
+        )
+        await metrics_server.start()
+
+    if token is None:
         logger.warning("Discord bot token not found")
+        await db.shutdown()
+        return
+
+    logger.info("Starting Billy")
+    _login_start = time.perf_counter()
+    try:
+        await client.start(token)
+    finally:
+        events_sync.cancel()
+        model_monitor.cancel()
+        await supervisor.drain(_shutdown_timeout)
+        await scheduler.stop()
+        await announcements.stop()
+        if not client.is_closed():
+            await client.close()
+        if metrics_server is not None:
+            await metrics_server.stop()
+        await db.shutdown()
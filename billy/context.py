@@ -0,0 +1,110 @@
+"""
+Token budgeted chat context assembly
+"""
+
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ContextBuilder:
+    """
+    Fits a conversation into a token budget before it is sent to the model.
+    The newest turns are kept, older turns are dropped, and the oldest kept
+    turn is cut down to its most recent text when only part of it fits.
+
+    Token counts are estimated from message lengths, which is close enough to
+    keep the prompt within the model's context window without running the
+    model's tokenizer.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        *,
+        system_prompt: str | None = None,
+        chars_per_token: float = 4.0,
+        message_overhead: int = 4,
+        min_partial: int = 16,
+    ) -> None:
+        """
+        Class initializer
+
+        :param budget: Maximum number of prompt tokens
+        :param system_prompt: Instructions sent ahead of every conversation,
+        defaults to None
+        :param chars_per_token: Average characters per token, defaults to 4.0
+        :param message_overhead: Tokens used by the formatting of each message,
+        defaults to 4
+        :param min_partial: Smallest number of tokens worth keeping of a cut
+        message, defaults to 16
+        """
+        self.budget = budget
+        self.system_prompt = system_prompt or None
+        self.chars_per_token = chars_per_token
+        self.message_overhead = message_overhead
+        self.min_partial = min_partial
+        self.trimmed = 0
+        """Number of messages dropped or cut to fit the budget"""
+
+    def estimate(self, message: dict[str, str]) -> int:
+        """
+        Estimate the number of tokens used by a message
+
+        :param message: The chat message
+        :return: The estimated token count
+        """
+        content = message.get("content", "")
+        return math.ceil(len(content) / self.chars_per_token) + self.message_overhead
+
+    def _cut(self, message: dict[str, str], tokens: int) -> dict[str, str]:
+        """
+        Cut a message down to its most recent text
+
+        :param message: The chat message
+        :param tokens: The number of tokens to keep
+        :return: The cut message
+        """
+        length = max(0, int((tokens - self.message_overhead) * self.chars_per_token))
+        content = message.get("content", "")
+        return {**message, "content": "..." + content[len(content) - length :]}
+
+    def build(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
+        """
+        Fit a conversation into the token budget. The system prompt comes
+        first and is never trimmed, keeping the start of every prompt
+        identical so the model server can reuse its evaluation.
+
+        :param messages: The conversation, oldest first
+        :return: The messages to send, oldest first
+        """
+        prefix: list[dict[str, str]] = []
+        if self.system_prompt is not None:
+            prefix.append({"role": "system", "content": self.system_prompt})
+
+        remaining = self.budget - sum(self.estimate(message) for message in prefix)
+
+        kept: list[dict[str, str]] = []
+        trimmed = 0
+        for message in reversed(messages):
+            tokens = self.estimate(message)
+            if tokens <= remaining:
+                kept.append(message)
+                remaining -= tokens
+                continue
+
+            # The latest message is always sent, even if only in part
+            if not kept or remaining >= self.min_partial + self.message_overhead:
+                kept.append(self._cut(message, remaining))
+                trimmed += 1
+
+            break
+
+        trimmed += len(messages) - len(kept)
+        if trimmed:
+            self.trimmed += trimmed
+            logger.debug("Trimmed %d messages to fit the prompt budget", trimmed)
+
+        kept.reverse()
+        return prefix + kept
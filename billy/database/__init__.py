@@ -2,5 +2,12 @@
 Database objects and access
 """
 
-from .objects import DiscordServer, MGPEvent
+from .objects import (
+    DiscordServer,
+    MGPEvent,
+    RaceSnapshot,
+    APICacheEntry,
+    AnnouncementDraft,
+    ChapterBackfill,
+)
 from .managers import DatabaseManager
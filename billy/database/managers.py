@@ -3,17 +3,124 @@ Perform Database transations
 """
 
 import logging
-from collections.abc import AsyncGenerator
+import datetime
+from collections.abc import AsyncGenerator, Callable
+from dataclasses import dataclass, field
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select, delete, update, func
+from sqlalchemy import (
+    select,
+    delete,
+    update,
+    func,
+    or_,
+    bindparam,
+    event,
+    table,
+    column,
+)
+from sqlalchemy.dialects.sqlite import insert, Insert
 
 from ..api import MultiGPAPI
-from .objects import _ObjectBase, DiscordServer, MGPEvent
+from ..metrics import counter, histogram, instrument_methods
+from .migrations import migrate
+from .objects import (
+    DiscordServer,
+    MGPEvent,
+    RaceSnapshot,
+    APICacheEntry,
+    AnnouncementDraft,
+    ChapterBackfill,
+)
 
 logger = logging.getLogger(__name__)
 
 
+_listed_race = table("listed_race", column("race_id"))
+"""Temporary table of the race ids listed for a chapter during reconciliation"""
+
+_INSERT_CHUNK_SIZE = 500
+"""
+Rows per multi-row insert, keeping statements under SQLite's bound variable
+limit
+"""
+
+_RACE_COLUMNS = ("event_id", "chapter_id", "discord_event_id", "start_time", "end_time")
+"""Columns of the race entries passed to reconciliation"""
+
+
+@dataclass
+class ChapterReconciliation:
+    """
+    Changes applied when reconciling a chapter's races
+    """
+
+    added: int = 0
+    """Number of race entries added"""
+    removed: list[str] = field(default_factory=list)
+    """Ids of the races removed"""
+    removed_snapshots: int = 0
+    """Number of race snapshots removed"""
+
+
+def _unsaved_races(races: list[tuple], saved_event_less: set[str]) -> list[tuple]:
+    """
+    Drop the race entries without a discord event that are already saved or
+    repeated. Entries with an event are deduplicated by the unique discord
+    event index, which does not apply to NULL event ids.
+
+    :param races: Race entries as (race id, chapter id, discord event id,
+    start time, end time)
+    :param saved_event_less: Ids of the chapter's saved races without an event
+    :return: The race entries to insert
+    """
+    seen = set(saved_event_less)
+    unsaved = []
+    for race in races:
+        if race[2] is None:
+            if race[0] in seen:
+                continue
+            seen.add(race[0])
+        unsaved.append(race)
+
+    return unsaved
+
+
+def _snapshot_upsert(snapshots: list[RaceSnapshot]) -> Insert:
+    """
+    Build a statement saving race snapshots, replacing the existing snapshot
+    for each race
+
+    :param snapshots: The snapshots to save
+    :return: The insert statement
+    """
+    names = [
+        column_.key for column_ in RaceSnapshot.__table__.columns if column_.key != "id"
+    ]
+    values = [
+        {name: getattr(snapshot, name) for name in names} for snapshot in snapshots
+    ]
+
+    statement = insert(RaceSnapshot).values(values)
+    return statement.on_conflict_do_update(
+        index_elements=[RaceSnapshot.race_id, RaceSnapshot.chapter_id],
+        set_={
+            name: statement.excluded[name]
+            for name in names
+            if name not in ("race_id", "chapter_id")
+        },
+    )
+
+
+@instrument_methods(
+    histogram(
+        "billy_db_call_seconds",
+        "Duration of database manager calls",
+        ("method",),
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    counter("billy_db_errors_total", "Failed database manager calls", ("method",)),
+)
 class DatabaseManager:
     """
     Provides database actions
@@ -21,22 +128,104 @@ class DatabaseManager:
     :return: _description_
     """
 
+    # pylint: disable=R0904
+
     _multigp = MultiGPAPI()
 
-    def __init__(self, *, filename: str = ":memory:") -> None:
+    def __init__(
+        self,
+        *,
+        filename: str = ":memory:",
+        tuned: bool = False,
+        pool_size: int = 5,
+        mmap_size: int = 64 * 1024 * 1024,
+        cache_size: int = 16 * 1024,
+    ) -> None:
         """
         Class initializer
 
+        In tuned mode, file databases use WAL journaling with `synchronous=NORMAL`,
+        memory mapped reads, a larger page cache, and a sized connection pool.
+        Streaming queries are run on a separate read-only engine so readers never
+        block the writer.
+
         :param str filename: The filename to save the database as, defaults to ":memory:"
-        """
-        self.engine = create_async_engine(f"sqlite+aiosqlite:///{filename}", echo=False)
+        :param tuned: Use the tuned performance profile, defaults to False
+        :param pool_size: Connections kept by each engine in tuned mode, defaults to 5
+        :param mmap_size: Bytes of the database to memory map in tuned mode,
+        defaults to 64 MiB
+        :param cache_size: Page cache size in KiB in tuned mode, defaults to 16 MiB
+        """
+        # pylint: disable=R0913
+
+        self._pragmas: dict[str, str | int] = {}
+        engine_kwargs: dict = {}
+        tuned = tuned and filename != ":memory:"
+
+        if tuned:
+            self._pragmas = {
+                "busy_timeout": 5000,
+                "cache_size": -cache_size,
+                "mmap_size": mmap_size,
+                "temp_store": "MEMORY",
+            }
+            engine_kwargs = {"pool_size": pool_size, "max_overflow": 0}
+
+        self.engine = create_async_engine(
+            f"sqlite+aiosqlite:///{filename}", echo=False, **engine_kwargs
+        )
+        event.listen(
+            self.engine.sync_engine,
+            "connect",
+            self._pragma_listener(
+                self._pragmas | {"journal_mode": "WAL", "synchronous": "NORMAL"}
+                if tuned
+                else self._pragmas
+            ),
+        )
+
+        if tuned:
+            self.read_engine = create_async_engine(
+                f"sqlite+aiosqlite:///file:{filename}?mode=ro&uri=true",
+                echo=False,
+                **engine_kwargs,
+            )
+            event.listen(
+                self.read_engine.sync_engine,
+                "connect",
+                self._pragma_listener(self._pragmas | {"query_only": "ON"}),
+            )
+        else:
+            self.read_engine = self.engine
+
         self._session_maker = self.new_session_maker()
+        self._read_session_maker = self.new_session_maker(read_only=True)
+
+    @staticmethod
+    def _pragma_listener(pragmas: dict[str, str | int]) -> Callable:
+        """
+        Build a connection listener that applies pragmas to new connections
+
+        :param pragmas: The pragmas to apply
+        :return: The listener
+        """
+
+        def set_pragmas(dbapi_connection, _) -> None:
+            cursor = dbapi_connection.cursor()
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+        return set_pragmas
 
-    def new_session_maker(self, **kwargs) -> async_sessionmaker[AsyncSession]:
+    def new_session_maker(
+        self, *, read_only: bool = False, **kwargs
+    ) -> async_sessionmaker[AsyncSession]:
         """
         A wrapper for async_sessionmaker with `autoflush`, `autocommit`, and
         `expire_on_commit` set to `False`. Automatically set the engine
 
+        :param read_only: Bind sessions to the read-only engine, defaults to False
         :return async_sessionmaker[AsyncSession]: Session manager used for generating
         new database sessions.
         """
@@ -47,7 +236,8 @@ class DatabaseManager:
 
         kwargs_ = defaults | kwargs
 
-        return async_sessionmaker(self.engine, **kwargs_)
+        engine = self.read_engine if read_only else self.engine
+        return async_sessionmaker(engine, **kwargs_)
 
     async def setup(self) -> None:
         """
@@ -55,7 +245,9 @@ class DatabaseManager:
         """
 
         async with self.engine.begin() as conn:
-            await conn.run_sync(_ObjectBase.metadata.create_all)
+            version = await conn.run_sync(migrate)
+
+        logger.debug("Database schema version %d", version)
 
     async def shutdown(self) -> None:
         """
@@ -63,6 +255,8 @@ class DatabaseManager:
         """
 
         await self.engine.dispose()
+        if self.read_engine is not self.engine:
+            await self.read_engine.dispose()
 
     async def get_server_count_by_chapter(self, chapter_id: str) -> int:
         """
@@ -77,20 +271,29 @@ class DatabaseManager:
             .select_from(DiscordServer)
             .where(DiscordServer.chapter_id == chapter_id)
         )
-        async with self._session_maker() as session:
+        async with self._read_session_maker() as session:
             result = await session.scalar(statement)
 
         return 0 if result is None else result
 
     async def set_server_configuration(
-        self, server_id: int, channel_id: int, mgp_api_key: str
+        self,
+        server_id: int,
+        channel_id: int,
+        mgp_api_key: str,
+        *,
+        backfill_horizon: datetime.datetime | None = None,
     ) -> dict | None:
         """
-        Set configuration values for a discord server
+        Set configuration values for a discord server. When a backfill horizon
+        is given, a pending backfill is recorded for the chapter in the same
+        transaction, unless the chapter already has one.
 
         :param server_id: The discord server to set configs for
         :param channel_id: The id of the announcement channel
         :param mgp_apikey: The MultiGP api key for the chapter
+        :param backfill_horizon: The UTC time after which the chapter's backfill
+        leaves races to the regular sync, defaults to recording no backfill
         :return: The chapter info or None
         """
 
@@ -124,6 +327,23 @@ class DatabaseManager:
                 )
                 await session.execute(modify_statement)
 
+            if backfill_horizon is not None:
+                backfill_statement = (
+                    insert(ChapterBackfill)
+                    .values(
+                        chapter_id=mgp_chapter_id,
+                        horizon=backfill_horizon,
+                        total=0,
+                        processed=0,
+                        deferred=0,
+                        started=datetime.datetime.now(datetime.timezone.utc).replace(
+                            tzinfo=None
+                        ),
+                    )
+                    .on_conflict_do_nothing()
+                )
+                await session.execute(backfill_statement)
+
             await session.commit()
 
         return chapter_info
@@ -139,7 +359,7 @@ class DatabaseManager:
         find_statement = select(DiscordServer).where(
             DiscordServer.server_id == server_id
         )
-        async with self._session_maker() as session:
+        async with self._read_session_maker() as session:
             result = await session.scalar(find_statement)
 
         return result
@@ -151,7 +371,7 @@ class DatabaseManager:
         :yield: Chapters
         """
         statement = select(DiscordServer)
-        async with self._session_maker() as session:
+        async with self._read_session_maker() as session:
             result = await session.stream_scalars(statement)
             async for chapter in result:
                 yield chapter
@@ -165,7 +385,7 @@ class DatabaseManager:
         :yield: Chapters
         """
         statement = select(DiscordServer).where(DiscordServer.chapter_id == chapter_id)
-        async with self._session_maker() as session:
+        async with self._read_session_maker() as session:
             result = await session.stream_scalars(statement)
             async for chapter in result:
                 yield chapter
@@ -182,18 +402,6 @@ class DatabaseManager:
             await session.execute(statement)
             await session.commit()
 
-    async def add_chapter_races(self, races: list[tuple]) -> None:
-        """
-        Adds a collection of races to the database
-
-        :param races: _description_
-        """
-
-        races_ = [MGPEvent(*race) for race in races]
-        async with self._session_maker() as session:
-            session.add_all(races_)
-            await session.commit()
-
     async def get_races(self) -> AsyncGenerator[MGPEvent]:
         """
         Get all events as a stream
@@ -203,10 +411,91 @@ class DatabaseManager:
         """
 
         statement = select(MGPEvent)
-        async with self._session_maker() as session:
+        async with self._read_session_maker() as session:
             result = await session.stream_scalars(statement)
-            async for event in result:
-                yield event
+            async for race in result:
+                yield race
+
+    async def get_active_races(
+        self, now: datetime.datetime, lookback: datetime.timedelta
+    ) -> list[tuple[MGPEvent, DiscordServer]]:
+        """
+        Get the events that may need a status change along with the servers
+        bound to their chapter. Events qualify when they have a discord event,
+        have started, and ended no earlier than `now - lookback`. Events without
+        saved times are always included.
+
+        :param now: The current time in UTC
+        :param lookback: How long after an event's end it is still included
+        :return: Pairs of events and servers
+        """
+
+        statement = (
+            select(MGPEvent, DiscordServer)
+            .join(DiscordServer, DiscordServer.chapter_id == MGPEvent.chapter_id)
+            .where(
+                MGPEvent.discord_event_id.is_not(None),
+                or_(
+                    MGPEvent.end_time.is_(None),
+                    MGPEvent.end_time >= now - lookback,
+                ),
+                or_(MGPEvent.start_time.is_(None), MGPEvent.start_time <= now),
+            )
+        )
+        async with self._read_session_maker() as session:
+            result = await session.execute(statement)
+            return list(result.tuples())
+
+    async def get_upcoming_races(
+        self, now: datetime.datetime
+    ) -> list[tuple[MGPEvent, DiscordServer]]:
+        """
+        Get the events that have a discord event and have not ended, along with
+        the servers bound to their chapter. Events without saved times are
+        always included.
+
+        :param now: The current time in UTC
+        :return: Pairs of events and servers
+        """
+
+        statement = (
+            select(MGPEvent, DiscordServer)
+            .join(DiscordServer, DiscordServer.chapter_id == MGPEvent.chapter_id)
+            .where(
+                MGPEvent.discord_event_id.is_not(None),
+                or_(MGPEvent.end_time.is_(None), MGPEvent.end_time >= now),
+            )
+        )
+        async with self._read_session_maker() as session:
+            result = await session.execute(statement)
+            return list(result.tuples())
+
+    async def set_event_times(
+        self, times: list[tuple[int, datetime.datetime, datetime.datetime | None]]
+    ) -> None:
+        """
+        Set the start and end times of events
+
+        :param times: Entries of (discord event id, start time, end time) in UTC
+        """
+
+        if not times:
+            return
+
+        event_table = MGPEvent.metadata.tables[MGPEvent.__tablename__]
+        statement = (
+            update(event_table)
+            .where(event_table.c.discord_event_id == bindparam("b_id"))
+            .values(start_time=bindparam("b_start"), end_time=bindparam("b_end"))
+        )
+        params = [
+            {"b_id": event_id, "b_start": start, "b_end": end}
+            for event_id, start, end in times
+        ]
+        async with self._session_maker() as session:
+            conn = await session.connection()
+            await conn.execute(statement, params)
+            await session.commit()
 
     async def get_chapter_race_ids(self, chapter_id: str) -> set[str]:
         """
@@ -217,45 +506,352 @@ class DatabaseManager:
         """
 
         statement = select(MGPEvent.event_id).where(MGPEvent.chapter_id == chapter_id)
-        async with self._session_maker() as session:
+        async with self._read_session_maker() as session:
             results: set[str] = set()
             for result in await session.scalars(statement):
                 results.add(str(result))
 
             return results
 
-    async def remove_event(self, event_id: str) -> None:
+    async def remove_event_by_chapter_id(self, chapter_id: str) -> None:
+        """
+        Removes a discord server from the database by chapter id
+
+        :param event_id: ID of the chapter id
+        """
+
+        statement = delete(MGPEvent).where(MGPEvent.chapter_id == chapter_id)
+        snapshot_statement = delete(RaceSnapshot).where(
+            RaceSnapshot.chapter_id == chapter_id
+        )
+        draft_statement = delete(AnnouncementDraft).where(
+            AnnouncementDraft.chapter_id == chapter_id
+        )
+        backfill_statement = delete(ChapterBackfill).where(
+            ChapterBackfill.chapter_id == chapter_id
+        )
+        async with self._session_maker() as session:
+            await session.execute(statement)
+            await session.execute(snapshot_statement)
+            await session.execute(draft_statement)
+            await session.execute(backfill_statement)
+            await session.commit()
+
+    async def get_race_snapshots(self, chapter_id: str) -> dict[str, RaceSnapshot]:
+        """
+        Get the race snapshots for a chapter
+
+        :param chapter_id: The id of the chapter
+        :return: The snapshots keyed by race id
+        """
+
+        statement = select(RaceSnapshot).where(RaceSnapshot.chapter_id == chapter_id)
+        async with self._read_session_maker() as session:
+            return {
+                snapshot.race_id: snapshot
+                for snapshot in await session.scalars(statement)
+            }
+
+    async def save_race_snapshots(self, snapshots: list[RaceSnapshot]) -> None:
+        """
+        Save race snapshots, replacing the existing snapshot for each race
+
+        :param snapshots: The snapshots to save
         """
-        Removes a MultiGP event from the database
 
-        :param event_id: ID of the discord event
+        if not snapshots:
+            return
+
+        async with self._session_maker() as session:
+            for index in range(0, len(snapshots), _INSERT_CHUNK_SIZE):
+                await session.execute(
+                    _snapshot_upsert(snapshots[index : index + _INSERT_CHUNK_SIZE])
+                )
+            await session.commit()
+
+    async def remove_race_snapshots(self, chapter_id: str, race_ids: list[str]) -> None:
         """
+        Removes race snapshots for a chapter
 
-        statement = delete(MGPEvent).where(MGPEvent.event_id == event_id)
+        :param chapter_id: The id of the chapter
+        :param race_ids: The ids of the races to remove
+        """
+
+        statement = delete(RaceSnapshot).where(
+            RaceSnapshot.chapter_id == chapter_id, RaceSnapshot.race_id.in_(race_ids)
+        )
+        draft_statement = delete(AnnouncementDraft).where(
+            AnnouncementDraft.chapter_id == chapter_id,
+            AnnouncementDraft.race_id.in_(race_ids),
+        )
         async with self._session_maker() as session:
             await session.execute(statement)
+            await session.execute(draft_statement)
             await session.commit()
 
-    async def remove_events_by_event_id(self, event_ids: list[str]) -> None:
+    async def reconcile_chapter_races(
+        self,
+        chapter_id: str,
+        races: list[tuple],
+        snapshots: list[RaceSnapshot],
+        current_race_ids: set[str],
+    ) -> ChapterReconciliation:
         """
-        Removes events by provided ids
+        Apply the result of a chapter sync in a single transaction. New races
+        are inserted, skipping discord events and event-less races that are
+        already saved, checked race snapshots are saved, and the races,
+        snapshots, and announcement drafts no longer listed for the chapter
+        are removed.
 
-        :param event_ids: Event ids to remove
+        :param chapter_id: The id of the chapter
+        :param races: Race entries to add as (race id, chapter id,
+        discord event id, start time, end time)
+        :param snapshots: Race snapshots to save
+        :param current_race_ids: The ids of all races currently listed for the chapter
+        :return: The applied changes
         """
+        # pylint: disable=R0913,R0917
+
+        result = ChapterReconciliation()
 
-        statement = delete(MGPEvent).where(MGPEvent.event_id.in_(event_ids))
+        async with self._session_maker() as session:
+            conn = await session.connection()
+
+            if any(race[2] is None for race in races):
+                saved = await conn.execute(
+                    select(MGPEvent.event_id).where(
+                        MGPEvent.chapter_id == chapter_id,
+                        MGPEvent.discord_event_id.is_(None),
+                    )
+                )
+                races = _unsaved_races(races, set(saved.scalars()))
+
+            for index in range(0, len(races), _INSERT_CHUNK_SIZE):
+                statement = (
+                    insert(MGPEvent)
+                    .values(
+                        [
+                            dict(zip(_RACE_COLUMNS, race))
+                            for race in races[index : index + _INSERT_CHUNK_SIZE]
+                        ]
+                    )
+                    .on_conflict_do_nothing()
+                )
+                result.added += (await conn.execute(statement)).rowcount
+
+            for index in range(0, len(snapshots), _INSERT_CHUNK_SIZE):
+                await conn.execute(
+                    _snapshot_upsert(snapshots[index : index + _INSERT_CHUNK_SIZE])
+                )
+
+            await conn.exec_driver_sql(
+                "CREATE TEMP TABLE IF NOT EXISTS listed_race (race_id TEXT PRIMARY KEY)"
+            )
+            await conn.exec_driver_sql("DELETE FROM listed_race")
+            if current_race_ids:
+                await conn.exec_driver_sql(
+                    "INSERT INTO listed_race (race_id) VALUES (?)",
+                    [(race_id,) for race_id in current_race_ids],
+                )
+
+            listed = select(_listed_race.c.race_id)
+            removed = await conn.execute(
+                delete(MGPEvent)
+                .where(
+                    MGPEvent.chapter_id == chapter_id,
+                    MGPEvent.event_id.not_in(listed),
+                )
+                .returning(MGPEvent.event_id)
+            )
+            result.removed = sorted({str(race_id) for race_id in removed.scalars()})
+
+            removed_snapshots = await conn.execute(
+                delete(RaceSnapshot).where(
+                    RaceSnapshot.chapter_id == chapter_id,
+                    RaceSnapshot.race_id.not_in(listed),
+                )
+            )
+            result.removed_snapshots = removed_snapshots.rowcount
+
+            await conn.execute(
+                delete(AnnouncementDraft).where(
+                    AnnouncementDraft.chapter_id == chapter_id,
+                    AnnouncementDraft.race_id.not_in(listed),
+                )
+            )
+
+            await conn.exec_driver_sql("DROP TABLE listed_race")
+            await session.commit()
+
+        return result
+
+    async def load_cache_entries(self, now: float) -> list[tuple[str, str, str, float]]:
+        """
+        Load the unexpired API cache entries and purge the expired ones
+
+        :param now: The current unix timestamp
+        :return: Entries as (endpoint, key, json value, expiration timestamp)
+        """
+
+        purge_statement = delete(APICacheEntry).where(APICacheEntry.expires <= now)
+        statement = select(
+            APICacheEntry.endpoint,
+            APICacheEntry.key,
+            APICacheEntry.value,
+            APICacheEntry.expires,
+        )
+        async with self._session_maker() as session:
+            await session.execute(purge_statement)
+            await session.commit()
+            result = await session.execute(statement)
+
+            return list(result.tuples())
+
+    async def save_cache_entry(
+        self, endpoint: str, key: str, value: str, expires: float
+    ) -> None:
+        """
+        Save an API cache entry, replacing the existing entry for the key
+
+        :param endpoint: The endpoint of the cached response
+        :param key: The key of the response within the endpoint
+        :param value: The json encoded response
+        :param expires: The expiration unix timestamp
+        """
+
+        statement = insert(APICacheEntry).values(
+            endpoint=endpoint, key=key, value=value, expires=expires
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[APICacheEntry.endpoint, APICacheEntry.key],
+            set_={"value": statement.excluded.value, "expires": expires},
+        )
         async with self._session_maker() as session:
             await session.execute(statement)
             await session.commit()
 
-    async def remove_event_by_chapter_id(self, chapter_id: str) -> None:
+    async def get_announcement_draft(
+        self, race_id: str, chapter_id: str, content_hash: str, variant: int
+    ) -> str | None:
         """
-        Removes a discord server from the database by chapter id
+        Get a pre-generated announcement for the current details of a race
 
-        :param event_id: ID of the chapter id
+        :param race_id: The id of the race
+        :param chapter_id: The id of the chapter
+        :param content_hash: The content hash of the race's details
+        :param variant: The announcement variant
+        :return: The announcement or None if there is no current draft
         """
 
-        statement = delete(MGPEvent).where(MGPEvent.chapter_id == chapter_id)
+        statement = select(AnnouncementDraft.content).where(
+            AnnouncementDraft.race_id == race_id,
+            AnnouncementDraft.chapter_id == chapter_id,
+            AnnouncementDraft.variant == variant,
+            AnnouncementDraft.content_hash == content_hash,
+        )
+        async with self._read_session_maker() as session:
+            return await session.scalar(statement)
+
+    async def save_announcement_draft(
+        self,
+        race_id: str,
+        chapter_id: str,
+        content_hash: str,
+        variant: int,
+        content: str,
+    ) -> None:
+        """
+        Save a pre-generated announcement, replacing the existing draft of the
+        variant
+
+        :param race_id: The id of the race
+        :param chapter_id: The id of the chapter
+        :param content_hash: The content hash of the race's details
+        :param variant: The announcement variant
+        :param content: The generated announcement
+        """
+        # pylint: disable=R0913,R0917
+
+        created = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        statement = insert(AnnouncementDraft).values(
+            race_id=race_id,
+            chapter_id=chapter_id,
+            variant=variant,
+            content_hash=content_hash,
+            content=content,
+            created=created,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                AnnouncementDraft.race_id,
+                AnnouncementDraft.chapter_id,
+                AnnouncementDraft.variant,
+            ],
+            set_={
+                "content_hash": content_hash,
+                "content": content,
+                "created": created,
+            },
+        )
+        async with self._session_maker() as session:
+            await session.execute(statement)
+            await session.commit()
+
+    async def get_backfill(self, chapter_id: str) -> ChapterBackfill | None:
+        """
+        Get the backfill of a chapter
+
+        :param chapter_id: The id of the chapter
+        :return: The backfill or None
+        """
+
+        statement = select(ChapterBackfill).where(
+            ChapterBackfill.chapter_id == chapter_id
+        )
+        async with self._read_session_maker() as session:
+            return await session.scalar(statement)
+
+    async def get_pending_backfills(self) -> list[ChapterBackfill]:
+        """
+        Get the backfills that have not completed
+
+        :return: The pending backfills
+        """
+
+        statement = select(ChapterBackfill).where(ChapterBackfill.completed.is_(None))
+        async with self._read_session_maker() as session:
+            return list(await session.scalars(statement))
+
+    async def update_backfill(
+        self,
+        chapter_id: str,
+        *,
+        total: int,
+        processed: int,
+        deferred: int,
+        completed: bool = False,
+    ) -> None:
+        """
+        Record the progress of a chapter's backfill
+
+        :param chapter_id: The id of the chapter
+        :param total: Number of races listed for the chapter
+        :param processed: Number of races handled by the backfill
+        :param deferred: Number of races left to the regular sync
+        :param completed: Mark the backfill as finished, defaults to False
+        """
+
+        values: dict = {"total": total, "processed": processed, "deferred": deferred}
+        if completed:
+            values["completed"] = datetime.datetime.now(datetime.timezone.utc).replace(
+                tzinfo=None
+            )
+
+        statement = (
+            update(ChapterBackfill)
+            .where(ChapterBackfill.chapter_id == chapter_id)
+            .values(**values)
+        )
         async with self._session_maker() as session:
             await session.execute(statement)
             await session.commit()
@@ -0,0 +1,162 @@
+"""
+Versioned database schema migrations
+"""
+
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import Connection, inspect
+
+from .objects import _ObjectBase, AnnouncementDraft, ChapterBackfill
+
+logger = logging.getLogger(__name__)
+
+
+def _add_column(conn: Connection, table: str, column: str, column_type: str) -> None:
+    """
+    Add a nullable column to a table if it does not exist
+
+    :param conn: The database connection
+    :param table: The name of the table
+    :param column: The name of the column
+    :param column_type: The SQL type of the column
+    """
+    columns = {column_["name"] for column_ in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.exec_driver_sql(
+            f'ALTER TABLE "{table}" ADD COLUMN "{column}" {column_type}'
+        )
+
+
+def _migrate_event_times(conn: Connection) -> None:
+    """
+    Add the start and end times of events
+
+    :param conn: The database connection
+    """
+    _add_column(conn, "event", "start_time", "DATETIME")
+    _add_column(conn, "event", "end_time", "DATETIME")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_event_window ON event (end_time, start_time)"
+    )
+
+
+def _migrate_lookup_indexes(conn: Connection) -> None:
+    """
+    Add indexes for server and event lookups. Duplicate servers and discord
+    events are removed, keeping the latest entry, before the unique indexes
+    are created.
+
+    :param conn: The database connection
+    """
+    conn.exec_driver_sql(
+        "DELETE FROM server WHERE id NOT IN "
+        "(SELECT MAX(id) FROM server GROUP BY server_id)"
+    )
+    conn.exec_driver_sql(
+        "DELETE FROM event WHERE discord_event_id IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM event WHERE discord_event_id IS NOT NULL "
+        "GROUP BY discord_event_id)"
+    )
+
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_server_server_id ON server (server_id)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_server_chapter_id ON server (chapter_id)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_event_chapter_event "
+        "ON event (chapter_id, event_id)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_event_event_id ON event (event_id)"
+    )
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_event_discord_event_id "
+        "ON event (discord_event_id)"
+    )
+
+
+def _migrate_announcement_drafts(conn: Connection) -> None:
+    """
+    Add the pre-generated announcement drafts
+
+    :param conn: The database connection
+    """
+    _ObjectBase.metadata.tables[AnnouncementDraft.__tablename__].create(
+        conn, checkfirst=True
+    )
+
+
+def _migrate_chapter_backfills(conn: Connection) -> None:
+    """
+    Add the progress of first activation backfills
+
+    :param conn: The database connection
+    """
+    _ObjectBase.metadata.tables[ChapterBackfill.__tablename__].create(
+        conn, checkfirst=True
+    )
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Add event start and end times", _migrate_event_times),
+    (2, "Add server and event lookup indexes", _migrate_lookup_indexes),
+    (3, "Add announcement drafts", _migrate_announcement_drafts),
+    (4, "Add chapter backfills", _migrate_chapter_backfills),
+]
+"""Schema migrations as (version, description, migration function)"""
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+"""The schema version of the current database objects"""
+
+
+def get_schema_version(conn: Connection) -> int:
+    """
+    Get the schema version of the database
+
+    :param conn: The database connection
+    :return: The schema version
+    """
+    return conn.exec_driver_sql("PRAGMA user_version").scalar_one()
+
+
+def set_schema_version(conn: Connection, version: int) -> None:
+    """
+    Set the schema version of the database
+
+    :param conn: The database connection
+    :param version: The schema version
+    """
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def migrate(conn: Connection) -> int:
+    """
+    Bring the database schema up to date. New databases are created with the
+    current schema, while existing databases have their missing tables
+    created and pending migrations applied in order.
+
+    :param conn: The database connection
+    :return: The schema version of the database
+    """
+    version = get_schema_version(conn)
+    is_new = version == 0 and not inspect(conn).get_table_names()
+
+    _ObjectBase.metadata.create_all(conn)
+
+    if is_new:
+        set_schema_version(conn, LATEST_VERSION)
+        return LATEST_VERSION
+
+    for version_, description, migration in MIGRATIONS:
+        if version_ <= version:
+            continue
+
+        logger.info("Applying database migration %d: %s", version_, description)
+        migration(conn)
+        set_schema_version(conn, version_)
+        version = version_
+
+    return version
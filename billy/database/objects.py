@@ -2,11 +2,13 @@
 Database object definition
 """
 
-from sqlalchemy import ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Index, UniqueConstraint
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-# pylint: disable=R0903
+# pylint: disable=R0903,E1136
 
 
 class _ObjectBase(AsyncAttrs, DeclarativeBase):
@@ -24,6 +26,10 @@ class DiscordServer(_ObjectBase):
     """
 
     __tablename__ = "server"
+    __table_args__ = (
+        Index("ix_server_server_id", "server_id", unique=True),
+        Index("ix_server_chapter_id", "chapter_id"),
+    )
 
     server_id: Mapped[int] = mapped_column()
     """The internal discord id of the server"""
@@ -49,16 +55,184 @@ class MGPEvent(_ObjectBase):
     # pylint: disable=E1136
 
     __tablename__ = "event"
+    __table_args__ = (
+        Index("ix_event_chapter_event", "chapter_id", "event_id"),
+        Index("ix_event_event_id", "event_id"),
+        Index("ix_event_discord_event_id", "discord_event_id", unique=True),
+        Index("ix_event_window", "end_time", "start_time"),
+    )
 
     event_id: Mapped[str] = mapped_column()
     """The id of the event in the MultiGP database"""
-    chapter_id: Mapped[str] = mapped_column(ForeignKey("server.id"))
-    """The id of the event in the MultiGP database"""
+    chapter_id: Mapped[str] = mapped_column()
+    """The id of the chapter in the MultiGP database"""
     discord_event_id: Mapped[int] = mapped_column(nullable=True)
     """The discord event id"""
-    servers: Mapped[list[DiscordServer]] = relationship()
-
-    def __init__(self, event_id, chapter_id, discord_event_id) -> None:
+    start_time: Mapped[datetime | None] = mapped_column()
+    """The start time of the event in UTC"""
+    end_time: Mapped[datetime | None] = mapped_column()
+    """The end time of the event in UTC"""
+    servers: Mapped[list[DiscordServer]] = relationship(
+        primaryjoin="foreign(MGPEvent.chapter_id) == DiscordServer.chapter_id",
+        viewonly=True,
+    )
+
+    def __init__(
+        self, event_id, chapter_id, discord_event_id, start_time=None, end_time=None
+    ) -> None:
+        # pylint: disable=R0913,R0917
         self.event_id = event_id
         self.chapter_id = chapter_id
         self.discord_event_id = discord_event_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+
+class RaceSnapshot(_ObjectBase):
+    """
+    Class representing the last checked state of a MultiGP race
+    """
+
+    # pylint: disable=R0902
+
+    __tablename__ = "race_snapshot"
+    __table_args__ = (UniqueConstraint("race_id", "chapter_id"),)
+
+    race_id: Mapped[str] = mapped_column()
+    """The id of the race in the MultiGP database"""
+    chapter_id: Mapped[str] = mapped_column(index=True)
+    """The id of the chapter the race belongs to"""
+    content_hash: Mapped[str] = mapped_column()
+    """Hash of the race's entry in the chapter race list"""
+    name: Mapped[str] = mapped_column()
+    """The name of the race"""
+    chapter_name: Mapped[str] = mapped_column()
+    """The name of the chapter hosting the race"""
+    course_name: Mapped[str] = mapped_column()
+    """The name of the race's course"""
+    description: Mapped[str] = mapped_column()
+    """The description of the race"""
+    timezone: Mapped[str | None] = mapped_column()
+    """The timezone of the race venue"""
+    start_time: Mapped[datetime | None] = mapped_column()
+    """The start time of the race in UTC"""
+    end_time: Mapped[datetime | None] = mapped_column()
+    """The end time of the race in UTC"""
+    last_checked: Mapped[datetime] = mapped_column()
+    """The time in UTC the race was last checked for an event"""
+
+    def __init__(
+        self,
+        race_id,
+        chapter_id,
+        content_hash,
+        name,
+        chapter_name,
+        course_name,
+        description,
+        timezone,
+        start_time,
+        end_time,
+        last_checked,
+    ) -> None:
+        # pylint: disable=R0913,R0917
+        self.race_id = race_id
+        self.chapter_id = chapter_id
+        self.content_hash = content_hash
+        self.name = name
+        self.chapter_name = chapter_name
+        self.course_name = course_name
+        self.description = description
+        self.timezone = timezone
+        self.start_time = start_time
+        self.end_time = end_time
+        self.last_checked = last_checked
+
+
+class APICacheEntry(_ObjectBase):
+    """
+    Class representing a cached API response
+    """
+
+    __tablename__ = "api_cache"
+    __table_args__ = (UniqueConstraint("endpoint", "key"),)
+
+    endpoint: Mapped[str] = mapped_column()
+    """The API endpoint of the response"""
+    key: Mapped[str] = mapped_column()
+    """The key of the response within the endpoint"""
+    value: Mapped[str] = mapped_column()
+    """The json encoded response"""
+    expires: Mapped[float] = mapped_column(index=True)
+    """The unix timestamp the response expires at"""
+
+    def __init__(self, endpoint, key, value, expires) -> None:
+        self.endpoint = endpoint
+        self.key = key
+        self.value = value
+        self.expires = expires
+
+
+class AnnouncementDraft(_ObjectBase):
+    """
+    Class representing a pre-generated race announcement
+    """
+
+    __tablename__ = "announcement_draft"
+    __table_args__ = (UniqueConstraint("race_id", "chapter_id", "variant"),)
+
+    race_id: Mapped[str] = mapped_column()
+    """The MultiGP race id"""
+    chapter_id: Mapped[str] = mapped_column(index=True)
+    """The MultiGP chapter id"""
+    variant: Mapped[int] = mapped_column()
+    """The announcement variant"""
+    content_hash: Mapped[str] = mapped_column()
+    """Hash of the race details the announcement was generated from"""
+    content: Mapped[str] = mapped_column()
+    """The generated announcement"""
+    created: Mapped[datetime] = mapped_column()
+    """The UTC time the announcement was generated"""
+
+    def __init__(
+        self, race_id, chapter_id, variant, content_hash, content, created
+    ) -> None:
+        # pylint: disable=R0913,R0917
+        self.race_id = race_id
+        self.chapter_id = chapter_id
+        self.variant = variant
+        self.content_hash = content_hash
+        self.content = content
+        self.created = created
+
+
+class ChapterBackfill(_ObjectBase):
+    """
+    Class representing the progress of a chapter's first activation backfill
+    """
+
+    __tablename__ = "chapter_backfill"
+
+    chapter_id: Mapped[str] = mapped_column(unique=True)
+    """The MultiGP chapter id"""
+    horizon: Mapped[datetime] = mapped_column()
+    """The UTC time after which races are left to the regular sync"""
+    total: Mapped[int] = mapped_column(default=0)
+    """Number of races listed for the chapter when the backfill last ran"""
+    processed: Mapped[int] = mapped_column(default=0)
+    """Number of races handled by the backfill"""
+    deferred: Mapped[int] = mapped_column(default=0)
+    """Number of races left to the regular sync"""
+    started: Mapped[datetime] = mapped_column()
+    """The UTC time the backfill was requested"""
+    completed: Mapped[datetime | None] = mapped_column()
+    """The UTC time the backfill finished, None while it is pending"""
+
+    def __init__(self, chapter_id, horizon, started) -> None:
+        self.chapter_id = chapter_id
+        self.horizon = horizon
+        self.started = started
+        self.total = 0
+        self.processed = 0
+        self.deferred = 0
+        self.completed = None
@@ -0,0 +1,184 @@
+"""
+Non-blocking logging configuration
+"""
+
+import os
+import copy
+import json
+import queue
+import logging
+import logging.handlers
+import datetime
+
+_RECORD_FIELDS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys() | {"message", "asctime"}
+)
+"""Attributes present on every log record, excluded from extra JSON fields"""
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats log records as single line JSON objects
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a log record
+
+        :param record: The log record
+        :return: The JSON encoded record
+        """
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, tz=datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+
+        return json.dumps(entry, default=str)
+
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler passing records to the listener with their message and
+    exception text resolved, leaving all formatting to the listener
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Prepare a record to be queued
+
+        :param record: The log record
+        :return: The record to queue
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class RotatingLogFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """
+    Log file handler rotating both on a time interval and when the file
+    exceeds a size
+    """
+
+    def __init__(self, filename: str, *, max_bytes: int = 0, **kwargs) -> None:
+        """
+        Class initializer
+
+        :param filename: The path of the log file
+        :param max_bytes: Size in bytes that triggers a rotation, defaults to
+        0 (no size limit)
+        """
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """
+        Whether the log file should be rotated before writing a record
+
+        :param record: The log record
+        :return: True if the file should be rotated
+        """
+        if super().shouldRollover(record):
+            return True
+
+        if self.max_bytes <= 0 or self.stream is None:
+            return False
+
+        self.stream.seek(0, os.SEEK_END)
+        return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        """
+        Get the name of a rotated file. Files rotated for size within the same
+        interval get a numbered suffix instead of replacing each other.
+
+        :param default_name: The default rotated file name
+        :return: The rotated file name
+        """
+        name = super().rotation_filename(default_name)
+        if not os.path.exists(name):
+            return name
+
+        index = 1
+        while os.path.exists(f"{name}.{index}"):
+            index += 1
+
+        return f"{name}.{index}"
+
+
+def setup_logging(
+    level: int,
+    *,
+    filename: str | None = None,
+    json_output: bool = False,
+    max_bytes: int = 0,
+    backup_count: int = 0,
+    when: str = "midnight",
+) -> logging.handlers.QueueListener:
+    """
+    Configure the root logger to hand records to a queue. A background thread
+    writes the queued records to the console and log file, so logging never
+    blocks the event loop on disk writes.
+
+    :param level: The logging level
+    :param filename: The path of the log file, defaults to console only
+    :param json_output: Write records as JSON objects, defaults to False
+    :param max_bytes: Log file size that triggers a rotation, defaults to 0
+    (no size limit)
+    :param backup_count: Number of rotated log files kept, defaults to 0 (all)
+    :param when: Interval of time based rotation, defaults to "midnight"
+    :return: The started listener writing the queued records
+    """
+    # pylint: disable=R0913
+
+    formatter: logging.Formatter
+    if json_output:
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s %(levelname)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
+
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if filename is not None:
+        handlers.append(
+            RotatingLogFileHandler(
+                filename,
+                max_bytes=max_bytes,
+                when=when,
+                backupCount=backup_count,
+                encoding="utf-8",
+            )
+        )
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    logging.basicConfig(level=level, handlers=[_LogQueueHandler(log_queue)], force=True)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+
+    return listener
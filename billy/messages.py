@@ -0,0 +1,279 @@
+"""
+Conversation message caching
+"""
+
+import random
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import discord
+
+from .api import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CachedMessage:
+    """
+    The parts of a discord message needed to rebuild a conversation
+    """
+
+    message_id: int
+    author_id: int
+    content: str
+    reference_id: int | None = None
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "CachedMessage":
+        """
+        Build a cached message from a discord message
+
+        :param message: The discord message
+        :return: The cached message
+        """
+        reference_id = None
+        if message.reference is not None:
+            reference_id = message.reference.message_id
+
+        return cls(message.id, message.author.id, message.content, reference_id)
+
+
+class MessageCache:
+    """
+    A size-bounded LRU cache of recent messages used to rebuild reply chains
+    without a discord API request for each message in the chain.
+    """
+
+    def __init__(self, *, maxsize: int = 4096, max_depth: int = 20) -> None:
+        """
+        Class initializer
+
+        :param maxsize: Maximum number of cached messages, defaults to 4096
+        :param max_depth: Maximum number of messages in a conversation, defaults to 20
+        """
+        self.maxsize = maxsize
+        self.max_depth = max_depth
+        self.hits = 0
+        """Number of lookups served from the cache"""
+        self.misses = 0
+        """Number of lookups passed to the discord API"""
+        self._messages: OrderedDict[int, CachedMessage] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._messages
+
+    def add(self, message: discord.Message) -> CachedMessage:
+        """
+        Add or replace a message in the cache. The replied to message is
+        added as well when discord included it with the message.
+
+        :param message: The discord message
+        :return: The cached message
+        """
+        if message.reference is not None and isinstance(
+            message.reference.resolved, discord.Message
+        ):
+            self.add(message.reference.resolved)
+
+        cached = CachedMessage.from_message(message)
+        self._messages[cached.message_id] = cached
+        self._messages.move_to_end(cached.message_id)
+        while len(self._messages) > self.maxsize:
+            self._messages.popitem(last=False)
+
+        return cached
+
+    def get(self, message_id: int) -> CachedMessage | None:
+        """
+        Get a message from the cache
+
+        :param message_id: The id of the message
+        :return: The cached message or None
+        """
+        cached = self._messages.get(message_id)
+        if cached is not None:
+            self._messages.move_to_end(message_id)
+
+        return cached
+
+    def discard(self, message_id: int) -> None:
+        """
+        Remove a message from the cache
+
+        :param message_id: The id of the message
+        """
+        self._messages.pop(message_id, None)
+
+    async def resolve(
+        self, channel: discord.abc.Messageable, message_id: int
+    ) -> CachedMessage | None:
+        """
+        Get a message from the cache, or fetch it from discord on a miss
+
+        :param channel: The channel containing the message
+        :param message_id: The id of the message
+        :return: The cached message or None if it could not be fetched
+        """
+        if (cached := self.get(message_id)) is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.HTTPException as ex:
+            logger.debug("Unable to fetch message %s: %s", message_id, ex)
+            return None
+
+        return self.add(message)
+
+    async def conversation(self, message: discord.Message) -> list[CachedMessage]:
+        """
+        Rebuild the reply chain ending at a message
+
+        :param message: The latest message
+        :return: The messages of the chain, oldest first, limited to the
+        maximum depth
+        """
+        chain = [self.add(message)]
+
+        next_id = chain[0].reference_id
+        while next_id is not None and len(chain) < self.max_depth:
+            cached = await self.resolve(message.channel, next_id)
+            if cached is None:
+                break
+
+            chain.append(cached)
+            next_id = cached.reference_id
+
+        chain.reverse()
+        return chain
+
+
+class MessageFilter:
+    """
+    Decides which messages the bot replies to and at what priority. Most
+    messages are decided synchronously from the message itself and the
+    message cache. Only replies to messages that are neither cached nor
+    resolved by discord require fetching the replied to message.
+    """
+
+    def __init__(self, cache: MessageCache, *, random_rate: float = 0.002) -> None:
+        """
+        Class initializer
+
+        :param cache: The message cache used to resolve replies
+        :param random_rate: Chance of replying to an unrelated message,
+        defaults to 0.002
+        """
+        self.cache = cache
+        self.random_rate = random_rate
+        self.filtered = 0
+        """Number of messages ignored"""
+        self.processed = 0
+        """Number of messages replied to"""
+        self.lookups = 0
+        """Number of messages that needed the replied to message fetched"""
+
+    def _roll(self) -> LLMPriority | None:
+        """
+        Decide whether to reply to an unrelated message
+
+        :return: The reply priority or None
+        """
+        return LLMPriority.RANDOM if random.random() < self.random_rate else None
+
+    def _count(self, priority: LLMPriority | None) -> LLMPriority | None:
+        """
+        Count a decision
+
+        :param priority: The reply priority or None
+        :return: The reply priority or None
+        """
+        if priority is None:
+            self.filtered += 1
+        else:
+            self.processed += 1
+
+        return priority
+
+    def fast_check(
+        self, message: discord.Message, bot_id: int | None, active: bool
+    ) -> tuple[bool, LLMPriority | None]:
+        """
+        Decide on a message without any network requests
+
+        :param message: The recieved message
+        :param bot_id: The bot's user id
+        :param active: Whether replies can be generated
+        :return: Whether the message was decided and the reply priority, or
+        None to ignore the message
+        """
+        if not active or bot_id is None or message.author.id == bot_id:
+            return True, self._count(None)
+
+        if str(bot_id) in message.content or any(
+            user.id == bot_id for user in message.mentions
+        ):
+            return True, self._count(LLMPriority.MENTION)
+
+        reference = message.reference
+        if reference is None or reference.message_id is None:
+            return True, self._count(self._roll())
+
+        known, author_id = self._reply_author(reference)
+        if not known:
+            return False, None
+
+        if author_id == bot_id:
+            return True, self._count(LLMPriority.MENTION)
+
+        return True, self._count(self._roll())
+
+    def _reply_author(
+        self, reference: discord.MessageReference
+    ) -> tuple[bool, int | None]:
+        """
+        Get the author of a replied to message without any network requests
+
+        :param reference: The reference to the replied to message
+        :return: Whether the author is known, and the author's id or None if
+        the message was deleted
+        """
+        if isinstance(reference.resolved, discord.Message):
+            return True, reference.resolved.author.id
+
+        if (
+            reference.message_id is not None
+            and (cached := self.cache.get(reference.message_id)) is not None
+        ):
+            return True, cached.author_id
+
+        # A resolved reference that is not a message was deleted
+        return reference.resolved is not None, None
+
+    async def lookup(self, message: discord.Message, bot_id: int) -> LLMPriority | None:
+        """
+        Decide on a reply whose replied to message is unknown, fetching it
+
+        :param message: The recieved message
+        :param bot_id: The bot's user id
+        :return: The reply priority or None to ignore the message
+        """
+        self.lookups += 1
+
+        referenced = None
+        if message.reference is not None and message.reference.message_id is not None:
+            referenced = await self.cache.resolve(
+                message.channel, message.reference.message_id
+            )
+
+        if referenced is not None and referenced.author_id == bot_id:
+            return self._count(LLMPriority.MENTION)
+
+        return self._count(self._roll())
@@ -0,0 +1,450 @@
+"""
+Runtime metrics in the Prometheus text format
+"""
+
+import time
+import asyncio
+import bisect
+import logging
+import functools
+import inspect
+from contextlib import contextmanager
+from collections.abc import Callable, Iterator, Mapping
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+"""Default histogram bucket upper bounds in seconds"""
+
+LabelValues = tuple[str, ...]
+Sample = float | Mapping[str, float]
+"""A callback metric value, or its values by label value"""
+
+M = TypeVar("M", bound="_Metric")
+"""Generic used for typing registered metrics"""
+C = TypeVar("C", bound=type)
+"""Generic used for typing instrumented classes"""
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, **extra: str) -> str:
+    """
+    Format a metric's labels
+
+    :param names: The label names
+    :param values: The label values
+    :return: The formatted labels, empty without labels
+    """
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+
+    escaped = (
+        (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric:
+    """
+    Base of the metric types
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        """
+        Class initializer
+
+        :param name: The metric name
+        :param documentation: The metric description
+        :param labels: The label names, defaults to no labels
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def _values(self, labels: dict[str, str]) -> LabelValues:
+        """
+        Order label values by the metric's label names
+
+        :param labels: The label values by name
+        :return: The label values
+        """
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[str]:
+        """
+        Render the metric's samples
+
+        :yield: Each sample line
+        """
+        yield from ()
+
+    def render(self) -> Iterator[str]:
+        """
+        Render the metric
+
+        :yield: Each line of the metric
+        """
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(_Metric):
+    """
+    A value that only increases
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._counts: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increase the counter
+
+        :param amount: The amount to add, defaults to 1.0
+        """
+        key = self._values(labels)
+        self._counts[key] = self._counts.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """
+        Get the counter's value
+
+        :return: The value
+        """
+        return self._counts.get(self._values(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        for values, count in self._counts.items():
+            yield f"{self.name}{_format_labels(self.labels, values)} {count}"
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """
+        Class initializer
+
+        :param name: The metric name
+        :param documentation: The metric description
+        :param labels: The label names, defaults to no labels
+        :param buckets: The bucket upper bounds, defaults to `DEFAULT_BUCKETS`
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record an observation
+
+        :param value: The observed value
+        """
+        key = self._values(labels)
+        if (series := self._series.get(key)) is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Observe the duration of a block in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        """
+        Get the number of observations
+
+        :return: The number of observations
+        """
+        series = self._series.get(self._values(labels))
+        return 0 if series is None else sum(series[0])
+
+    def samples(self) -> Iterator[str]:
+        for values, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.labels, values, le=le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+
+            labels = _format_labels(self.labels, values)
+            yield f"{self.name}_sum{labels} {total[0]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class CallbackMetric(_Metric):
+    """
+    A metric read from existing statistics when the metrics are collected
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Sample],
+        *,
+        kind: str = "gauge",
+        label: str | None = None,
+    ):
+        """
+        Class initializer
+
+        :param name: The metric name
+        :param documentation: The metric description
+        :param callback: Callable returning the value, or the values by label
+        value when a label is set
+        :param kind: The metric type, defaults to "gauge"
+        :param label: The name of the label of the values, defaults to None
+        """
+        super().__init__(name, documentation, () if label is None else (label,))
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        values = self.callback()
+        if not isinstance(values, Mapping):
+            yield f"{self.name} {float(values)}"
+            return
+
+        for value, sample in values.items():
+            yield f"{self.name}{_format_labels(self.labels, (value,))} {float(sample)}"
+
+
+class Registry:
+    """
+    Collection of metrics rendered together
+    """
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: M) -> M:
+        """
+        Add a metric to the registry, returning the existing metric of the
+        same name if there is one
+
+        :param metric: The metric to add
+        :return: The registered metric
+        """
+        return self._metrics.setdefault(metric.name, metric)  # type: ignore
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format
+
+        :return: The rendered metrics
+        """
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            try:
+                rendered = list(metric.render())
+            except Exception as ex:  # pylint: disable=W0718
+                logger.error("Failed to collect metric %s: %s", metric.name, ex)
+                continue
+
+            lines.extend(rendered)
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+"""Default metrics registry"""
+
+
+def counter(name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+    """
+    Get or create a counter in the default registry
+
+    :param name: The metric name
+    :param documentation: The metric description
+    :param labels: The label names, defaults to no labels
+    :return: The counter
+    """
+    return registry.register(Counter(name, documentation, labels))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labels: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """
+    Get or create a histogram in the default registry
+
+    :param name: The metric name
+    :param documentation: The metric description
+    :param labels: The label names, defaults to no labels
+    :param buckets: The bucket upper bounds, defaults to `DEFAULT_BUCKETS`
+    :return: The histogram
+    """
+    return registry.register(Histogram(name, documentation, labels, buckets))
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    callback: Callable[[], Sample],
+    *,
+    kind: str = "gauge",
+    label: str | None = None,
+) -> CallbackMetric:
+    """
+    Create a callback metric in the default registry
+
+    :param name: The metric name
+    :param documentation: The metric description
+    :param callback: Callable returning the value, or the values by label
+    value when a label is set
+    :param kind: The metric type, defaults to "gauge"
+    :param label: The name of the label of the values, defaults to None
+    :return: The metric
+    """
+    return registry.register(
+        CallbackMetric(name, documentation, callback, kind=kind, label=label)
+    )
+
+
+def instrument_methods(
+    duration: Histogram, errors: Counter | None = None
+) -> Callable[[C], C]:
+    """
+    Class decorator timing every public coroutine method of a class. The
+    metrics are labelled with the method name.
+
+    :param duration: Histogram of call durations with a "method" label
+    :param errors: Counter of failed calls with a "method" label, defaults to None
+    :return: The class decorator
+    """
+
+    def wrap(method: Callable, name: str) -> Callable:
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(method=name)
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start, method=name)
+
+        return timed
+
+    def decorate(cls: C) -> C:
+        for name, method in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(method):
+                setattr(cls, name, wrap(method, name))
+
+        return cls
+
+    return decorate
+
+
+class MetricsServer:
+    """
+    Minimal HTTP server exposing a registry at `/metrics`
+    """
+
+    def __init__(
+        self, metrics: Registry, *, host: str = "127.0.0.1", port: int = 9100
+    ) -> None:
+        """
+        Class initializer
+
+        :param metrics: The registry to expose
+        :param host: The address to listen on, defaults to "127.0.0.1"
+        :param port: The port to listen on, defaults to 9100
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Answer a single HTTP request
+
+        :param reader: The request stream
+        :param writer: The response stream
+        """
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            method, path, *_ = request.decode("latin-1").split(" ", 2)
+
+            if method == "GET" and path.split("?", 1)[0] == "/metrics":
+                status = "200 OK"
+                body = self.metrics.render().encode()
+            else:
+                status = "404 Not Found"
+                body = b"Not Found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """
+        Start listening for requests
+        """
+        if self._server is None:
+            self._server = await asyncio.start_server(
+                self._handle, self.host, self.port
+            )
+            logger.info("Serving metrics on %s:%d", self.host, self.port)
+
+    async def stop(self) -> None:
+        """
+        Stop listening for requests
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
@@ -0,0 +1,184 @@
+"""
+Discord event status scheduling
+"""
+
+import time
+import heapq
+import asyncio
+import logging
+import datetime
+import itertools
+from enum import Enum
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class EventAction(str, Enum):
+    """
+    Status changes applied to a discord event
+    """
+
+    START = "start"
+    """Start the event"""
+    END = "end"
+    """End the event"""
+
+
+EventCallback = Callable[[int, int, EventAction], Awaitable[None]]
+"""Callback provided the guild id, discord event id, and action to apply"""
+
+
+class EventScheduler:
+    """
+    Fires event status changes at their scheduled times. Pending actions are
+    kept in a heap ordered by time, and the scheduler sleeps until the next
+    action is due.
+    """
+
+    _max_sleep = 3600.0
+    """Longest single sleep in seconds, bounding the effect of clock changes"""
+
+    def __init__(self, callback: EventCallback) -> None:
+        """
+        Class initializer
+
+        :param callback: Callback used to apply an action to an event
+        """
+        self._callback = callback
+        self._heap: list[tuple[float, int, int, int, EventAction]] = []
+        self._pending: dict[tuple[int, EventAction], float] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, event_id: int) -> bool:
+        return any((event_id, action) in self._pending for action in EventAction)
+
+    def schedule(
+        self,
+        guild_id: int,
+        event_id: int,
+        start_time: datetime.datetime | None,
+        end_time: datetime.datetime | None,
+    ) -> None:
+        """
+        Schedule the start and end of an event. Replaces any previously
+        scheduled times for the event.
+
+        :param guild_id: The id of the discord server
+        :param event_id: The id of the discord event
+        :param start_time: The aware start time of the event
+        :param end_time: The aware end time of the event
+        """
+        for action, when in (
+            (EventAction.START, start_time),
+            (EventAction.END, end_time),
+        ):
+            if when is None:
+                continue
+
+            timestamp = when.timestamp()
+            self._pending[(event_id, action)] = timestamp
+            heapq.heappush(
+                self._heap,
+                (timestamp, next(self._counter), guild_id, event_id, action),
+            )
+
+        self._wakeup.set()
+
+    def cancel(self, event_id: int) -> None:
+        """
+        Cancel the scheduled actions of an event
+
+        :param event_id: The id of the discord event
+        """
+        for action in EventAction:
+            self._pending.pop((event_id, action), None)
+
+    def _next_time(self) -> float | None:
+        """
+        Get the time of the next pending action, discarding replaced or
+        cancelled entries
+
+        :return: The unix timestamp of the action or None
+        """
+        while self._heap:
+            timestamp, _, _, event_id, action = self._heap[0]
+            if self._pending.get((event_id, action)) == timestamp:
+                return timestamp
+            heapq.heappop(self._heap)
+
+        return None
+
+    def _pop_due(self, now: float) -> list[tuple[int, int, EventAction]]:
+        """
+        Remove and return the actions due at a time
+
+        :param now: The current unix timestamp
+        :return: The due actions as (guild id, event id, action)
+        """
+        due: list[tuple[int, int, EventAction]] = []
+        while (timestamp := self._next_time()) is not None and timestamp <= now:
+            _, _, guild_id, event_id, action = heapq.heappop(self._heap)
+            del self._pending[(event_id, action)]
+            due.append((guild_id, event_id, action))
+
+        return due
+
+    async def _fire(self, guild_id: int, event_id: int, action: EventAction) -> None:
+        """
+        Apply an action to an event, logging failures
+
+        :param guild_id: The id of the discord server
+        :param event_id: The id of the discord event
+        :param action: The action to apply
+        """
+        try:
+            await self._callback(guild_id, event_id, action)
+        except Exception as ex:  # pylint: disable=W0718
+            logger.error("Failed to %s event %s: %s", action.value, event_id, ex)
+
+    async def _run(self) -> None:
+        """
+        Scheduler loop
+        """
+        while True:
+            self._wakeup.clear()
+
+            due = self._pop_due(time.time())
+            if due:
+                await asyncio.gather(*(self._fire(*action) for action in due))
+
+            timeout = self._max_sleep
+            if (next_time := self._next_time()) is not None:
+                timeout = min(timeout, max(0.0, next_time - time.time()))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """
+        Start the scheduler loop if it is not running
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(), name="event-scheduler"
+            )
+
+    async def stop(self) -> None:
+        """
+        Stop the scheduler loop
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,247 @@
+"""
+Supervised background tasks
+"""
+
+import time
+import asyncio
+import logging
+from collections.abc import Coroutine
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GroupStats:
+    """
+    Counters of a task group
+    """
+
+    # pylint: disable=R0902
+
+    started: int = 0
+    """Number of tasks accepted by the group"""
+    completed: int = 0
+    """Number of tasks that finished successfully"""
+    failed: int = 0
+    """Number of tasks that raised an exception"""
+    cancelled: int = 0
+    """Number of tasks that were cancelled"""
+    rejected: int = 0
+    """Number of tasks refused because the group was full"""
+    wait_time: float = 0.0
+    """Total seconds tasks waited for a concurrency slot"""
+    run_time: float = 0.0
+    """Total seconds tasks spent running"""
+    max_run_time: float = 0.0
+    """Longest run of a single task in seconds"""
+
+
+class TaskGroup:
+    """
+    A named group of background tasks sharing a concurrency cap. References
+    to running tasks are kept until they finish so they are not garbage
+    collected, and failures are logged with the task's timing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        concurrency: int | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        """
+        Class initializer
+
+        :param name: The name of the group
+        :param concurrency: Maximum number of tasks running at once,
+        defaults to unbounded
+        :param max_pending: Maximum number of tasks waiting or running, further
+        tasks are rejected, defaults to unbounded
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.stats = GroupStats()
+        self._semaphore = (
+            asyncio.Semaphore(concurrency) if concurrency is not None else None
+        )
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def _run(self, coro: Coroutine[Any, Any, Any], task_name: str) -> Any:
+        """
+        Run a task within the group's concurrency cap, recording its timing
+        and logging its failure
+
+        :param coro: The task's coroutine
+        :param task_name: The name of the task
+        :return: The result of the task
+        """
+        queued = time.perf_counter()
+        started = queued
+        try:
+            if self._semaphore is not None:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    result = await coro
+            else:
+                result = await coro
+        except asyncio.CancelledError:
+            self.stats.cancelled += 1
+            raise
+        except Exception:  # pylint: disable=W0718
+            self.stats.failed += 1
+            logger.exception(
+                "Task %s in group %s failed after %.3fs",
+                task_name,
+                self.name,
+                time.perf_counter() - started,
+            )
+            return None
+        finally:
+            # Close coroutines cancelled before they started
+            coro.close()
+            finished = time.perf_counter()
+            self.stats.wait_time += started - queued
+            self.stats.run_time += finished - started
+            self.stats.max_run_time = max(self.stats.max_run_time, finished - started)
+
+        self.stats.completed += 1
+        return result
+
+    def spawn(
+        self, coro: Coroutine[Any, Any, Any], *, name: str | None = None
+    ) -> asyncio.Task | None:
+        """
+        Start a task in the group
+
+        :param coro: The task's coroutine
+        :param name: The name of the task, defaults to the coroutine's name
+        :return: The task or None if the group is full
+        """
+        task_name = name or str(getattr(coro, "__qualname__", self.name))
+
+        if self.max_pending is not None and len(self._tasks) >= self.max_pending:
+            self.stats.rejected += 1
+            logger.warning("Task group %s is full, dropping %s", self.name, task_name)
+            coro.close()
+            return None
+
+        self.stats.started += 1
+        task = asyncio.get_running_loop().create_task(
+            self._run(coro, task_name), name=f"{self.name}:{task_name}"
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return task
+
+    async def drain(self, timeout: float | None = None) -> int:
+        """
+        Wait for the group's tasks to finish, cancelling those still running
+        after the timeout
+
+        :param timeout: Seconds to wait, defaults to waiting indefinitely
+        :return: The number of cancelled tasks
+        """
+        if not self._tasks:
+            return 0
+
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+        return len(pending)
+
+
+class TaskSupervisor:
+    """
+    Registry of named task groups
+    """
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        self._groups: dict[str, TaskGroup] = {}
+
+    def group(
+        self,
+        name: str,
+        *,
+        concurrency: int | None = None,
+        max_pending: int | None = None,
+    ) -> TaskGroup:
+        """
+        Get a task group, creating it if it does not exist
+
+        :param name: The name of the group
+        :param concurrency: Maximum number of tasks running at once for a new
+        group, defaults to unbounded
+        :param max_pending: Maximum number of tasks waiting or running for a
+        new group, defaults to unbounded
+        :return: The task group
+        """
+        if (group := self._groups.get(name)) is None:
+            group = self._groups[name] = TaskGroup(
+                name, concurrency=concurrency, max_pending=max_pending
+            )
+
+        return group
+
+    def spawn(
+        self, group: str, coro: Coroutine[Any, Any, Any], *, name: str | None = None
+    ) -> asyncio.Task | None:
+        """
+        Start a task in a group
+
+        :param group: The name of the group
+        :param coro: The task's coroutine
+        :param name: The name of the task, defaults to the coroutine's name
+        :return: The task or None if the group is full
+        """
+        return self.group(group).spawn(coro, name=name)
+
+    def stats(self) -> dict[str, GroupStats]:
+        """
+        Get the counters of each group
+
+        :return: The counters by group name
+        """
+        return {name: group.stats for name, group in self._groups.items()}
+
+    def running(self) -> dict[str, int]:
+        """
+        Get the number of unfinished tasks of each group
+
+        :return: The number of tasks by group name
+        """
+        return {name: len(group) for name, group in self._groups.items()}
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """
+        Wait for the tasks of every group to finish, cancelling those still
+        running after the timeout
+
+        :param timeout: Seconds to wait, defaults to waiting indefinitely
+        """
+        start = time.perf_counter()
+        running = sum(len(group) for group in self._groups.values())
+        if not running:
+            return
+
+        logger.info("Waiting for %d background tasks to finish", running)
+        results = await asyncio.gather(
+            *(group.drain(timeout) for group in self._groups.values())
+        )
+        if cancelled := sum(results):
+            logger.warning("Cancelled %d unfinished background tasks", cancelled)
+
+        logger.info("Background tasks drained in %.3fs", time.perf_counter() - start)
@@ -0,0 +1,650 @@
+"""
+MultiGP to discord synchronization
+"""
+
+import time
+import json
+import asyncio
+import hashlib
+import logging
+import datetime
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+
+import pytz
+
+from .api import MultiGPAPI
+from .database import ChapterBackfill, DatabaseManager, DiscordServer, RaceSnapshot
+from .timezones import TimezoneService
+
+logger = logging.getLogger(__name__)
+
+RaceRecord = tuple[
+    str, str, int | None, datetime.datetime | None, datetime.datetime | None
+]
+"""
+A race entry to be saved as (race id, chapter id, discord event id, start time,
+end time) with times in UTC
+"""
+
+RaceHandler = Callable[
+    [list[DiscordServer], RaceSnapshot], Awaitable[list[RaceRecord] | None]
+]
+"""
+Callback used to process a newly discovered race. It is provided the servers
+bound to the chapter and the race snapshot. It returns the race entries to save,
+or None if the race should be checked again next pass.
+"""
+
+_DATE_FORMAT = "%Y-%m-%d %I:%M %p"
+"""Date format used by the MultiGP API"""
+
+_LISTED_TIME_MARGIN = datetime.timedelta(days=1)
+"""
+Margin applied to start times from the chapter race list, which are in the
+venue's unknown timezone
+"""
+
+
+def race_content_hash(race: dict) -> str:
+    """
+    Hash a race entry from the chapter race list
+
+    :param race: The race entry
+    :return: The hex digest of the entry
+    """
+    encoded = json.dumps(race, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded, usedforsecurity=False).hexdigest()
+
+
+def listed_start_time(race: dict) -> datetime.datetime | None:
+    """
+    Get the start time of an entry in the chapter race list. The time is in
+    the venue's local time.
+
+    :param race: The race entry
+    :return: The naive start time or None if the entry has no valid start date
+    """
+    try:
+        return datetime.datetime.strptime(race["startDate"], _DATE_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def build_race_snapshot(
+    chapter_id: str,
+    race: dict,
+    race_data: dict,
+    timezones: TimezoneService,
+) -> RaceSnapshot:
+    """
+    Build a race snapshot from the race data pulled from MultiGP. The start
+    and end times are resolved in the venue's timezone and stored in UTC.
+
+    :param chapter_id: The id of the chapter
+    :param race: The race entry from the chapter race list
+    :param race_data: The race data pulled from MultiGP
+    :param timezones: Timezone resolution service for the venue location
+    :return: The race snapshot
+    """
+    local_tz = timezones.timezone_at(
+        lat=float(race_data["latitude"]), lng=float(race_data["longitude"])
+    )
+
+    start_time = end_time = None
+    if local_tz is not None:
+        tz = timezones.zone(local_tz)
+        starttime_obj = tz.localize(
+            datetime.datetime.strptime(race_data["startDate"], _DATE_FORMAT)
+        )
+
+        if race_data["endDate"]:
+            endtime_obj = tz.localize(
+                datetime.datetime.strptime(race_data["endDate"], _DATE_FORMAT)
+            )
+            if starttime_obj >= endtime_obj:
+                endtime_obj = starttime_obj + datetime.timedelta(hours=3)
+        else:
+            endtime_obj = starttime_obj + datetime.timedelta(hours=3)
+
+        start_time = starttime_obj.astimezone(pytz.utc).replace(tzinfo=None)
+        end_time = endtime_obj.astimezone(pytz.utc).replace(tzinfo=None)
+
+    return RaceSnapshot(
+        race["id"],
+        chapter_id,
+        race_content_hash(race),
+        race["name"],
+        race_data["chapterName"],
+        race_data["courseName"],
+        race_data["content"],
+        local_tz,
+        start_time,
+        end_time,
+        datetime.datetime.now(tz=pytz.utc).replace(tzinfo=None),
+    )
+
+
+@dataclass
+class SyncPassStats:
+    """
+    Statistics collected during a single synchronization pass
+    """
+
+    # pylint: disable=R0902
+
+    chapters: int = 0
+    """Number of chapters synced"""
+    servers: int = 0
+    """Number of discord servers covered by the synced chapters"""
+    failed_chapters: int = 0
+    """Number of chapters where the race list could not be pulled"""
+    backfilling_chapters: int = 0
+    """Number of chapters skipped because their backfill has not completed"""
+    new_races: int = 0
+    """Number of races not yet saved to the database"""
+    unchanged_races: int = 0
+    """Number of new races checked from their snapshot without pulling race data"""
+    pulled_races: int = 0
+    """Number of races whose data was pulled from MultiGP"""
+    deferred_races: int = 0
+    """Number of races left to a later pass because they start past the horizon"""
+    added_races: int = 0
+    """Number of race entries saved to the database"""
+    removed_races: int = 0
+    """Number of races removed from the database"""
+    duration: float = 0.0
+    """Total time of the pass in seconds"""
+
+
+class SyncEngine:
+    """
+    Synchronizes MultiGP races with the database. Servers are grouped by
+    chapter so each chapter's race list is only pulled once per pass, and
+    race work is spread over a bounded number of concurrent tasks.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        multigp: MultiGPAPI,
+        race_handler: RaceHandler,
+        timezones: TimezoneService,
+        *,
+        concurrency: int = 4,
+        detail_concurrency: int | None = None,
+    ) -> None:
+        """
+        Class initializer
+
+        :param db: The database manager
+        :param multigp: The MultiGP api manager
+        :param race_handler: Callback to process newly discovered races
+        :param timezones: Timezone resolution service for race venues
+        :param concurrency: Maximum number of concurrent MultiGP jobs, defaults to 4
+        :param detail_concurrency: Maximum number of race data pulls in flight,
+        defaults to `concurrency`
+        """
+        # pylint: disable=R0913
+
+        self._db = db
+        self._multigp = multigp
+        self._race_handler = race_handler
+        self._timezones = timezones
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._detail_semaphore = asyncio.Semaphore(detail_concurrency or concurrency)
+        self._backfilling: set[str] = set()
+
+    async def get_chapter_groups(self) -> dict[str, list[DiscordServer]]:
+        """
+        Group the configured discord servers by chapter
+
+        :return: The servers for each chapter id
+        """
+        groups: dict[str, list[DiscordServer]] = defaultdict(list)
+        async for server in self._db.get_servers():
+            groups[server.chapter_id].append(server)
+
+        return groups
+
+    async def _pull_race(
+        self, race: dict[str, str], api_key: str, *, fresh: bool = False
+    ) -> tuple[dict[str, str], dict | None]:
+        """
+        Pull the data for a race within the detail concurrency limit
+
+        :param race: The race entry from the chapter race list
+        :param api_key: The chapter api key
+        :param fresh: Replace any cached data of the race, defaults to False
+        :return: The race entry and its data, or None if it could not be pulled
+        """
+        async with self._detail_semaphore:
+            try:
+                return race, await self._multigp.pull_race_data(
+                    race["id"], api_key, fresh=fresh
+                )
+            except Exception as ex:  # pylint: disable=W0718
+                logger.error("Failed to pull race %s: %s", race["id"], ex)
+                return race, None
+
+    async def _check_race(
+        self, servers: list[DiscordServer], snapshot: RaceSnapshot
+    ) -> list[RaceRecord] | None:
+        """
+        Pass a race snapshot to the race handler
+
+        :param servers: The servers bound to the race's chapter
+        :param snapshot: The snapshot of the race
+        :return: The race entries to save or None
+        """
+        async with self._semaphore:
+            return await self._race_handler(servers, snapshot)
+
+    def _build_snapshot(
+        self, chapter_id: str, race: dict[str, str], race_data: dict
+    ) -> RaceSnapshot | None:
+        """
+        Build the snapshot of a pulled race, skipping races with invalid data
+
+        :param chapter_id: The id of the chapter
+        :param race: The race entry from the chapter race list
+        :param race_data: The race data pulled from MultiGP
+        :return: The race snapshot or None if the race data is invalid
+        """
+        try:
+            return build_race_snapshot(chapter_id, race, race_data, self._timezones)
+        except (KeyError, TypeError, ValueError) as ex:
+            logger.error("Invalid data for race %s: %s", race["id"], ex)
+            return None
+
+    async def _stream_snapshots(
+        self,
+        chapter_id: str,
+        api_key: str,
+        races: list[dict[str, str]],
+        snapshots: dict[str, RaceSnapshot],
+        stats: SyncPassStats,
+    ) -> AsyncIterator[RaceSnapshot]:
+        """
+        Stream up to date snapshots for races not yet saved to the database.
+        Race data is only pulled when the race's entry in the chapter race list
+        has changed since its last snapshot, in which case its cached data is
+        replaced. Unchanged snapshots are yielded first, then the missing race
+        data is pulled concurrently and each snapshot is yielded as soon as its
+        data arrives.
+
+        :param chapter_id: The id of the chapter
+        :param api_key: The chapter api key
+        :param races: The race entries from the chapter race list
+        :param snapshots: The previous snapshots of the chapter's races
+        :param stats: Statistics for the current pass
+        :yield: The snapshots of the races that can be checked
+        """
+        # pylint: disable=R0913,R0917
+
+        now = datetime.datetime.now(tz=pytz.utc).replace(tzinfo=None)
+
+        changed: list[dict[str, str]] = []
+        for race in races:
+            snapshot = snapshots.get(race["id"])
+            if snapshot is not None and snapshot.content_hash == race_content_hash(
+                race
+            ):
+                snapshot.last_checked = now
+                stats.unchanged_races += 1
+                yield snapshot
+            else:
+                changed.append(race)
+
+        if not changed:
+            return
+
+        # Races with a previous snapshot were edited, so cached data is stale
+        pulls = [
+            asyncio.create_task(
+                self._pull_race(race, api_key, fresh=race["id"] in snapshots)
+            )
+            for race in changed
+        ]
+        try:
+            await self._timezones.wait_ready()
+            for pull in asyncio.as_completed(pulls):
+                race, race_data = await pull
+                if race_data is None:
+                    continue
+
+                stats.pulled_races += 1
+                if (
+                    snapshot := self._build_snapshot(chapter_id, race, race_data)
+                ) is not None:
+                    yield snapshot
+        finally:
+            for pull in pulls:
+                pull.cancel()
+
+    async def _process_races(
+        self,
+        chapter_id: str,
+        servers: list[DiscordServer],
+        races: list[dict[str, str]],
+        snapshots: dict[str, RaceSnapshot],
+        stats: SyncPassStats,
+        horizon: datetime.datetime | None = None,
+    ) -> tuple[list[RaceRecord], list[RaceSnapshot]]:
+        """
+        Check new races as their snapshots become available. Races starting
+        after the horizon have their snapshot saved but are not checked.
+
+        :param chapter_id: The id of the chapter
+        :param servers: The servers bound to the chapter
+        :param races: The new race entries from the chapter race list
+        :param snapshots: The previous snapshots of the chapter's races
+        :param stats: Statistics for the current pass
+        :param horizon: UTC time after which races are not checked, defaults to None
+        :return: The race entries and snapshots to save
+        """
+        # pylint: disable=R0913,R0917
+
+        checked: list[RaceSnapshot] = []
+        deferred: list[RaceSnapshot] = []
+        checks: list[asyncio.Task] = []
+        try:
+            async for snapshot in self._stream_snapshots(
+                chapter_id, servers[0].api_key, races, snapshots, stats
+            ):
+                if (
+                    horizon is not None
+                    and snapshot.start_time is not None
+                    and snapshot.start_time > horizon
+                ):
+                    stats.deferred_races += 1
+                    deferred.append(snapshot)
+                    continue
+
+                checked.append(snapshot)
+                checks.append(asyncio.create_task(self._check_race(servers, snapshot)))
+        except Exception as ex:  # pylint: disable=W0718
+            # Races already checked may have created events, so their records
+            # are still saved
+            logger.error("Failed to stream races of chapter %s: %s", chapter_id, ex)
+        except BaseException:
+            for check in checks:
+                check.cancel()
+            raise
+
+        records: list[RaceRecord] = []
+        for snapshot, result in zip(
+            checked, await asyncio.gather(*checks, return_exceptions=True)
+        ):
+            if isinstance(result, BaseException):
+                logger.error("Failed to sync race %s: %s", snapshot.race_id, result)
+            elif result is not None:
+                records.extend(result)
+
+        return records, checked + deferred
+
+    async def sync_chapter(
+        self, chapter_id: str, servers: list[DiscordServer], stats: SyncPassStats
+    ) -> None:
+        """
+        Sync the races for a single chapter
+
+        :param chapter_id: The id of the chapter
+        :param servers: The servers bound to the chapter
+        :param stats: Statistics for the current pass
+        """
+        async with self._semaphore:
+            db_races = await self._db.get_chapter_race_ids(chapter_id)
+            snapshots = await self._db.get_race_snapshots(chapter_id)
+            mgp_races = await self._multigp.pull_races(chapter_id, servers[0].api_key)
+
+        if mgp_races is None:
+            stats.failed_chapters += 1
+            return
+
+        new_races = [race for race in mgp_races if race["id"] not in db_races]
+        stats.new_races += len(new_races)
+
+        records, checked = await self._process_races(
+            chapter_id, servers, new_races, snapshots, stats
+        )
+
+        changes = await self._db.reconcile_chapter_races(
+            chapter_id, records, checked, {race["id"] for race in mgp_races}
+        )
+        stats.added_races += changes.added
+        stats.removed_races += len(changes.removed)
+
+    async def backfill(self, chapter_id: str, *, batch_size: int = 25) -> None:
+        """
+        Run the first activation backfill of a chapter. Races that ended
+        before the backfill are saved without pulling their data, races past
+        the backfill horizon are left to the regular sync, and the rest are
+        processed in batches. Progress is saved after each batch, so an
+        interrupted backfill resumes where it stopped. The regular sync skips
+        the chapter until its backfill completes.
+
+        :param chapter_id: The id of the chapter
+        :param batch_size: Number of races processed between progress saves,
+        defaults to 25
+        """
+        if chapter_id in self._backfilling:
+            return
+
+        job = await self._db.get_backfill(chapter_id)
+        if job is None or job.completed is not None:
+            return
+
+        self._backfilling.add(chapter_id)
+        try:
+            await self._run_backfill(job, max(1, batch_size))
+        finally:
+            self._backfilling.discard(chapter_id)
+
+    def _split_backfill(
+        self,
+        job: ChapterBackfill,
+        mgp_races: list[dict[str, str]],
+        db_races: set[str],
+        stats: SyncPassStats,
+    ) -> tuple[list[RaceRecord], list[dict[str, str]]]:
+        """
+        Split the new races of a backfill into races that already ended and
+        races to process. Races past the backfill horizon are counted as
+        deferred.
+
+        :param job: The backfill
+        :param mgp_races: The races listed by the chapter
+        :param db_races: Ids of the races already in the database
+        :param stats: Statistics for the backfill
+        :return: Records of the ended races and the races to process
+        """
+        now = datetime.datetime.now(tz=pytz.utc).replace(tzinfo=None)
+
+        past: list[RaceRecord] = []
+        pending: list[dict[str, str]] = []
+        for race in mgp_races:
+            if race["id"] in db_races:
+                continue
+
+            listed_start = listed_start_time(race)
+            if listed_start is not None and listed_start < now - _LISTED_TIME_MARGIN:
+                past.append((race["id"], job.chapter_id, None, None, None))
+            elif listed_start is not None and listed_start > (
+                job.horizon + _LISTED_TIME_MARGIN
+            ):
+                stats.deferred_races += 1
+            else:
+                pending.append(race)
+
+        return past, pending
+
+    async def _backfill_batch(
+        self,
+        job: ChapterBackfill,
+        servers: list[DiscordServer],
+        races: list[dict[str, str]],
+        snapshots: dict[str, RaceSnapshot],
+        listed: set[str],
+        stats: SyncPassStats,
+    ) -> int:
+        """
+        Process and save a batch of backfilled races
+
+        :param job: The backfill
+        :param servers: The servers bound to the chapter
+        :param races: The races of the batch
+        :param snapshots: The previous snapshots of the chapter's races
+        :param listed: Ids of every race listed by the chapter
+        :param stats: Statistics for the backfill
+        :return: The number of races processed, excluding deferred races
+        """
+        # pylint: disable=R0913,R0917
+
+        deferred = stats.deferred_races
+        records, checked = await self._process_races(
+            job.chapter_id, servers, races, snapshots, stats, job.horizon
+        )
+        changes = await self._db.reconcile_chapter_races(
+            job.chapter_id, records, checked, listed
+        )
+        stats.added_races += changes.added
+        return len(races) - (stats.deferred_races - deferred)
+
+    async def _run_backfill(self, job: ChapterBackfill, batch_size: int) -> None:
+        """
+        Process a pending backfill
+
+        :param job: The backfill
+        :param batch_size: Number of races processed between progress saves
+        """
+        start = time.perf_counter()
+        stats = SyncPassStats(chapters=1)
+
+        servers = [
+            server async for server in self._db.get_chapter_servers(job.chapter_id)
+        ]
+        stats.servers = len(servers)
+        if not servers:
+            await self._db.update_backfill(
+                job.chapter_id, total=0, processed=0, deferred=0, completed=True
+            )
+            return
+
+        async with self._semaphore:
+            db_races = await self._db.get_chapter_race_ids(job.chapter_id)
+            snapshots = await self._db.get_race_snapshots(job.chapter_id)
+            mgp_races = await self._multigp.pull_races(
+                job.chapter_id, servers[0].api_key
+            )
+
+        if mgp_races is None:
+            logger.warning(
+                "Backfill of chapter %s could not pull races", job.chapter_id
+            )
+            return
+
+        listed = {race["id"] for race in mgp_races}
+        processed = len(listed & db_races)
+        past, pending = self._split_backfill(job, mgp_races, db_races, stats)
+
+        stats.new_races = len(past) + len(pending) + stats.deferred_races
+        if past:
+            changes = await self._db.reconcile_chapter_races(
+                job.chapter_id, past, [], listed
+            )
+            stats.added_races += changes.added
+            processed += len(past)
+            await self._db.update_backfill(
+                job.chapter_id,
+                total=len(listed),
+                processed=processed,
+                deferred=stats.deferred_races,
+            )
+
+        for index in range(0, len(pending), batch_size):
+            processed += await self._backfill_batch(
+                job,
+                servers,
+                pending[index : index + batch_size],
+                snapshots,
+                listed,
+                stats,
+            )
+            await self._db.update_backfill(
+                job.chapter_id,
+                total=len(listed),
+                processed=processed,
+                deferred=stats.deferred_races,
+            )
+
+        await self._db.update_backfill(
+            job.chapter_id,
+            total=len(listed),
+            processed=processed,
+            deferred=stats.deferred_races,
+            completed=True,
+        )
+
+        stats.duration = time.perf_counter() - start
+        logger.info(
+            "Backfill of chapter %s finished in %.2fs: %d races listed, %d new "
+            "(%d in the past, %d pulled), %d added, %d deferred",
+            job.chapter_id,
+            stats.duration,
+            len(listed),
+            stats.new_races,
+            len(past),
+            stats.pulled_races,
+            stats.added_races,
+            stats.deferred_races,
+        )
+
+    async def run_pass(self) -> SyncPassStats:
+        """
+        Run a full synchronization pass over all chapters
+
+        :return: Statistics for the pass
+        """
+        start = time.perf_counter()
+        stats = SyncPassStats()
+
+        groups = await self.get_chapter_groups()
+        for backfill in await self._db.get_pending_backfills():
+            if groups.pop(backfill.chapter_id, None) is not None:
+                stats.backfilling_chapters += 1
+
+        stats.chapters = len(groups)
+        stats.servers = sum(len(servers) for servers in groups.values())
+
+        results = await asyncio.gather(
+            *(
+                self.sync_chapter(chapter_id, servers, stats)
+                for chapter_id, servers in groups.items()
+            ),
+            return_exceptions=True,
+        )
+        for chapter_id, result in zip(groups, results):
+            if isinstance(result, BaseException):
+                stats.failed_chapters += 1
+                logger.error("Failed to sync chapter %s: %s", chapter_id, result)
+
+        stats.duration = time.perf_counter() - start
+        logger.info(
+            "Sync pass finished in %.2fs: %d chapters, %d servers, %d new races "
+            "(%d unchanged, %d pulled), %d added, %d removed, %d failed chapters, "
+            "%d chapters backfilling",
+            stats.duration,
+            stats.chapters,
+            stats.servers,
+            stats.new_races,
+            stats.unchanged_races,
+            stats.pulled_races,
+            stats.added_races,
+            stats.removed_races,
+            stats.failed_chapters,
+            stats.backfilling_chapters,
+        )
+
+        return stats
@@ -0,0 +1,163 @@
+"""
+Race venue timezone resolution
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+import pytz
+import timezonefinder
+
+logger = logging.getLogger(__name__)
+
+
+class TimezoneService:
+    """
+    Memoized timezone lookups for race venues. Coordinates are rounded before
+    lookup so races held at the same field share a cache entry.
+
+    The timezone finder's data is loaded on first use, or ahead of time in a
+    background thread with `load_in_background`.
+    """
+
+    # pylint: disable=R0902
+
+    def __init__(
+        self,
+        finder_factory: Callable[..., timezonefinder.TimezoneFinder] = (
+            timezonefinder.TimezoneFinder
+        ),
+        *,
+        in_memory: bool = False,
+        precision: int = 3,
+        maxsize: int = 1024,
+    ) -> None:
+        """
+        Class initializer
+
+        :param finder_factory: Callable used to build the timezone finder,
+        defaults to `timezonefinder.TimezoneFinder`
+        :param in_memory: Load the timezone data into memory instead of reading
+        it from disk, defaults to False
+        :param precision: Decimal places kept when rounding coordinates, defaults to 3
+        :param maxsize: Maximum number of cached locations, defaults to 1024
+        """
+        self._finder_factory = finder_factory
+        self._finder: timezonefinder.TimezoneFinder | None = None
+        self._loader: threading.Thread | None = None
+        self._load_lock = threading.Lock()
+        self.in_memory = in_memory
+        self.precision = precision
+        self.maxsize = maxsize
+        self.hits = 0
+        """Number of lookups served from the cache"""
+        self.misses = 0
+        """Number of lookups passed to the timezone finder"""
+        self._cache: OrderedDict[tuple[float, float], str | None] = OrderedDict()
+        self._zones: dict[str, pytz.BaseTzInfo] = {}
+
+    def _load(self) -> timezonefinder.TimezoneFinder:
+        """
+        Build the timezone finder if it has not been built yet. Blocks while
+        another thread is building it.
+
+        :return: The timezone finder
+        """
+        with self._load_lock:
+            if self._finder is None:
+                start = time.perf_counter()
+                self._finder = self._finder_factory(in_memory=self.in_memory)
+                logger.info(
+                    "Loaded timezone data in %.2fs (in memory: %s)",
+                    time.perf_counter() - start,
+                    self.in_memory,
+                )
+
+            return self._finder
+
+    def load_in_background(self) -> None:
+        """
+        Start building the timezone finder in a background thread
+        """
+        if self._finder is not None or self._loader is not None:
+            return
+
+        self._loader = threading.Thread(
+            target=self._load, name="timezone-loader", daemon=True
+        )
+        self._loader.start()
+
+    async def wait_ready(self) -> None:
+        """
+        Wait for the timezone finder to be built without blocking the event loop
+        """
+        if self._finder is None:
+            await asyncio.to_thread(self._load)
+
+    @property
+    def finder(self) -> timezonefinder.TimezoneFinder:
+        """
+        The timezone finder, built on first use
+        """
+        if self._finder is None:
+            return self._load()
+
+        return self._finder
+
+    def _key(self, lat: float, lng: float) -> tuple[float, float]:
+        """
+        Build the cache key for a location
+
+        :param lat: The latitude of the location
+        :param lng: The longitude of the location
+        :return: The rounded coordinates
+        """
+        return round(lat, self.precision), round(lng, self.precision)
+
+    def _store(self, key: tuple[float, float], name: str | None) -> None:
+        """
+        Add a lookup result to the cache
+
+        :param key: The rounded coordinates
+        :param name: The timezone name
+        """
+        self._cache[key] = name
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def timezone_at(self, *, lat: float, lng: float) -> str | None:
+        """
+        Get the name of the timezone at a location
+
+        :param lat: The latitude of the location
+        :param lng: The longitude of the location
+        :return: The timezone name or None
+        """
+        key = self._key(lat, lng)
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        name = self.finder.timezone_at(lat=key[0], lng=key[1])
+        self._store(key, name)
+
+        return name
+
+    def zone(self, name: str) -> pytz.BaseTzInfo:
+        """
+        Get a reusable timezone object
+
+        :param name: The timezone name
+        :return: The timezone object
+        """
+        if (zone := self._zones.get(name)) is None:
+            zone = self._zones[name] = pytz.timezone(name)
+
+        return zone
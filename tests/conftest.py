@@ -0,0 +1,220 @@
+"""
+Shared fixtures and fakes for the tests
+"""
+
+import datetime
+
+import pytest
+import pytest_asyncio
+import pytz
+
+from billy.database import DatabaseManager, RaceSnapshot
+from billy.sync import RaceRecord, SyncEngine
+
+# pylint: disable=R0903
+
+DATE_FORMAT = "%Y-%m-%d %I:%M %p"
+"""Date format used by the MultiGP API"""
+
+
+def race_snapshot(
+    start: datetime.datetime | None = None, timezone: str | None = "UTC"
+) -> RaceSnapshot:
+    """
+    Build the snapshot of a race, starting in a week by default
+
+    :param start: The UTC start time of the race, defaults to None
+    :param timezone: The timezone of the venue, defaults to "UTC"
+    :return: The snapshot
+    """
+    if start is None:
+        start = datetime.datetime.now(datetime.timezone.utc).replace(
+            tzinfo=None
+        ) + datetime.timedelta(days=7)
+
+    return RaceSnapshot(
+        "race",
+        "chapter",
+        "hash",
+        "Race",
+        "Chapter",
+        "Field",
+        "Details",
+        timezone,
+        start,
+        start + datetime.timedelta(hours=4),
+        start,
+    )
+
+
+class FakeMultiGP:
+    """
+    MultiGP manager serving races from memory
+    """
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        self.races: dict[str, dict[str, dict]] = {}
+        """Race data by race id for each chapter id"""
+        self.pulls: list[str] = []
+        """Ids of the races whose data was pulled"""
+        self.fresh: list[str] = []
+        """Ids of the races pulled bypassing the response cache"""
+        self.failing: set[str] = set()
+        """Ids of the chapters whose race list cannot be pulled"""
+
+    def add_race(
+        self, chapter_id: str, race_id: str, start: datetime.datetime, **data: str
+    ) -> dict:
+        """
+        Add a race to a chapter
+
+        :param chapter_id: The id of the chapter
+        :param race_id: The id of the race
+        :param start: The local start time of the race
+        :return: The race data
+        """
+        race = {
+            "id": race_id,
+            "name": f"Race {race_id}",
+            "startDate": f"{start:{DATE_FORMAT}}",
+            "endDate": f"{start + datetime.timedelta(hours=4):{DATE_FORMAT}}",
+            "chapterName": f"Chapter {chapter_id}",
+            "courseName": "Field",
+            "content": "Details",
+            "latitude": "0.0",
+            "longitude": "0.0",
+        } | data
+        self.races.setdefault(chapter_id, {})[race_id] = race
+        return race
+
+    async def pull_chapter(self, api_key: str) -> dict | None:
+        """
+        Get the chapter of an API key, which is the chapter id itself
+        """
+        return {"status": True, "chapterId": api_key, "chapterName": api_key}
+
+    async def pull_races(self, chapter_id: str, _: str) -> list[dict] | None:
+        """
+        Get the race list of a chapter
+        """
+        if chapter_id in self.failing:
+            return None
+
+        return [
+            {"id": race["id"], "name": race["name"], "startDate": race["startDate"]}
+            for race in self.races.get(chapter_id, {}).values()
+        ]
+
+    async def pull_race_data(
+        self, race_id: str, _: str, *, fresh: bool = False
+    ) -> dict | None:
+        """
+        Get the data of a race
+        """
+        self.pulls.append(race_id)
+        if fresh:
+            self.fresh.append(race_id)
+        for races in self.races.values():
+            if race_id in races:
+                return dict(races[race_id])
+
+        return None
+
+
+class FakeTimezones:
+    """
+    Timezone service placing every venue in UTC
+    """
+
+    async def wait_ready(self) -> None:
+        """
+        The service is always ready
+        """
+
+    def timezone_at(self, **_: float) -> str:
+        """
+        Get the timezone of a location
+        """
+        return "UTC"
+
+    def zone(self, name: str) -> pytz.BaseTzInfo:
+        """
+        Get a timezone by name
+        """
+        return pytz.timezone(name)
+
+
+class RaceHandler:
+    """
+    Race handler creating a discord event for every server
+    """
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        self.events: list[str] = []
+        """Ids of the races an event was created for, once per server"""
+        self.retry: set[str] = set()
+        """Ids of the races left to the next pass"""
+
+    async def __call__(self, servers, snapshot) -> list[RaceRecord] | None:
+        """
+        Create the events of a race
+        """
+        if snapshot.race_id in self.retry:
+            return None
+
+        records: list[RaceRecord] = []
+        for _ in servers:
+            self.events.append(snapshot.race_id)
+            records.append(
+                (
+                    snapshot.race_id,
+                    snapshot.chapter_id,
+                    len(self.events),
+                    snapshot.start_time,
+                    snapshot.end_time,
+                )
+            )
+
+        return records
+
+
+@pytest.fixture(name="multigp")
+def fixture_multigp():
+    """
+    A MultiGP manager serving races from memory
+    """
+    return FakeMultiGP()
+
+
+@pytest_asyncio.fixture(name="db", loop_scope="function")
+async def fixture_db(tmp_path, multigp):
+    """
+    A migrated database in a temporary directory
+    """
+    db = DatabaseManager(filename=str(tmp_path / "billy.db"))
+    db._multigp = multigp  # pylint: disable=W0212
+    await db.setup()
+    yield db
+    await db.shutdown()
+
+
+@pytest.fixture(name="handler")
+def fixture_handler():
+    """
+    A race handler recording the created events
+    """
+    return RaceHandler()
+
+
+@pytest.fixture(name="engine")
+def fixture_engine(db, multigp, handler):
+    """
+    A sync engine running against the fakes
+    """
+    return SyncEngine(db, multigp, handler, FakeTimezones())  # type: ignore[arg-type]
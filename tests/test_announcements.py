@@ -0,0 +1,226 @@
+"""
+Tests of the shared race announcements
+"""
+
+import asyncio
+import datetime
+
+from conftest import race_snapshot
+
+from billy.announcements import AnnouncementService
+from billy.api.ollama import LLMPriority, LLMQueue
+
+
+class FakeOllama:
+    """
+    Ollama manager counting generations dispatched through a real queue
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self, queue: LLMQueue) -> None:
+        """
+        Class initializer
+
+        :param queue: The dispatch queue
+        """
+        self.active = True
+        self.queue = queue
+        self.generations: list[str] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def generate_single_response(
+        self,
+        prompt: str,
+        *,
+        priority: LLMPriority = LLMPriority.ANNOUNCEMENT,
+        key: str | None = None,
+    ) -> str | None:
+        """
+        Generate a response once released
+        """
+
+        async def generate() -> str:
+            await self.release.wait()
+            self.generations.append(prompt)
+            return f"announcement {len(self.generations)}"
+
+        return await self.queue.submit(priority, generate, key=key)
+
+
+class FakeStore:
+    """
+    Draft store keeping drafts in memory
+    """
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        self.drafts: dict[tuple[str, str, str, int], str] = {}
+        self.saves = 0
+
+    async def get_announcement_draft(
+        self, race_id: str, chapter_id: str, content_hash: str, variant: int
+    ) -> str | None:
+        """
+        Get a saved draft
+        """
+        return self.drafts.get((race_id, chapter_id, content_hash, variant))
+
+    async def save_announcement_draft(
+        self,
+        race_id: str,
+        chapter_id: str,
+        content_hash: str,
+        variant: int,
+        content: str,
+    ) -> None:
+        """
+        Save a draft
+        """
+        # pylint: disable=R0913,R0917
+        self.saves += 1
+        self.drafts[(race_id, chapter_id, content_hash, variant)] = content
+
+
+async def _drafting(service: AnnouncementService, ollama: FakeOllama) -> None:
+    """
+    Start the drafting loop and wait until a draft is waiting for a slot
+    """
+    service.start()
+    service.enqueue(race_snapshot(), datetime.date.today())
+    while ollama.queue.stats()["depth_draft"] == 0:
+        await asyncio.sleep(0)
+
+
+async def test_servers_share_a_running_draft():
+    """
+    Servers announcing a race being drafted share the draft's generation
+    """
+    ollama = FakeOllama(LLMQueue(concurrency=1))
+    store = FakeStore()
+    service = AnnouncementService(ollama, store=store)  # type: ignore[arg-type]
+    assert await ollama.queue.acquire(LLMPriority.MENTION)
+    await _drafting(service, ollama)
+
+    gets = [
+        asyncio.create_task(service.get(race_snapshot(), datetime.date.today(), server))
+        for server in range(5)
+    ]
+    await asyncio.sleep(0)
+    stats = ollama.queue.stats()
+    assert (stats["depth_draft"], stats["depth_announcement"]) == (0, 1)
+
+    ollama.queue.release()
+    assert await asyncio.gather(*gets) == ["announcement 1"] * 5
+    await service.stop()
+
+    assert len(ollama.generations) == 1
+    assert store.saves == 1
+    assert service.drafted == 1
+
+
+async def test_servers_share_one_generation_after_a_shed_draft():
+    """
+    A draft shed by the queue is generated once for every waiting server
+    """
+    ollama = FakeOllama(LLMQueue(concurrency=1, max_depth=1))
+    service = AnnouncementService(ollama)  # type: ignore[arg-type]
+    assert await ollama.queue.acquire(LLMPriority.MENTION)
+    await _drafting(service, ollama)
+
+    mention = asyncio.create_task(ollama.queue.acquire(LLMPriority.MENTION))
+    await asyncio.sleep(0)
+    assert ollama.queue.shed == 1
+    await service.stop()
+
+    ollama.release.clear()
+    gets = [
+        asyncio.create_task(service.get(race_snapshot(), datetime.date.today(), server))
+        for server in range(5)
+    ]
+    await asyncio.sleep(0)
+    ollama.queue.release()
+    assert await mention
+    ollama.queue.release()
+    ollama.release.set()
+
+    assert await asyncio.gather(*gets) == ["announcement 1"] * 5
+    assert len(ollama.generations) == 1
+
+
+async def test_started_races_are_not_drafted():
+    """
+    Races that already started are not queued for drafting
+    """
+    ollama = FakeOllama(LLMQueue())
+    service = AnnouncementService(ollama)  # type: ignore[arg-type]
+
+    service.enqueue(
+        race_snapshot(datetime.datetime.now() - datetime.timedelta(hours=1)),
+        datetime.date.today(),
+    )
+
+    assert service._queue.empty()  # pylint: disable=W0212
+
+
+async def test_servers_share_one_generation_per_variant():
+    """
+    Concurrent announcements for a chapter's servers are generated once per
+    variant, and later servers reuse the cached announcements
+    """
+    ollama = FakeOllama(LLMQueue(concurrency=4))
+    service = AnnouncementService(ollama, variants=2)  # type: ignore[arg-type]
+    ollama.release.clear()
+
+    gets = [
+        asyncio.create_task(service.get(race_snapshot(), datetime.date.today(), server))
+        for server in range(6)
+    ]
+    await asyncio.sleep(0)
+    ollama.release.set()
+    announcements = await asyncio.gather(*gets)
+
+    assert len(ollama.generations) == 2
+    assert set(announcements[0::2]) == {announcements[0]}
+    assert set(announcements[1::2]) == {announcements[1]}
+    assert announcements[0] != announcements[1]
+
+    assert (
+        await service.get(race_snapshot(), datetime.date.today(), 7) == announcements[1]
+    )
+    assert len(ollama.generations) == 2
+
+
+async def test_edited_race_is_announced_again():
+    """
+    A race whose details changed gets a new announcement
+    """
+    ollama = FakeOllama(LLMQueue())
+    service = AnnouncementService(ollama)  # type: ignore[arg-type]
+    edited = race_snapshot()
+    edited.content_hash = "edited"
+
+    assert await service.get(race_snapshot(), datetime.date.today()) == "announcement 1"
+    assert await service.get(edited, datetime.date.today()) == "announcement 2"
+    assert await service.get(race_snapshot(), datetime.date.today()) == "announcement 1"
+
+
+async def test_saved_drafts_survive_a_restart():
+    """
+    Announcements saved to the store are sent without generating them again
+    """
+    ollama = FakeOllama(LLMQueue())
+    store = FakeStore()
+    service = AnnouncementService(ollama, store=store)  # type: ignore[arg-type]
+    await service.draft(race_snapshot(), datetime.date.today())
+
+    restarted = AnnouncementService(ollama, store=store)  # type: ignore[arg-type]
+
+    assert (
+        await restarted.get(race_snapshot(), datetime.date.today()) == "announcement 1"
+    )
+    assert len(ollama.generations) == 1
+    assert store.saves == 1
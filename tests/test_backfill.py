@@ -0,0 +1,142 @@
+"""
+Tests of the first activation backfill of a chapter
+"""
+
+import asyncio
+import datetime
+
+import pytest
+
+from conftest import RaceHandler
+
+
+class GatedHandler(RaceHandler):
+    """
+    Race handler holding the checks of some races until released
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        super().__init__()
+        self.gated: set[str] = set()
+        """Ids of the races held until the gate opens"""
+        self.waiting = asyncio.Event()
+        """Set once a held race is waiting"""
+        self.gate = asyncio.Event()
+        """Releases the held races"""
+
+    async def __call__(self, servers, snapshot):
+        """
+        Create the events of a race, waiting for the gate if it is held
+        """
+        if snapshot.race_id in self.gated:
+            self.waiting.set()
+            await self.gate.wait()
+
+        return await super().__call__(servers, snapshot)
+
+
+@pytest.fixture(name="handler")
+def fixture_handler():
+    """
+    A race handler that can hold races
+    """
+    return GatedHandler()
+
+
+def _in_days(days: float) -> datetime.datetime:
+    """
+    Get a start time a number of days from now
+    """
+    return datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(
+        days=days
+    )
+
+
+async def _activate(db) -> None:
+    """
+    Bind a server to the chapter with a backfill horizon a month from now
+    """
+    horizon = datetime.datetime.now(datetime.timezone.utc).replace(
+        tzinfo=None
+    ) + datetime.timedelta(days=30)
+    await db.set_server_configuration(1, 10, "chapter", backfill_horizon=horizon)
+
+
+async def test_backfill_splits_past_and_distant_races(db, multigp, handler, engine):
+    """
+    Past races are saved without pulling their data, and races past the
+    horizon are left to the regular sync
+    """
+    await _activate(db)
+    multigp.add_race("chapter", "past", _in_days(-5))
+    multigp.add_race("chapter", "soon", _in_days(3))
+    multigp.add_race("chapter", "distant", _in_days(60))
+
+    await engine.backfill("chapter")
+
+    assert multigp.pulls == ["soon"]
+    assert handler.events == ["soon"]
+    assert await db.get_chapter_race_ids("chapter") == {"past", "soon"}
+
+    job = await db.get_backfill("chapter")
+    assert job.completed is not None
+    assert (job.total, job.processed, job.deferred) == (3, 2, 1)
+
+    await engine.run_pass()
+    assert handler.events == ["soon", "distant"]
+
+
+async def test_sync_skips_backfilling_chapters(db, multigp, handler, engine):
+    """
+    The regular sync leaves a chapter alone until its backfill completes
+    """
+    await _activate(db)
+    multigp.add_race("chapter", "race", _in_days(3))
+
+    stats = await engine.run_pass()
+
+    assert (stats.chapters, stats.backfilling_chapters) == (0, 1)
+    assert not multigp.pulls
+
+    await engine.backfill("chapter")
+    stats = await engine.run_pass()
+
+    assert (stats.chapters, stats.backfilling_chapters) == (1, 0)
+    assert handler.events == ["race"]
+
+
+async def test_interrupted_backfill_resumes(db, multigp, handler, engine):
+    """
+    A backfill interrupted between batches keeps its progress and resumes
+    without checking the saved races again
+    """
+    await _activate(db)
+    for race_id in ("first", "second", "third"):
+        multigp.add_race("chapter", race_id, _in_days(3))
+    handler.gated.add("second")
+
+    task = asyncio.create_task(engine.backfill("chapter", batch_size=1))
+    await handler.waiting.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    job = await db.get_backfill("chapter")
+    assert job.completed is None
+    assert job.processed == 1
+    assert await db.get_chapter_race_ids("chapter") == {"first"}
+
+    handler.gate.set()
+    await engine.backfill("chapter", batch_size=1)
+
+    assert handler.events == ["first", "second", "third"]
+    assert multigp.pulls == ["first", "second", "second", "third"]
+
+    job = await db.get_backfill("chapter")
+    assert job.completed is not None
+    assert (job.total, job.processed) == (3, 3)
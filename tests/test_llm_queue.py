@@ -0,0 +1,198 @@
+"""
+Tests of the Ollama generation dispatch queue
+"""
+
+import asyncio
+
+from billy.api.ollama import LLMPriority, LLMQueue
+
+
+async def _waiter(queue: LLMQueue, priority: LLMPriority, order: list) -> bool:
+    """
+    Wait for a slot, recording the priority once it is granted
+    """
+    granted = await queue.acquire(priority)
+    if granted:
+        order.append(priority)
+        queue.release()
+    return granted
+
+
+async def test_waiting_requests_are_served_by_priority():
+    """
+    Released slots go to the highest priority waiting request
+    """
+    queue = LLMQueue(concurrency=1, max_depth=8)
+    order: list[LLMPriority] = []
+    assert await queue.acquire(LLMPriority.MENTION)
+
+    waiters = [
+        asyncio.create_task(_waiter(queue, priority, order))
+        for priority in (
+            LLMPriority.DRAFT,
+            LLMPriority.RANDOM,
+            LLMPriority.ANNOUNCEMENT,
+            LLMPriority.MENTION,
+        )
+    ]
+    await asyncio.sleep(0)
+    assert queue.depth == 4
+
+    queue.release()
+    assert all(await asyncio.gather(*waiters))
+    assert order == [
+        LLMPriority.MENTION,
+        LLMPriority.ANNOUNCEMENT,
+        LLMPriority.RANDOM,
+        LLMPriority.DRAFT,
+    ]
+    assert queue.active == 0
+
+
+async def test_full_queue_sheds_lowest_priority():
+    """
+    A higher priority request replaces the lowest priority waiting request
+    """
+    queue = LLMQueue(concurrency=1, max_depth=1)
+    order: list[LLMPriority] = []
+    assert await queue.acquire(LLMPriority.MENTION)
+
+    draft = asyncio.create_task(_waiter(queue, LLMPriority.DRAFT, order))
+    await asyncio.sleep(0)
+    mention = asyncio.create_task(_waiter(queue, LLMPriority.MENTION, order))
+    await asyncio.sleep(0)
+
+    assert await draft is False
+    queue.release()
+    assert await mention is True
+    assert order == [LLMPriority.MENTION]
+    assert queue.shed == 1
+
+
+async def test_full_queue_rejects_lower_priority():
+    """
+    A request no more important than every waiting request is shed
+    """
+    queue = LLMQueue(concurrency=1, max_depth=1)
+    order: list[LLMPriority] = []
+    assert await queue.acquire(LLMPriority.MENTION)
+
+    mention = asyncio.create_task(_waiter(queue, LLMPriority.MENTION, order))
+    await asyncio.sleep(0)
+
+    assert await queue.acquire(LLMPriority.RANDOM) is False
+    queue.release()
+    assert await mention is True
+    assert queue.shed == 1
+
+
+async def test_protected_requests_are_never_shed():
+    """
+    Announcements are queued past the depth limit and never replaced
+    """
+    queue = LLMQueue(concurrency=1, max_depth=1)
+    order: list[LLMPriority] = []
+    assert await queue.acquire(LLMPriority.MENTION)
+
+    waiters = [
+        asyncio.create_task(_waiter(queue, LLMPriority.ANNOUNCEMENT, order))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    assert queue.depth == 3
+
+    assert await queue.acquire(LLMPriority.DRAFT) is False
+    assert await queue.acquire(LLMPriority.MENTION) is False
+
+    queue.release()
+    assert all(await asyncio.gather(*waiters))
+    assert order == [LLMPriority.ANNOUNCEMENT] * 3
+    assert queue.shed == 2
+
+
+async def test_submit_deduplicates_by_key():
+    """
+    Requests sharing a key share one generation
+    """
+    queue = LLMQueue(concurrency=1)
+    calls = 0
+
+    async def generate() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return "text"
+
+    results = await asyncio.gather(
+        *(
+            queue.submit(LLMPriority.ANNOUNCEMENT, generate, key="race")
+            for _ in range(3)
+        )
+    )
+
+    assert results == ["text"] * 3
+    assert calls == 1
+    assert queue.deduplicated == 2
+
+
+async def test_shared_request_is_promoted():
+    """
+    A request joining a waiting keyed request raises its priority
+    """
+    queue = LLMQueue(concurrency=1, max_depth=8)
+    order: list[str] = []
+    assert await queue.acquire(LLMPriority.MENTION)
+
+    async def generate(name: str) -> str:
+        order.append(name)
+        return name
+
+    draft = asyncio.create_task(
+        queue.submit(LLMPriority.DRAFT, lambda: generate("draft"), key="race")
+    )
+    random = asyncio.create_task(
+        queue.submit(LLMPriority.RANDOM, lambda: generate("random"))
+    )
+    await asyncio.sleep(0)
+    announcement = asyncio.create_task(
+        queue.submit(LLMPriority.ANNOUNCEMENT, lambda: generate("other"), key="race")
+    )
+    await asyncio.sleep(0)
+    assert queue.stats()["depth_announcement"] == 1
+
+    queue.release()
+    assert await asyncio.gather(draft, announcement, random) == [
+        "draft",
+        "draft",
+        "random",
+    ]
+    assert order == ["draft", "random"]
+    assert queue.deduplicated == 1
+
+
+async def test_cancelled_submitter_does_not_cancel_shared_request():
+    """
+    Requests sharing a key still get the result when the first is cancelled
+    """
+    queue = LLMQueue(concurrency=1)
+    release = asyncio.Event()
+
+    async def generate() -> str:
+        await release.wait()
+        return "text"
+
+    first = asyncio.create_task(
+        queue.submit(LLMPriority.ANNOUNCEMENT, generate, key="race")
+    )
+    await asyncio.sleep(0)
+    second = asyncio.create_task(
+        queue.submit(LLMPriority.ANNOUNCEMENT, generate, key="race")
+    )
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    release.set()
+
+    assert await second == "text"
+    assert queue.active == 0
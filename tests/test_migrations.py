@@ -0,0 +1,106 @@
+"""
+Tests of the database schema migrations
+"""
+
+import pytest
+from sqlalchemy import Connection, create_engine, inspect
+
+from billy.database.migrations import LATEST_VERSION, get_schema_version, migrate
+
+BASELINE_SCHEMA = (
+    "CREATE TABLE server (id INTEGER NOT NULL PRIMARY KEY, "
+    "server_id INTEGER NOT NULL, channel_id INTEGER NOT NULL, "
+    "chapter_id VARCHAR NOT NULL, api_key VARCHAR NOT NULL)",
+    "CREATE TABLE event (id INTEGER NOT NULL PRIMARY KEY, "
+    "event_id VARCHAR NOT NULL, chapter_id VARCHAR NOT NULL REFERENCES server (id), "
+    "discord_event_id INTEGER)",
+)
+"""The schema created before versioned migrations were added"""
+
+
+@pytest.fixture(name="conn")
+def fixture_conn():
+    """
+    An empty in-memory database
+    """
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        yield conn
+    engine.dispose()
+
+
+def _create_baseline(conn: Connection) -> None:
+    """
+    Create the baseline schema with duplicated servers and discord events
+    """
+    for statement in BASELINE_SCHEMA:
+        conn.exec_driver_sql(statement)
+
+    conn.exec_driver_sql(
+        "INSERT INTO server (server_id, channel_id, chapter_id, api_key) VALUES "
+        "(1, 10, '100', 'old'), (1, 11, '100', 'new'), (2, 20, '200', 'key')"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO event (event_id, chapter_id, discord_event_id) VALUES "
+        "('a', '100', 1000), ('a', '100', 1000), ('b', '100', NULL), "
+        "('c', '100', NULL)"
+    )
+
+
+def test_new_database_starts_at_latest_version(conn):
+    """
+    A new database is created with the current schema
+    """
+    assert migrate(conn) == LATEST_VERSION
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert {"server", "event", "announcement_draft", "chapter_backfill"} <= set(
+        inspect(conn).get_table_names()
+    )
+
+
+def test_baseline_database_is_migrated(conn):
+    """
+    A baseline database receives every migration
+    """
+    _create_baseline(conn)
+
+    assert migrate(conn) == LATEST_VERSION
+    assert get_schema_version(conn) == LATEST_VERSION
+
+    inspector = inspect(conn)
+    columns = {column["name"] for column in inspector.get_columns("event")}
+    assert {"start_time", "end_time"} <= columns
+    assert {"announcement_draft", "chapter_backfill"} <= set(
+        inspector.get_table_names()
+    )
+    indexes = {index["name"] for index in inspector.get_indexes("event")}
+    assert {"ix_event_window", "ix_event_discord_event_id"} <= indexes
+
+
+def test_baseline_duplicates_are_removed(conn):
+    """
+    Duplicate servers and discord events keep their latest entry
+    """
+    _create_baseline(conn)
+    migrate(conn)
+
+    servers = conn.exec_driver_sql(
+        "SELECT server_id, api_key FROM server ORDER BY server_id"
+    ).all()
+    assert servers == [(1, "new"), (2, "key")]
+
+    events = conn.exec_driver_sql(
+        "SELECT event_id FROM event ORDER BY event_id"
+    ).scalars()
+    assert list(events) == ["a", "b", "c"]
+
+
+def test_migrate_is_idempotent(conn):
+    """
+    Migrating an up to date database changes nothing
+    """
+    _create_baseline(conn)
+    migrate(conn)
+
+    assert migrate(conn) == LATEST_VERSION
+    assert conn.exec_driver_sql("SELECT COUNT(*) FROM event").scalar_one() == 3
@@ -0,0 +1,125 @@
+"""
+Tests of applying a chapter sync to the database
+"""
+
+import datetime
+
+from billy.database import RaceSnapshot
+
+
+def _race(race_id: str, discord_event_id: int | None = None) -> tuple:
+    """
+    Build a race entry of the chapter
+    """
+    return (race_id, "chapter", discord_event_id, None, None)
+
+
+def _snapshot(race_id: str, name: str = "Race") -> RaceSnapshot:
+    """
+    Build a race snapshot of the chapter
+    """
+    return RaceSnapshot(
+        race_id,
+        "chapter",
+        "hash",
+        name,
+        "Chapter",
+        "Field",
+        "Details",
+        None,
+        None,
+        None,
+        datetime.datetime.now(),
+    )
+
+
+async def _race_ids(db) -> list[str]:
+    """
+    Get the ids of all saved races
+    """
+    return sorted([race.event_id async for race in db.get_races()])
+
+
+async def test_new_races_and_snapshots_are_saved(db):
+    """
+    Race entries are added, skipping saved discord events, and snapshots
+    are replaced
+    """
+    result = await db.reconcile_chapter_races(
+        "chapter", [_race("race", 1), _race("race", 2)], [_snapshot("race")], {"race"}
+    )
+    assert result.added == 2
+    assert not result.removed
+
+    result = await db.reconcile_chapter_races(
+        "chapter",
+        [_race("race", 2), _race("other", 3)],
+        [_snapshot("race", "Renamed")],
+        {"race", "other"},
+    )
+    assert result.added == 1
+    assert await _race_ids(db) == ["other", "race", "race"]
+
+    snapshots = await db.get_race_snapshots("chapter")
+    assert list(snapshots) == ["race"]
+    assert snapshots["race"].name == "Renamed"
+
+
+async def test_event_less_races_are_added_once(db):
+    """
+    Races without a discord event are not inserted again
+    """
+    races = [_race("race"), _race("race"), _race("event", 1)]
+
+    result = await db.reconcile_chapter_races("chapter", races, [], {"race", "event"})
+    assert result.added == 2
+
+    result = await db.reconcile_chapter_races("chapter", races, [], {"race", "event"})
+    assert result.added == 0
+    assert await _race_ids(db) == ["event", "race"]
+
+
+async def test_unlisted_races_are_removed(db):
+    """
+    Races, snapshots, and drafts no longer listed for the chapter are
+    removed, leaving other chapters untouched
+    """
+    await db.reconcile_chapter_races(
+        "chapter",
+        [_race("kept", 1), _race("dropped", 2), _race("dropped", 3)],
+        [_snapshot("kept"), _snapshot("dropped")],
+        {"kept", "dropped"},
+    )
+    await db.reconcile_chapter_races(
+        "other", [("dropped", "other", 4, None, None)], [], {"dropped"}
+    )
+    await db.save_announcement_draft("dropped", "chapter", "hash", 0, "Hello")
+
+    result = await db.reconcile_chapter_races("chapter", [], [], {"kept"})
+
+    assert result.removed == ["dropped"]
+    assert result.removed_snapshots == 1
+    assert await _race_ids(db) == ["dropped", "kept"]
+    assert list(await db.get_race_snapshots("chapter")) == ["kept"]
+    assert await db.get_announcement_draft("dropped", "chapter", "hash", 0) is None
+
+
+async def test_large_chapters_are_reconciled_in_chunks(db):
+    """
+    Chapters with more races than fit in a single statement are saved and
+    removed in full
+    """
+    race_ids = {f"race-{index}" for index in range(1200)}
+    races = [_race(race_id, index) for index, race_id in enumerate(sorted(race_ids))]
+    snapshots = [_snapshot(race_id) for race_id in sorted(race_ids)]
+
+    result = await db.reconcile_chapter_races("chapter", races, snapshots, race_ids)
+
+    assert result.added == 1200
+    assert await db.get_chapter_race_ids("chapter") == race_ids
+    assert len(await db.get_race_snapshots("chapter")) == 1200
+
+    result = await db.reconcile_chapter_races("chapter", [], [], set())
+
+    assert len(result.removed) == 1200
+    assert result.removed_snapshots == 1200
@@ -0,0 +1,138 @@
+"""
+Tests of the API response cache
+"""
+
+import asyncio
+
+import pytest
+
+from billy.api.cache import ResponseCache
+
+
+class Loader:
+    """
+    Counts the requests of a slow API response
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self, value: dict | None = None, error: Exception | None = None):
+        """
+        Class initializer
+
+        :param value: The response, defaults to None
+        :param error: Exception raised instead of responding, defaults to None
+        """
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> dict | None:
+        """
+        Wait until released, then respond
+        """
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+async def _fetch_concurrently(cache: ResponseCache, loader: Loader, count: int):
+    """
+    Start concurrent fetches of the same entry and release the loader once
+    they are all waiting
+    """
+    fetches = [
+        asyncio.create_task(cache.fetch("race/view", "1", loader)) for _ in range(count)
+    ]
+    await asyncio.sleep(0)
+    loader.release.set()
+    return await asyncio.gather(*fetches, return_exceptions=True)
+
+
+async def test_concurrent_fetches_share_one_request():
+    """
+    Fetches of an entry already being loaded wait for the same request
+    """
+    cache = ResponseCache(default_ttl=60)
+    loader = Loader({"id": "1"})
+
+    results = await _fetch_concurrently(cache, loader, 5)
+
+    assert results == [{"id": "1"}] * 5
+    assert loader.calls == 1
+    assert (cache.hits, cache.misses) == (4, 1)
+    assert await cache.fetch("race/view", "1", loader) == {"id": "1"}
+    assert loader.calls == 1
+
+
+async def test_failed_loads_are_shared_and_not_cached():
+    """
+    Every waiter receives the failure, and the next fetch retries
+    """
+    cache = ResponseCache(default_ttl=60)
+    loader = Loader(error=ValueError("server error"))
+
+    results = await _fetch_concurrently(cache, loader, 3)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert loader.calls == 1
+    assert len(cache) == 0
+
+    loader.error = None
+    loader.value = {"id": "1"}
+    assert await cache.fetch("race/view", "1", loader) == {"id": "1"}
+    assert loader.calls == 2
+
+
+async def test_missing_responses_are_not_cached():
+    """
+    Loads returning None are shared but not stored
+    """
+    cache = ResponseCache(default_ttl=60)
+    loader = Loader()
+
+    assert await _fetch_concurrently(cache, loader, 2) == [None, None]
+    assert loader.calls == 1
+    assert len(cache) == 0
+
+
+async def test_cancelled_caller_does_not_cancel_waiters():
+    """
+    The other callers still receive the response when the caller that
+    started the load is cancelled
+    """
+    cache = ResponseCache(default_ttl=60)
+    loader = Loader({"id": "1"})
+
+    first = asyncio.create_task(cache.fetch("race/view", "1", loader))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.fetch("race/view", "1", loader))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    loader.release.set()
+    assert await second == {"id": "1"}
+    assert loader.calls == 1
+    assert cache.get("race/view", "1") == {"id": "1"}
+
+
+def test_least_recently_used_entry_is_evicted():
+    """
+    The cache keeps at most maxsize responses
+    """
+    cache = ResponseCache(default_ttl=60, maxsize=2)
+    cache.put("race/view", "1", 1)
+    cache.put("race/view", "2", 2)
+    assert cache.get("race/view", "1") == 1
+
+    cache.put("race/view", "3", 3)
+
+    assert cache.get("race/view", "2") is None
+    assert cache.get("race/view", "1") == 1
+    assert cache.get("race/view", "3") == 3
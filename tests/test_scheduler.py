@@ -0,0 +1,96 @@
+"""
+Tests of the discord event status scheduler
+"""
+
+import asyncio
+import datetime
+
+from billy.scheduler import EventAction, EventScheduler
+
+
+class Recorder:
+    """
+    Records the actions applied by the scheduler
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self) -> None:
+        """
+        Class initializer
+        """
+        self.actions: list[tuple[int, EventAction]] = []
+        self.fired = asyncio.Event()
+
+    async def __call__(self, _guild_id: int, event_id: int, action: EventAction):
+        """
+        Record an action
+        """
+        self.actions.append((event_id, action))
+        self.fired.set()
+
+
+def _at(seconds: float) -> datetime.datetime:
+    """
+    Get an aware time relative to now
+    """
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+        seconds=seconds
+    )
+
+
+def test_due_actions_are_popped_in_time_order():
+    """
+    Due actions are returned by time, and later actions stay pending
+    """
+    scheduler = EventScheduler(Recorder())
+    scheduler.schedule(1, 30, _at(-10), _at(3600))
+    scheduler.schedule(1, 10, _at(-30), _at(-20))
+    scheduler.schedule(1, 20, _at(-25), None)
+
+    due = scheduler._pop_due(_at(0).timestamp())  # pylint: disable=W0212
+
+    assert [(event_id, action) for _, event_id, action in due] == [
+        (10, EventAction.START),
+        (20, EventAction.START),
+        (10, EventAction.END),
+        (30, EventAction.START),
+    ]
+    assert len(scheduler) == 1
+    assert 30 in scheduler
+
+
+def test_rescheduled_and_cancelled_actions_are_skipped():
+    """
+    Replaced times and cancelled events do not fire
+    """
+    scheduler = EventScheduler(Recorder())
+    scheduler.schedule(1, 10, _at(-30), None)
+    scheduler.schedule(1, 20, _at(-20), None)
+    scheduler.schedule(1, 10, _at(3600), None)
+    scheduler.cancel(20)
+
+    assert not scheduler._pop_due(_at(0).timestamp())  # pylint: disable=W0212
+    assert len(scheduler) == 1
+    assert 20 not in scheduler
+
+
+async def test_scheduler_fires_due_actions():
+    """
+    The running scheduler wakes for newly scheduled actions
+    """
+    recorder = Recorder()
+    scheduler = EventScheduler(recorder)
+    scheduler.start()
+    try:
+        scheduler.schedule(1, 10, _at(3600), None)
+        scheduler.schedule(1, 20, _at(0.05), _at(0.1))
+        await asyncio.wait_for(recorder.fired.wait(), 5)
+        while len(recorder.actions) < 2:
+            recorder.fired.clear()
+            await asyncio.wait_for(recorder.fired.wait(), 5)
+    finally:
+        await scheduler.stop()
+
+    assert recorder.actions == [(20, EventAction.START), (20, EventAction.END)]
+    assert 10 in scheduler
@@ -0,0 +1,202 @@
+"""
+Tests of the MultiGP to discord synchronization
+"""
+
+import datetime
+import types
+
+import discord
+from conftest import race_snapshot
+
+from billy import billy
+from billy.api import MultiGPAPI
+from billy.database import DiscordServer
+
+
+def _next_week() -> datetime.datetime:
+    """
+    Get a start time a week from now
+    """
+    return datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(days=7)
+
+
+async def test_pass_syncs_every_chapter(db, multigp, handler, engine):
+    """
+    A pass creates events for the new races of every bound server
+    """
+    await db.set_server_configuration(1, 10, "first")
+    await db.set_server_configuration(2, 20, "first")
+    await db.set_server_configuration(3, 30, "second")
+    multigp.add_race("first", "one", _next_week())
+    multigp.add_race("second", "two", _next_week())
+
+    stats = await engine.run_pass()
+
+    assert (stats.chapters, stats.servers) == (2, 3)
+    assert (stats.new_races, stats.added_races) == (2, 3)
+    assert sorted(handler.events) == ["one", "one", "two"]
+
+    stats = await engine.run_pass()
+    assert (stats.new_races, stats.added_races) == (0, 0)
+
+
+async def test_failed_chapter_does_not_block_other_chapters(
+    db, multigp, handler, engine
+):
+    """
+    A chapter whose race list cannot be pulled is counted as failed and
+    synced again next pass
+    """
+    await db.set_server_configuration(1, 10, "first")
+    await db.set_server_configuration(2, 20, "second")
+    multigp.add_race("first", "one", _next_week())
+    multigp.add_race("second", "two", _next_week())
+    multigp.failing.add("first")
+
+    stats = await engine.run_pass()
+
+    assert stats.failed_chapters == 1
+    assert handler.events == ["two"]
+
+    multigp.failing.clear()
+    stats = await engine.run_pass()
+
+    assert stats.failed_chapters == 0
+    assert handler.events == ["two", "one"]
+
+
+async def test_unfinished_race_is_checked_next_pass(db, multigp, handler, engine):
+    """
+    A race left unfinished by the handler is not saved, and is checked again
+    next pass
+    """
+    await db.set_server_configuration(1, 10, "chapter")
+    multigp.add_race("chapter", "race", _next_week())
+    handler.retry.add("race")
+
+    stats = await engine.run_pass()
+    assert (stats.new_races, stats.added_races) == (1, 0)
+
+    handler.retry.clear()
+    stats = await engine.run_pass()
+
+    assert (stats.new_races, stats.added_races) == (1, 1)
+    assert handler.events == ["race"]
+
+
+async def test_unlisted_race_is_removed(db, multigp, engine):
+    """
+    A race no longer listed for the chapter is removed
+    """
+    await db.set_server_configuration(1, 10, "chapter")
+    multigp.add_race("chapter", "race", _next_week())
+    await engine.run_pass()
+
+    del multigp.races["chapter"]["race"]
+    stats = await engine.run_pass()
+
+    assert stats.removed_races == 1
+    assert not await db.get_chapter_race_ids("chapter")
+    assert not await db.get_race_snapshots("chapter")
+
+
+async def test_failed_server_keeps_other_events(monkeypatch):
+    """
+    A server where the event could not be created does not discard the
+    events of the other servers
+    """
+
+    async def add_race_checks(server: DiscordServer, _) -> tuple:
+        if server.server_id == 1:
+            response = types.SimpleNamespace(status=500, reason="Server Error")
+            raise discord.HTTPException(response, "failed")  # type: ignore[arg-type]
+
+        return True, types.SimpleNamespace(id=server.server_id * 10)
+
+    monkeypatch.setattr(billy, "add_race_checks", add_race_checks)
+    servers = [
+        DiscordServer(1, 10, "chapter", "key"),
+        DiscordServer(2, 20, "chapter", "key"),
+    ]
+
+    records = await billy.sync_new_race(servers, race_snapshot(timezone=None))
+
+    assert records is not None
+    assert [record[2] for record in records] == [20]
+
+
+async def test_race_failed_everywhere_is_retried(monkeypatch):
+    """
+    A race whose checks failed in every server is left to the next pass,
+    while a race without events in any server is saved
+    """
+
+    async def failed_checks(*_) -> tuple:
+        return False, None
+
+    async def skipped_checks(*_) -> tuple:
+        return True, None
+
+    servers = [DiscordServer(1, 10, "chapter", "key")]
+
+    monkeypatch.setattr(billy, "add_race_checks", failed_checks)
+    assert await billy.sync_new_race(servers, race_snapshot(timezone=None)) is None
+
+    monkeypatch.setattr(billy, "add_race_checks", skipped_checks)
+    records = await billy.sync_new_race(servers, race_snapshot(timezone=None))
+    assert records is not None
+    assert [record[2] for record in records] == [None]
+
+
+async def test_invalid_race_does_not_block_other_races(db, multigp, handler, engine):
+    """
+    A race with invalid data is skipped while the other races are saved
+    """
+    await db.set_server_configuration(1, 10, "chapter")
+    multigp.add_race("chapter", "good", _next_week())
+    multigp.add_race("chapter", "bad", _next_week(), latitude="")
+
+    for _ in range(3):
+        await engine.run_pass()
+
+    assert handler.events == ["good"]
+    assert await db.get_chapter_race_ids("chapter") == {"good"}
+
+
+async def test_edited_race_is_pulled_fresh(db, multigp, handler, engine):
+    """
+    A race edited after its snapshot was saved bypasses the cached race data
+    """
+    await db.set_server_configuration(1, 10, "chapter")
+    race = multigp.add_race("chapter", "race", _next_week())
+    handler.retry.add("race")
+
+    await engine.run_pass()
+    await engine.run_pass()
+    assert multigp.fresh == []
+
+    race["name"] = "Renamed"
+    await engine.run_pass()
+
+    assert multigp.fresh == ["race"]
+    snapshots = await db.get_race_snapshots("chapter")
+    assert snapshots["race"].name == "Renamed"
+
+
+async def test_fresh_pull_replaces_cached_race_data():
+    """
+    A fresh pull requests the race data again instead of using the cache
+    """
+    api = MultiGPAPI()
+    responses = iter([{"name": "old"}, {"name": "new"}])
+
+    async def pull_data(*_) -> dict:
+        return next(responses)
+
+    api._pull_data = pull_data  # type: ignore[method-assign]  # pylint: disable=W0212
+    try:
+        assert await api.pull_race_data("cached", "key") == {"name": "old"}
+        assert await api.pull_race_data("cached", "key") == {"name": "old"}
+        assert await api.pull_race_data("cached", "key", fresh=True) == {"name": "new"}
+    finally:
+        api.cache.invalidate("race/view", "cached")